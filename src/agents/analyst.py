@@ -7,6 +7,7 @@ from typing import Any
 import structlog
 
 from src.agents.base import AgentConfig, BaseAgent, LLMProvider, load_tech_pack
+from src.patent_pipeline.services.llm_registry import get_llm_registry
 
 logger = structlog.get_logger(__name__)
 
@@ -22,6 +23,14 @@ class AnalystAgent(BaseAgent):
     # No single prompt file - loads stage-specific prompts dynamically
     prompt_file = None
 
+    # Claude tends to add commentary around JSON unless told not to
+    failover_instructions = {
+        LLMProvider.CLAUDE: (
+            "Respond with the JSON object only, inside a single ```json code block, "
+            "with no text before or after it."
+        ),
+    }
+
     def __init__(self, config: AgentConfig | None = None) -> None:
         """Initialize the analyst agent."""
         if config is None:
@@ -38,7 +47,7 @@ class AnalystAgent(BaseAgent):
 
     def _load_stage_prompts(self) -> None:
         """Load all stage 2 prompts."""
-        from src.agents.base import PROMPTS_DIR
+        registry = get_llm_registry()
 
         stage_files = {
             "2a": "PROMPT_Pipeline1_Stage2A_ClaimConstruction_Estoppel_v2.md",
@@ -47,12 +56,12 @@ class AnalystAgent(BaseAgent):
         }
 
         for stage, filename in stage_files.items():
-            path = PROMPTS_DIR / filename
-            if path.exists():
-                self._stage_prompts[stage] = path.read_text(encoding="utf-8")
+            text = registry.prompt_text(filename)
+            if text is not None:
+                self._stage_prompts[stage] = text
                 logger.debug("Loaded stage prompt", stage=stage)
             else:
-                logger.warning("Stage prompt not found", stage=stage, path=str(path))
+                logger.warning("Stage prompt not found", stage=stage, file=filename)
 
     def _default_system_prompt(self) -> str:
         """Return the default system prompt for analysis."""
@@ -98,7 +107,7 @@ Focus on:
 ## STAGE 1 EXTRACTION DATA
 
 ```json
-{json.dumps(extraction, indent=2)}
+{self.fragments.json(extraction, "stage1_extraction")}
 ```
 
 ## TECH PACK
@@ -134,13 +143,13 @@ Focus on:
 ## STAGE 1 EXTRACTION DATA
 
 ```json
-{json.dumps(extraction, indent=2)}
+{self.fragments.json(extraction, "stage1_extraction")}
 ```
 
 ## STAGE 2A DATA
 
 ```json
-{json.dumps(stage2a, indent=2)}
+{self.fragments.json(stage2a, "stage2a")}
 ```
 
 ## TECH PACK
@@ -178,19 +187,19 @@ Focus on:
 ## STAGE 1 EXTRACTION DATA
 
 ```json
-{json.dumps(extraction, indent=2)}
+{self.fragments.json(extraction, "stage1_extraction")}
 ```
 
 ## STAGE 2A DATA
 
 ```json
-{json.dumps(stage2a, indent=2)}
+{self.fragments.json(stage2a, "stage2a")}
 ```
 
 ## STAGE 2B DATA
 
 ```json
-{json.dumps(stage2b, indent=2)}
+{self.fragments.json(stage2b, "stage2b")}
 ```
 
 ## TECH PACK
@@ -267,7 +276,7 @@ Focus on:
 
 ## CONTEXT
 ```json
-{json.dumps(context, indent=2)}
+{self.fragments.json(context, "clarify_context")}
 ```
 
 Provide clear, specific answers with references to the source data.
@@ -1,17 +1,38 @@
 """Base agent class with multi-LLM support."""
 
+import asyncio
+import weakref
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
 from typing import Any
 
 import google.generativeai as genai
+import httpx
 import structlog
-from anthropic import Anthropic
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
 from pydantic import BaseModel, Field
 
 from src.config import get_settings
+from src.patent_pipeline.services.continuation import is_truncated
+from src.patent_pipeline.services.llm_backend import get_llm_backend
+from src.patent_pipeline.services.llm_registry import (
+    get_llm_registry,
+    llm_stage,
+    run_gemini_call,
+)
+from src.patent_pipeline.services.output_budget import get_output_budgets
+from src.patent_pipeline.services.output_repair import usage_tokens
+from src.patent_pipeline.services.overload_control import get_overload_control
+from src.patent_pipeline.services.prompt_fragments import PromptFragments, job_fragments
+from src.patent_pipeline.services.provider_router import get_provider_router, is_provider_error
+from src.patent_pipeline.services.rate_limiter import estimate_tokens, get_rate_limiter
+from src.patent_pipeline.services.usage_accounting import (
+    claude_usage,
+    gemini_usage,
+    record_llm_call,
+)
 
 logger = structlog.get_logger(__name__)
 
@@ -19,6 +40,9 @@ logger = structlog.get_logger(__name__)
 PROMPTS_DIR = Path(__file__).parent.parent / "patent_pipeline" / "prompts"
 TECHPACKS_DIR = Path(__file__).parent.parent / "patent_pipeline" / "techpacks"
 
+# Anthropic prompt cache breakpoint (cached for 5 minutes, refreshed on each hit)
+CLAUDE_CACHE_CONTROL = {"type": "ephemeral"}
+
 
 class LLMProvider(str, Enum):
     """Supported LLM providers."""
@@ -27,6 +51,44 @@ class LLMProvider(str, Enum):
     CLAUDE = "claude"
 
 
+@dataclass
+class _ClaudeLoopResources:
+    """Claude client and concurrency gate shared by all agents on one event loop."""
+
+    client: AsyncAnthropic
+    semaphore: asyncio.Semaphore
+
+
+# httpx connection pools and asyncio semaphores are bound to an event loop,
+# so the shared resources are kept per loop and dropped with it.
+_claude_resources: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _ClaudeLoopResources] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_claude_resources() -> _ClaudeLoopResources:
+    """Get the shared Claude client and semaphore for the running event loop."""
+    loop = asyncio.get_running_loop()
+    resources = _claude_resources.get(loop)
+    if resources is None:
+        settings = get_settings()
+        http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=settings.claude_max_connections,
+                max_keepalive_connections=settings.claude_max_connections,
+            ),
+        )
+        resources = _ClaudeLoopResources(
+            client=AsyncAnthropic(
+                api_key=settings.anthropic_api_key,
+                http_client=http_client,
+            ),
+            semaphore=asyncio.Semaphore(settings.claude_max_concurrency),
+        )
+        _claude_resources[loop] = resources
+    return resources
+
+
 class AgentConfig(BaseModel):
     """Configuration for an agent."""
 
@@ -47,13 +109,17 @@ class BaseAgent(ABC):
     # Subclasses should override this with their prompt file name
     prompt_file: str | None = None
 
+    # Instructions appended to prompts when a call fails over to another
+    # provider, keyed by the provider the call is sent to
+    failover_instructions: dict[LLMProvider, str] = {}
+
     def __init__(self, config: AgentConfig) -> None:
         """Initialize the agent with configuration."""
         self.config = config
         self.settings = get_settings()
         self._system_prompt: str | None = None
         self._gemini_model: genai.GenerativeModel | None = None
-        self._claude_client: Anthropic | None = None
+        self._claude_client: AsyncAnthropic | None = None
 
         # Configure LLM clients
         self._configure_clients()
@@ -69,25 +135,21 @@ class BaseAgent(ABC):
         )
 
     def _configure_clients(self) -> None:
-        """Configure LLM clients based on provider."""
+        """Configure LLM clients based on provider.
+
+        The Claude client is shared process-wide and created lazily on first use.
+        """
         if self.config.provider == LLMProvider.GEMINI:
-            if self.settings.google_api_key:
-                genai.configure(api_key=self.settings.google_api_key)
-        elif self.config.provider == LLMProvider.CLAUDE:
-            if self.settings.anthropic_api_key:
-                self._claude_client = Anthropic(api_key=self.settings.anthropic_api_key)
+            get_llm_registry().configure()
 
     def _load_prompt(self) -> None:
         """Load system prompt from markdown file."""
         if not self.prompt_file:
             return
 
-        path = PROMPTS_DIR / self.prompt_file
-        if path.exists():
-            self._system_prompt = path.read_text(encoding="utf-8")
-            logger.debug("Loaded prompt", agent=self.config.name, path=str(path))
-        else:
-            logger.warning("Prompt file not found", agent=self.config.name, path=str(path))
+        self._system_prompt = get_llm_registry().prompt_text(self.prompt_file)
+        if self._system_prompt is None:
+            logger.warning("Prompt file not found", agent=self.config.name, file=self.prompt_file)
 
     @property
     def system_prompt(self) -> str:
@@ -103,67 +165,245 @@ class BaseAgent(ABC):
 
     @property
     def gemini_model(self) -> genai.GenerativeModel:
-        """Get or create the Gemini model instance."""
+        """Get the shared Gemini model instance for this agent's configuration."""
         if self._gemini_model is None:
-            self._gemini_model = genai.GenerativeModel(
+            self._gemini_model = get_llm_registry().gemini_model(
                 model_name=self.settings.gemini_model,
-                generation_config=genai.GenerationConfig(
-                    temperature=self.config.temperature,
-                    max_output_tokens=self.config.max_tokens,
-                ),
-                safety_settings={
-                    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-                    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-                    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-                    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-                },
+                temperature=self.config.temperature,
+                max_output_tokens=self.config.max_tokens,
                 system_instruction=self.system_prompt,
             )
         return self._gemini_model
 
     @property
-    def claude_client(self) -> Anthropic:
-        """Get the Claude client."""
-        if self._claude_client is None:
-            self._claude_client = Anthropic(api_key=self.settings.anthropic_api_key)
-        return self._claude_client
+    def fragments(self) -> PromptFragments:
+        """Get the current job's serialized prompt fragments."""
+        return job_fragments()
+
+    def reference_data(
+        self, extraction: dict[str, Any], forensic_analysis: dict[str, Any]
+    ) -> str:
+        """Format the Stage 1 and Stage 2 data that reports are written and checked against.
+
+        The text is identical for every call of a job, so it is sent as the
+        cached prefix of the user message.
+
+        Args:
+            extraction: Stage 1 extraction data
+            forensic_analysis: Stage 2 forensic analysis data
+
+        Returns:
+            Reference data sections
+        """
+        return f"""## STAGE 1 EXTRACTION DATA
+
+```json
+{self.fragments.json(extraction, "stage1_extraction")}
+```
+
+## STAGE 2 FORENSIC DATA
+
+```json
+{self.fragments.json(forensic_analysis, "stage2_forensic")}
+```
+"""
+
+    @property
+    def claude_client(self) -> AsyncAnthropic:
+        """Get the async Claude client shared by all agents on this event loop."""
+        if self._claude_client is not None:
+            return self._claude_client
+        return _get_claude_resources().client
 
     async def invoke(self, message: str, **kwargs) -> str:
         """Send a message to the agent and get a response.
 
+        The provider router may send the call to another provider while the
+        configured one is degraded, and a call that fails with a provider
+        error is retried once on another provider, if the agent's stage is
+        allowed to fail over. Requests with Gemini file uploads always stay
+        on Gemini.
+
         Args:
             message: The input message/prompt
-            **kwargs: Additional arguments (e.g., files for Gemini)
+            **kwargs: Additional arguments (``files`` for Gemini, ``cached_prefix``
+                for text sent ahead of the message and cached by Claude)
 
         Returns:
             The agent's response as a string
         """
-        if self.config.provider == LLMProvider.GEMINI:
+        router = get_provider_router()
+        stage = self.config.name
+        portable = "files" not in kwargs
+        with llm_stage(stage):
+            provider = LLMProvider(router.route(stage, self.config.provider.value, portable))
+            try:
+                return await self._invoke_provider(provider, message, **kwargs)
+            except Exception as e:
+                target = (
+                    router.failover_target(stage, provider.value, portable)
+                    if is_provider_error(e)
+                    else None
+                )
+                if target is None:
+                    raise
+                router.count_failover(stage, provider.value, target, "error")
+                return await self._invoke_provider(LLMProvider(target), message, **kwargs)
+
+    async def _invoke_provider(self, provider: LLMProvider, message: str, **kwargs) -> str:
+        """Invoke a provider, adapting the prompt if it is not the configured one."""
+        if provider != self.config.provider:
+            message = self.adapt_prompt(message, provider)
+            if provider == LLMProvider.GEMINI:
+                get_llm_registry().configure()
+        if provider == LLMProvider.GEMINI:
             return await self._invoke_gemini(message, **kwargs)
-        else:
-            return await self._invoke_claude(message, **kwargs)
+        return await self._invoke_claude(message, **kwargs)
+
+    def adapt_prompt(self, message: str, provider: LLMProvider) -> str:
+        """Adapt a prompt written for the configured provider to another one.
+
+        Args:
+            message: Prompt for the configured provider
+            provider: Provider the call is sent to instead
+
+        Returns:
+            Prompt with the agent's failover instructions for that provider
+        """
+        instructions = self.failover_instructions.get(provider)
+        if not instructions:
+            return message
+        return f"{message}\n\n{instructions}"
 
     async def _invoke_gemini(self, message: str, **kwargs) -> str:
-        """Invoke Gemini model."""
+        """Invoke Gemini model.
+
+        The output token limit is the agent's learned budget (see
+        ``OutputBudgets``), starting from ``max_tokens``.
+        """
         parts = [message]
+        if kwargs.get("cached_prefix"):
+            parts = [kwargs["cached_prefix"], message]
 
         # Add any uploaded files
         if "files" in kwargs:
             parts = kwargs["files"] + parts
 
-        response = self.gemini_model.generate_content(parts)
+        model_name = self.settings.gemini_model
+        budgets = get_output_budgets()
+        max_tokens = budgets.budget(self.config.name, self.config.max_tokens)
+        estimated = estimate_tokens([self.system_prompt, parts]) + max_tokens
+        # The model is built with ``max_tokens``; only a different budget is sent
+        limit: dict[str, Any] = {}
+        if max_tokens != self.config.max_tokens:
+            limit["generation_config"] = {"max_output_tokens": max_tokens}
+        async with (
+            get_overload_control().call("gemini", model_name),
+            get_rate_limiter().slot("gemini", model_name, estimated) as slot,
+        ):
+            with record_llm_call(
+                "gemini", model_name, self.config.name, "agent", slot.waited
+            ) as call:
+                backend = get_llm_backend()
+                request = backend.request(
+                    "gemini",
+                    model_name,
+                    self.config.name,
+                    {"system": self.system_prompt, "contents": parts},
+                )
+                with get_provider_router().observe("gemini"):
+                    response = await backend.call(
+                        request,
+                        lambda _: run_gemini_call(
+                            self.gemini_model.generate_content, parts, **limit
+                        ),
+                    )
+                usage = gemini_usage(response)
+                call.set_usage(usage)
+            slot.settle(usage_tokens(response))
+        budgets.record(self.config.name, usage.output_tokens, is_truncated(response))
         return response.text
 
     async def _invoke_claude(self, message: str, **kwargs) -> str:
-        """Invoke Claude model."""
-        response = self.claude_client.messages.create(
-            model=self.settings.default_model,
-            max_tokens=self.config.max_tokens,
-            system=self.system_prompt,
-            messages=[{"role": "user", "content": message}],
-        )
+        """Invoke Claude model.
+
+        Calls first pass Claude's circuit breaker and adaptive concurrency
+        limit, wait for the shared RPM/TPM quota, then are bounded by
+        ``claude_max_concurrency`` per event loop so that concurrent jobs
+        queue here instead of exhausting the connection pool. The output
+        token limit is the agent's learned budget (see ``OutputBudgets``),
+        starting from ``max_tokens``.
+
+        With prompt caching enabled, cache breakpoints are set after the
+        system prompt and after ``cached_prefix``, so repeated calls (e.g.
+        revision loops) read both from Anthropic's prompt cache.
+        """
+        model_name = self.settings.default_model
+        prefix = kwargs.get("cached_prefix")
+        system, content = self._claude_prompt(message, prefix)
+        budgets = get_output_budgets()
+        max_tokens = budgets.budget(self.config.name, self.config.max_tokens)
+        estimated = estimate_tokens([self.system_prompt, prefix or "", message]) + max_tokens
+        async with (
+            get_overload_control().call("claude", model_name),
+            get_rate_limiter().slot("claude", model_name, estimated) as slot,
+        ):
+            async with _get_claude_resources().semaphore:
+                with record_llm_call(
+                    "claude", model_name, self.config.name, "agent", slot.waited
+                ) as call:
+                    payload = {
+                        "model": model_name,
+                        "system": system,
+                        "messages": [{"role": "user", "content": content}],
+                    }
+                    backend = get_llm_backend()
+                    # The learned limit varies run to run, so it is not part of the request key
+                    request = backend.request("claude", model_name, self.config.name, payload)
+                    with get_provider_router().observe("claude"):
+                        response = await backend.call(
+                            request,
+                            lambda _: self.claude_client.messages.create(
+                                **payload, max_tokens=max_tokens
+                            ),
+                        )
+                    usage = claude_usage(response)
+                    call.set_usage(usage)
+            slot.settle(usage.input_tokens + usage.output_tokens)
+        truncated = getattr(response, "stop_reason", None) == "max_tokens"
+        budgets.record(self.config.name, usage.output_tokens, truncated)
+        if usage.cached_tokens or usage.cache_write_tokens:
+            logger.info(
+                "Claude prompt cache",
+                agent=self.config.name,
+                cache_read_tokens=usage.cached_tokens,
+                cache_write_tokens=usage.cache_write_tokens,
+                input_tokens=usage.input_tokens,
+            )
         return response.content[0].text
 
+    def _claude_prompt(self, message: str, prefix: str | None = None) -> tuple[Any, Any]:
+        """Build the Claude system prompt and user content.
+
+        Args:
+            message: Per-call part of the user message
+            prefix: Text repeated across calls, sent ahead of the message
+
+        Returns:
+            Tuple of (system, user content) for ``messages.create``
+        """
+        if not self.settings.claude_prompt_caching:
+            return self.system_prompt, f"{prefix}\n{message}" if prefix else message
+
+        system = [
+            {"type": "text", "text": self.system_prompt, "cache_control": CLAUDE_CACHE_CONTROL}
+        ]
+        content: list[dict[str, Any]] = []
+        if prefix:
+            content.append({"type": "text", "text": prefix, "cache_control": CLAUDE_CACHE_CONTROL})
+        content.append({"type": "text", "text": message})
+        return system, content
+
     @abstractmethod
     async def process(self, input_data: dict[str, Any]) -> dict[str, Any]:
         """Process input and return output.
@@ -1,14 +1,13 @@
 """Extractor Agent - Stage 1 Record Extraction from PDFs."""
 
 import json
-import tempfile
-import os
+from contextlib import AsyncExitStack
 from typing import Any
 
-import google.generativeai as genai
 import structlog
 
 from src.agents.base import AgentConfig, BaseAgent, LLMProvider
+from src.patent_pipeline.services.upload_cache import get_upload_cache
 
 logger = structlog.get_logger(__name__)
 
@@ -44,22 +43,16 @@ and preserve exact quotes with pin-cites.
 
 Do NOT analyze, interpret, or draw conclusions. Only extract what is in the record."""
 
-    def _upload_pdf(self, pdf_bytes: bytes, display_name: str) -> Any:
-        """Upload a PDF to Gemini for processing."""
-        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
-            f.write(pdf_bytes)
-            temp_path = f.name
+    async def _upload_pdf(
+        self, leases: AsyncExitStack, pdf_bytes: bytes, display_name: str
+    ) -> Any:
+        """Upload a PDF to Gemini for processing, reusing cached uploads.
 
-        try:
-            uploaded_file = genai.upload_file(
-                path=temp_path,
-                display_name=display_name,
-                mime_type="application/pdf",
-            )
-            logger.info("Uploaded PDF to Gemini", display_name=display_name)
-            return uploaded_file
-        finally:
-            os.unlink(temp_path)
+        The file is leased until ``leases`` closes.
+        """
+        return await leases.enter_async_context(
+            get_upload_cache().lease(pdf_bytes, display_name)
+        )
 
     def _parse_json_response(self, text: str) -> dict[str, Any]:
         """Parse JSON from LLM response."""
@@ -98,19 +91,24 @@ Do NOT analyze, interpret, or draw conclusions. Only extract what is in the reco
             if not history_pdf_bytes:
                 raise ValueError("history_pdf_bytes is required")
 
-            # Upload PDFs
-            history_file = self._upload_pdf(history_pdf_bytes, "prosecution_history.pdf")
-            files = [history_file]
-
-            if patent_pdf_bytes:
-                patent_file = self._upload_pdf(patent_pdf_bytes, "issued_patent.pdf")
-                files.append(patent_file)
-
-            # Invoke with files
-            response = await self.invoke(
-                "Extract all records from the provided PDF files according to the schema.",
-                files=files,
-            )
+            # Upload PDFs; they stay leased until the call is done
+            async with AsyncExitStack() as leases:
+                history_file = await self._upload_pdf(
+                    leases, history_pdf_bytes, "prosecution_history.pdf"
+                )
+                files = [history_file]
+
+                if patent_pdf_bytes:
+                    patent_file = await self._upload_pdf(
+                        leases, patent_pdf_bytes, "issued_patent.pdf"
+                    )
+                    files.append(patent_file)
+
+                # Invoke with files
+                response = await self.invoke(
+                    "Extract all records from the provided PDF files according to the schema.",
+                    files=files,
+                )
 
             extraction = self._parse_json_response(response)
 
@@ -6,6 +6,7 @@ from typing import Any
 import structlog
 
 from src.agents.base import AgentConfig, BaseAgent, LLMProvider
+from src.patent_pipeline.services.report_edits import apply_report_edits, mark_corrected_issues
 
 logger = structlog.get_logger(__name__)
 
@@ -52,6 +53,14 @@ class QCAgent(BaseAgent):
 
     prompt_file = "PROMPT_Pipeline1_Stage4_QC_Verification_v2.md"
 
+    # The response is parsed by its section markers, which must survive the switch
+    failover_instructions = {
+        LLMProvider.GEMINI: (
+            "Follow the output format exactly: the QC_JSON_OUTPUT section with a ```json "
+            "code block, then the REPORT_EDITS section with a ```json code block."
+        ),
+    }
+
     # Quality thresholds
     PASS_THRESHOLD = 8  # Score >= 8 passes
     REVISION_THRESHOLD = 5  # Score < 5 requires revision
@@ -82,46 +91,45 @@ You check for:
 
 You DO NOT add new analysis or invent information. You only verify and correct."""
 
-    def _parse_qc_response(self, text: str) -> tuple[dict[str, Any], str]:
-        """Parse QC response into JSON and corrected report.
+    def _parse_qc_response(self, text: str) -> tuple[dict[str, Any], list[Any]]:
+        """Parse QC response into JSON and report edits.
+
+        Args:
+            text: Raw response containing the QC JSON and the edit list
+
+        Returns:
+            Tuple of (QC JSON dict, edit operations)
+        """
+        qc_json = self._json_block(text, "QC_JSON_OUTPUT")
+        edits = self._json_block(text, "REPORT_EDITS")
+        if not isinstance(qc_json, dict):
+            qc_json = {}
+        if not isinstance(edits, list):
+            edits = []
+        return qc_json, edits
+
+    def _json_block(self, text: str, marker: str) -> Any:
+        """Parse the ```json block following a section marker.
 
         Args:
-            text: Raw response containing both QC JSON and corrected report
+            text: Raw response text
+            marker: Section marker (e.g. "QC_JSON_OUTPUT")
 
         Returns:
-            Tuple of (QC JSON dict, corrected report markdown)
+            Parsed JSON, or None if the section is missing or malformed
         """
-        # Parse QC JSON
-        qc_json = {}
-        if "QC_JSON_OUTPUT" in text or "```json" in text:
-            try:
-                qc_start = text.find("```json")
-                if qc_start != -1:
-                    qc_end = text.find("```", qc_start + 7)
-                    qc_json_str = text[qc_start + 7:qc_end].strip()
-                    qc_json = json.loads(qc_json_str)
-            except (json.JSONDecodeError, ValueError) as e:
-                logger.warning("Failed to parse QC JSON", error=str(e))
-
-        # Parse corrected report
-        corrected_report = ""
-        if "FINAL_REPORT_OUTPUT" in text:
-            report_marker = text.find("FINAL_REPORT_OUTPUT")
-            report_start = text.find("```", report_marker)
-            if report_start != -1:
-                # Skip the opening ``` and optional language tag
-                content_start = text.find("\n", report_start) + 1
-                report_end = text.rfind("```")
-                if report_end > content_start:
-                    corrected_report = text[content_start:report_end].strip()
-        elif "```markdown" in text:
-            # Fallback: look for markdown block
-            start = text.rfind("```markdown") + 11
-            end = text.rfind("```")
-            if end > start:
-                corrected_report = text[start:end].strip()
-
-        return qc_json, corrected_report
+        marker_start = text.find(marker)
+        if marker_start == -1:
+            return None
+        start = text.find("```json", marker_start)
+        end = text.find("```", start + 7)
+        if start == -1 or end == -1:
+            return None
+        try:
+            return json.loads(text[start + 7:end].strip())
+        except (json.JSONDecodeError, ValueError) as e:
+            logger.warning("Failed to parse QC response section", section=marker, error=str(e))
+            return None
 
     def _calculate_score(self, qc_json: dict[str, Any]) -> int:
         """Calculate numeric score from QC result.
@@ -170,6 +178,9 @@ You DO NOT add new analysis or invent information. You only verify and correct."
     ) -> QCResult:
         """Verify a report against source data.
 
+        The model returns edits rather than a corrected copy of the report;
+        they are applied to ``report`` here (see ``apply_report_edits``).
+
         Args:
             report: Report to verify (Markdown)
             extraction: Stage 1 extraction data
@@ -180,21 +191,9 @@ You DO NOT add new analysis or invent information. You only verify and correct."
         """
         logger.info("Starting QC verification", agent=self.config.name)
 
-        prompt = f"""{self.system_prompt}
-
-## STAGE 1 EXTRACTION DATA
-
-```json
-{json.dumps(extraction, indent=2)}
-```
-
-## STAGE 2 FORENSIC DATA
-
-```json
-{json.dumps(forensic_analysis, indent=2)}
-```
-
-## STAGE 3 REPORT TO VERIFY
+        # The Stage 4 prompt is the system prompt; the reference data is the
+        # cached prefix shared by every verification round of the job
+        prompt = f"""## STAGE 3 REPORT TO VERIFY
 
 {report}
 
@@ -208,6 +207,7 @@ Please provide your response in two clearly separated sections:
     "quality_grade": "A/B/C/D/F",
     "qc_issues": [
         {{
+            "issue_id": "QC-1",
             "type": "factual_error|missing_citation|formatting|incomplete|unclear_reasoning|data_mismatch",
             "severity": "critical|major|minor",
             "location": "section or line reference",
@@ -220,14 +220,28 @@ Please provide your response in two clearly separated sections:
 }}
 ```
 
-### FINAL_REPORT_OUTPUT
-```markdown
-{{corrected final report here}}
+### REPORT_EDITS
+Do not reproduce the report. List each correction as an edit; "find" is copied
+verbatim from the report and must occur only once in the named section.
+```json
+[
+    {{
+        "section": "heading text of the section",
+        "find": "exact text to replace",
+        "replace": "corrected text",
+        "issue_id": "QC-1"
+    }}
+]
 ```
 """
 
-        response = await self.invoke(prompt)
-        qc_json, corrected_report = self._parse_qc_response(response)
+        response = await self.invoke(
+            prompt, cached_prefix=self.reference_data(extraction, forensic_analysis)
+        )
+        qc_json, edits = self._parse_qc_response(response)
+        edited = apply_report_edits(report, edits)
+        mark_corrected_issues(qc_json, edited)
+        qc_json.update(edited.summary())
 
         # Calculate score and determine actions
         score = self._calculate_score(qc_json)
@@ -242,13 +256,15 @@ Please provide your response in two clearly separated sections:
             score=score,
             grade=qc_json.get("quality_grade", "?"),
             issues_count=len(qc_json.get("qc_issues", [])),
+            edits_applied=len(edited.applied),
+            edit_conflicts=len(edited.conflicts),
             passed=passed,
             needs_revision=needs_revision,
         )
 
         return QCResult(
             qc_json=qc_json,
-            corrected_report=corrected_report or report,
+            corrected_report=edited.report_md,
             score=score,
             passed=passed,
             needs_revision=needs_revision,
@@ -1,6 +1,5 @@
 """Writer Agent - Stage 3 Report Generation."""
 
-import json
 from typing import Any
 
 import structlog
@@ -19,6 +18,13 @@ class WriterAgent(BaseAgent):
 
     prompt_file = "PROMPT_Pipeline1_Stage3_ReportGeneration_v2.md"
 
+    failover_instructions = {
+        LLMProvider.GEMINI: (
+            "Output only the complete report in Markdown. Do not add a preamble, "
+            "notes or a summary of your changes."
+        ),
+    }
+
     def __init__(self, config: AgentConfig | None = None) -> None:
         """Initialize the writer agent."""
         if config is None:
@@ -71,24 +77,11 @@ Output reports in Markdown format."""
         """
         logger.info("Generating report", agent=self.config.name)
 
-        prompt = f"""{self.system_prompt}
-
-## STAGE 1 EXTRACTION DATA
-
-```json
-{json.dumps(extraction, indent=2)}
-```
-
-## STAGE 2 FORENSIC DATA
-
-```json
-{json.dumps(forensic_analysis, indent=2)}
-```
-
-Generate a comprehensive patent litigation report based on the above data.
-"""
-
-        response = await self.invoke(prompt)
+        # The Stage 3 prompt is the system prompt; only the data goes in the message
+        response = await self.invoke(
+            "Generate a comprehensive patent litigation report based on the above data.",
+            cached_prefix=self.reference_data(extraction, forensic_analysis),
+        )
         report = self._clean_markdown_response(response)
 
         logger.info("Report generated", agent=self.config.name, length=len(report))
@@ -122,7 +115,10 @@ Generate a comprehensive patent litigation report based on the above data.
             f"- {issue.get('issue', issue)}" for issue in feedback.get("qc_issues", [])
         )
 
+        # The reference data comes first so it shares the cached prefix with
+        # report generation and earlier revisions
         prompt = f"""You are revising a patent litigation report based on QC feedback.
+The Stage 1 extraction and Stage 2 forensic data above are the reference data.
 
 ## ORIGINAL REPORT
 
@@ -132,18 +128,6 @@ Generate a comprehensive patent litigation report based on the above data.
 
 {issues_text}
 
-## REFERENCE DATA
-
-### Stage 1 Extraction
-```json
-{json.dumps(extraction, indent=2)}
-```
-
-### Stage 2 Forensic Analysis
-```json
-{json.dumps(forensic_analysis, indent=2)}
-```
-
 ## INSTRUCTIONS
 
 1. Address each QC issue listed above
@@ -155,7 +139,9 @@ Generate a comprehensive patent litigation report based on the above data.
 Output the complete revised report in Markdown format.
 """
 
-        response = await self.invoke(prompt)
+        response = await self.invoke(
+            prompt, cached_prefix=self.reference_data(extraction, forensic_analysis)
+        )
         revised_report = self._clean_markdown_response(response)
 
         logger.info("Report revised", agent=self.config.name, length=len(revised_report))
@@ -1,5 +1,6 @@
 """FastAPI application factory."""
 
+import asyncio
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
@@ -8,6 +9,8 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from src.api.routes import health, patent_reports
 from src.config import get_settings
+from src.patent_pipeline.services.llm_registry import get_llm_registry
+from src.patent_pipeline.services.upload_cache import get_upload_cache
 
 
 @asynccontextmanager
@@ -16,11 +19,16 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     # Startup
     settings = get_settings()
     print(f"Starting Multi-Agent API on {settings.api_host}:{settings.api_port}")
+    get_llm_registry().preload()
+    upload_sweeper = asyncio.create_task(
+        get_upload_cache().run_sweeper(settings.gemini_upload_sweep_seconds)
+    )
 
     yield
 
     # Shutdown
     print("Shutting down Multi-Agent API")
+    upload_sweeper.cancel()
 
 
 def create_app() -> FastAPI:
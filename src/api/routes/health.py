@@ -2,6 +2,20 @@
 
 from fastapi import APIRouter
 
+from src.patent_pipeline.services.gemini_client import get_context_cache
+from src.patent_pipeline.services.hedging import get_hedger
+from src.patent_pipeline.services.llm_backend import get_llm_backend
+from src.patent_pipeline.services.llm_registry import get_llm_registry
+from src.patent_pipeline.services.model_cascade import get_cascade_metrics
+from src.patent_pipeline.services.output_budget import get_output_budgets
+from src.patent_pipeline.services.output_repair import get_repair_metrics
+from src.patent_pipeline.services.overload_control import get_overload_control
+from src.patent_pipeline.services.provider_router import get_provider_router
+from src.patent_pipeline.services.rate_limiter import get_rate_limiter
+from src.patent_pipeline.services.response_cache import get_response_cache
+from src.patent_pipeline.services.single_flight import get_single_flight
+from src.patent_pipeline.services.upload_cache import get_upload_cache
+
 router = APIRouter()
 
 
@@ -24,3 +38,23 @@ async def readiness_check() -> dict:
             "api": True,
         },
     }
+
+
+@router.get("/metrics/llm")
+async def llm_metrics() -> dict:
+    """LLM client counters (reuse, repairs, limits, hedging, tiers, providers, breakers)."""
+    return {
+        "registry": get_llm_registry().stats(),
+        "uploads": get_upload_cache().stats(),
+        "contexts": get_context_cache().stats(),
+        "responses": get_response_cache().stats(),
+        "repairs": get_repair_metrics().stats(),
+        "rate_limits": get_rate_limiter().stats(),
+        "hedging": get_hedger().stats(),
+        "cascade": get_cascade_metrics().stats(),
+        "providers": get_provider_router().stats(),
+        "overload": get_overload_control().stats(),
+        "backend": get_llm_backend().stats(),
+        "output_budgets": get_output_budgets().stats(),
+        "single_flight": get_single_flight().stats(),
+    }
@@ -1,17 +1,21 @@
 """FastAPI routes for patent litigation report generation."""
 
+import json
 import uuid
+from collections.abc import AsyncIterator
 from typing import Any
 
 import structlog
 from fastapi import APIRouter, BackgroundTasks, HTTPException, status
+from fastapi.responses import StreamingResponse
 
 from src.patent_pipeline.models.requests import (
     GenerateReportRequest,
     GenerateReportResponse,
     PipelineStatusResponse,
 )
-from src.patent_pipeline.graph import run_patent_pipeline
+from src.patent_pipeline.graph import arun_patent_pipeline
+from src.patent_pipeline.services.report_streaming import get_progress_registry
 from src.patent_pipeline.state import PatentPipelineState
 from src.workflows import run_patent_workflow
 
@@ -40,11 +44,11 @@ _jobs: dict[str, dict[str, Any]] = {}
 
     The generated reports are saved to the same Azure container as the input PDFs.
 
-    **Note:** This is a synchronous endpoint that blocks until processing completes.
+    **Note:** This endpoint does not return until processing completes.
     For large documents, consider using the async endpoint instead.
     """,
 )
-def generate_reports(request: GenerateReportRequest) -> GenerateReportResponse:
+async def generate_reports(request: GenerateReportRequest) -> GenerateReportResponse:
     """Generate patent litigation reports synchronously.
 
     Args:
@@ -64,9 +68,10 @@ def generate_reports(request: GenerateReportRequest) -> GenerateReportResponse:
 
     try:
         # Run the pipeline
-        result = run_patent_pipeline(
+        result = await arun_patent_pipeline(
             patent_pdf_url=request.patent_pdf_url,
             history_pdf_url=request.history_pdf_url,
+            bypass_cache=request.bypass_cache,
         )
 
         # Check for failure
@@ -160,6 +165,7 @@ async def generate_reports_async(
         job_id,
         request.patent_pdf_url,
         request.history_pdf_url,
+        bypass_cache=request.bypass_cache,
     )
 
     return PipelineStatusResponse(
@@ -215,11 +221,76 @@ def get_pipeline_status(job_id: str) -> PipelineStatusResponse:
     )
 
 
+@router.get(
+    "/progress/{job_id}",
+    summary="Stream Partial Reports",
+    description="""
+    Stream report text as it is generated, as Server-Sent Events.
+
+    Events are `reset` (full text of a stage's report so far, sent first on
+    connect and when a stage restarts), `chunk` (text appended to a stage's
+    report) and `done` (a stage's report is final). Streaming is available
+    for Stage 3, Stage 4 and Search Intelligence of direct pipeline jobs.
+    """,
+)
+async def stream_progress(job_id: str) -> StreamingResponse:
+    """Stream partial report text of a running job.
+
+    Args:
+        job_id: Job identifier from async generation
+
+    Returns:
+        Server-Sent Events response
+
+    Raises:
+        HTTPException: If no progress is available for the job
+    """
+    progress = get_progress_registry().get(job_id)
+    if progress is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No progress available for job: {job_id}",
+        )
+
+    async def events() -> AsyncIterator[str]:
+        async for event in progress.events():
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@router.get(
+    "/progress/{job_id}/snapshot",
+    summary="Get Partial Reports",
+    description="Get the report text generated so far for each streamed stage.",
+)
+def get_progress_snapshot(job_id: str) -> dict[str, Any]:
+    """Get partial report text of a running job.
+
+    Args:
+        job_id: Job identifier from async generation
+
+    Returns:
+        Report text so far per stage
+
+    Raises:
+        HTTPException: If no progress is available for the job
+    """
+    progress = get_progress_registry().get(job_id)
+    if progress is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No progress available for job: {job_id}",
+        )
+    return progress.snapshot()
+
+
 async def _run_pipeline_background(
     job_id: str,
     patent_pdf_url: str,
     history_pdf_url: str,
     use_agents: bool = False,
+    bypass_cache: bool = False,
 ) -> None:
     """Run pipeline in background task.
 
@@ -228,6 +299,7 @@ async def _run_pipeline_background(
         patent_pdf_url: URL to patent PDF
         history_pdf_url: URL to history PDF
         use_agents: If True, use agent-based workflow; otherwise use direct pipeline
+        bypass_cache: Skip cached LLM responses (direct pipeline only)
     """
     logger.info("Background pipeline started", job_id=job_id, use_agents=use_agents)
 
@@ -244,9 +316,11 @@ async def _run_pipeline_background(
             )
         else:
             # Use the direct pipeline
-            result = run_patent_pipeline(
+            result = await arun_patent_pipeline(
                 patent_pdf_url=patent_pdf_url,
                 history_pdf_url=history_pdf_url,
+                bypass_cache=bypass_cache,
+                job_id=job_id,
             )
 
         if result.get("status") == "failed":
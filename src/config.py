@@ -18,17 +18,114 @@ class Settings(BaseSettings):
     anthropic_api_key: str = ""
     openai_api_key: str = ""
     default_model: str = "claude-sonnet-4-20250514"
+    claude_max_concurrency: int = 8  # in-flight Claude requests per process
+    claude_max_connections: int = 20  # shared HTTP connection pool size
+    claude_prompt_caching: bool = True  # cache system prompts and per-job reference data
 
     # Gemini Configuration
     google_api_key: str = ""
     gemini_model: str = "gemini-1.5-pro"
+    gemini_fast_model: str = "gemini-2.0-flash"  # first tier of cascaded stages
+    gemini_cascade_stages: str = ""  # comma-separated stage keys, e.g. "stage2c,search_intel"
+    gemini_cascade_min_report_chars: int = 1500  # shorter fast-tier reports are escalated
     gemini_temperature: float = 0.3
     gemini_max_output_tokens: int = 8192
+    gemini_max_continuations: int = 3  # follow-up calls for output cut off at the limit
+    gemini_max_concurrency: int = 16  # concurrent blocking SDK calls per process
+    gemini_structured_output: bool = True  # schema-constrained JSON for JSON stages
+    gemini_streaming: bool = True  # stream Stage 3 and Search Intelligence reports
+    gemini_upload_cache_max_entries: int = 64
+    gemini_upload_idle_seconds: int = 6 * 3600  # delete uploads unused for this long
+    gemini_upload_expiry_margin_seconds: int = 3600  # don't reuse files expiring sooner
+    gemini_upload_sweep_seconds: int = 900  # evict idle and expired uploads this often
+    gemini_context_cache_enabled: bool = True
+    gemini_context_cache_ttl_seconds: int = 3600  # (stage prompt, tech pack) prefixes
+    gemini_context_cache_job_ttl_seconds: int = 1800  # per-job Stage 1 prefixes
+    gemini_context_cache_refresh_margin_seconds: int = 300  # extend TTL when this close
+    gemini_context_cache_min_chars: int = 16000  # shorter prefixes are below Gemini's minimum
+    gemini_context_cache_failure_backoff_seconds: int = 600
+
+    # LLM Rate Limits (per provider and model; 0 disables a limit)
+    llm_rate_limit_enabled: bool = True
+    llm_rate_limit_backend: str = "local"  # "local" (per process) or "redis" (shared)
+    gemini_rpm: int = 1000
+    gemini_tpm: int = 4_000_000
+    claude_rpm: int = 50
+    claude_tpm: int = 80_000
+
+    # Agent Provider Failover (move allowed stages off a degraded provider)
+    llm_failover_enabled: bool = True
+    llm_failover_stages: str = "Analyst:claude,Writer:gemini,QC:gemini"  # stage:provider|...
+    llm_failover_error_rate: float = 0.5  # degraded at this error rate
+    llm_failover_p95_latency_seconds: float = 300.0  # degraded at this p95 latency
+    llm_failover_window_seconds: int = 300  # rolling health window
+    llm_failover_min_samples: int = 5  # calls in the window before judging a provider
+
+    # Overload Control (AIMD concurrency limit and circuit breaker per provider/model)
+    llm_overload_control_enabled: bool = True
+    llm_concurrency_initial: int = 16  # starting in-flight call limit
+    llm_concurrency_min: int = 1
+    llm_concurrency_max: int = 64
+    llm_concurrency_latency_target_seconds: float = 180.0  # slower calls count as congestion
+    llm_concurrency_decrease_factor: float = 0.5  # limit multiplier on congestion
+    llm_breaker_failure_rate: float = 0.5  # trip at this overload error rate
+    llm_breaker_window: int = 20  # recent calls considered
+    llm_breaker_min_calls: int = 10  # calls in the window before the breaker can trip
+    llm_breaker_open_seconds: float = 30.0  # reject calls this long before probing
+    llm_breaker_probe_calls: int = 1  # concurrent probes while half open
+    llm_breaker_mode: str = "park"  # "park" (wait for recovery) or "fail_fast"
+    llm_breaker_max_park_seconds: float = 600.0  # parked calls give up after this
+
+    # Output Token Budgets (per-stage limits learned from recent output sizes)
+    llm_output_budgets_enabled: bool = True
+    llm_output_token_caps: str = "Writer:16384,QC:16384"  # stage:tokens hard caps
+    llm_output_token_max: int = 8192  # cap of stages not listed (Gemini 1.5 output limit)
+    llm_output_token_min: int = 1024  # smallest learned budget
+    llm_output_token_headroom: float = 0.25  # fraction added to the learned size
+    llm_output_token_percentile: float = 95.0  # output size percentile budgets cover
+    llm_output_token_min_samples: int = 10  # outputs before a history sets budgets
+    llm_output_token_history_size: int = 200  # outputs kept per stage/tech center/size
+
+    # Hedged Gemini Stage Calls (duplicate a call slower than the stage's usual latency)
+    gemini_hedging_enabled: bool = False
+    gemini_hedge_percentile: float = 95.0  # hedge after this latency percentile
+    gemini_hedge_min_samples: int = 20  # latencies a stage needs before hedging
+    gemini_hedge_history_size: int = 200  # latencies kept per stage
+    gemini_hedge_budget_ratio: float = 0.1  # at most this many hedges per stage call
+
+    # Single-Flight Stage Calls (identical concurrent calls share one request)
+    llm_single_flight_enabled: bool = True
+
+    # Batch Mode (stage calls of many jobs sent through the provider batch API)
+    llm_batch_max_requests: int = 1000  # most requests per submitted batch
+    llm_batch_flush_seconds: float = 300.0  # longest a request waits before submission
+    llm_batch_poll_seconds: float = 60.0  # interval between batch status checks
+    llm_batch_max_concurrent_jobs: int = 50  # jobs running at once in a batch run
+
+    # LLM Backend (live calls, or recording/replaying cassettes for offline runs)
+    llm_backend: str = "live"  # "live", "record" or "replay"
+    llm_cassette_dir: str = "./data/cassettes"
+    llm_cassette_name: str = "recording"  # cassette file written when recording
+    llm_replay_latency: str = "recorded"  # "none", "recorded" or "lognormal"
+    llm_replay_latency_scale: float = 1.0  # multiplier on recorded latencies
+    llm_replay_latency_sigma: float = 0.25  # shape of the lognormal latency model
+
+    # LLM Response Cache (pipeline stage responses)
+    llm_response_cache_backend: str = "disk"  # "disk", "redis" or "none"
+    llm_response_cache_dir: str = "./data/llm_cache"
+    llm_response_cache_ttl_seconds: int = 7 * 24 * 3600
+    llm_response_cache_max_bytes: int = 1024 * 1024 * 1024  # disk backend only
+
+    # Report Streaming
+    report_stream_block_chars: int = 64 * 1024  # staged blob block size; 0 disables staging
+    report_progress_retention_seconds: int = 3600  # keep finished jobs' progress this long
 
     # Azure Storage Configuration
     azure_storage_connection_string: str = ""
     azure_storage_account_url: str = ""
     azure_storage_sas_token: str = ""
+    azure_download_max_workers: int = 8  # concurrent blob downloads per process
+    azure_download_max_concurrency: int = 4  # parallel ranged requests per blob download
 
     # Redis Configuration
     redis_url: str = "redis://localhost:6379/0"
@@ -5,6 +5,19 @@ and prosecution history documents using LangGraph orchestration and Gemini LLM.
 """
 
 from src.patent_pipeline.state import PatentPipelineState
-from src.patent_pipeline.graph import create_patent_pipeline
+from src.patent_pipeline.graph import (
+    arun_patent_pipeline,
+    arun_patent_pipeline_batch,
+    create_patent_pipeline,
+    run_patent_pipeline,
+    run_patent_pipeline_batch,
+)
 
-__all__ = ["PatentPipelineState", "create_patent_pipeline"]
+__all__ = [
+    "PatentPipelineState",
+    "arun_patent_pipeline",
+    "arun_patent_pipeline_batch",
+    "create_patent_pipeline",
+    "run_patent_pipeline",
+    "run_patent_pipeline_batch",
+]
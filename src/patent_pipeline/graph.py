@@ -1,8 +1,22 @@
 """LangGraph pipeline definition for patent litigation reports."""
 
+import asyncio
+import uuid
+
 import structlog
 from langgraph.graph import StateGraph, END
 
+from src.config import get_settings
+from src.patent_pipeline.services.batch_mode import (
+    BatchBackend,
+    BatchScheduler,
+    batch_scope,
+    get_batch_backend,
+)
+from src.patent_pipeline.services.output_budget import budget_profile_scope
+from src.patent_pipeline.services.prompt_fragments import prompt_fragment_scope
+from src.patent_pipeline.services.report_streaming import report_stream_scope
+from src.patent_pipeline.services.usage_accounting import usage_scope
 from src.patent_pipeline.state import PatentPipelineState
 from src.patent_pipeline.nodes import (
     ingest_pdfs_node,
@@ -50,11 +64,9 @@ def create_patent_pipeline() -> StateGraph:
          ↓
     Stage 2A – Claim Construction & Estoppel
          ↓
-    ┌────┴────┐
-    ↓         ↓
-    Stage 2B  Stage 2C (parallel)
-    ↓         ↓
-    └────┬────┘
+    Stage 2B – Search & Technical Premise
+         ↓
+    Stage 2C – Timeline & Global Synthesis
          ↓
     Stage 2 Merge
          ↓
@@ -102,12 +114,11 @@ def create_patent_pipeline() -> StateGraph:
     graph.add_edge("stage1_extraction", "tech_pack_router")
     graph.add_edge("tech_pack_router", "stage2a")
 
-    # Stage 2A -> Stage 2B and Stage 2C (can run in parallel conceptually,
-    # but LangGraph will execute them sequentially by default)
+    # Stage 2A -> Stage 2B -> Stage 2C (2C synthesizes the 2B findings)
     graph.add_edge("stage2a", "stage2b")
     graph.add_edge("stage2b", "stage2c")
 
-    # Stage 2B and 2C -> Stage 2 Merge
+    # Stage 2C -> Stage 2 Merge
     graph.add_edge("stage2c", "stage2_merge")
 
     # Stage 2 Merge -> Stage 3 and Search Intel (parallel branches)
@@ -117,9 +128,8 @@ def create_patent_pipeline() -> StateGraph:
     # Stage 3 -> Stage 4
     graph.add_edge("stage3_report", "stage4_qc")
 
-    # Stage 4 and Search Intel -> Save Reports
-    graph.add_edge("stage4_qc", "save_reports")
-    graph.add_edge("search_intel", "save_reports")
+    # Stage 4 and Search Intel -> Save Reports (runs once, after both branches)
+    graph.add_edge(["stage4_qc", "search_intel"], "save_reports")
 
     # Save Reports -> END
     graph.add_edge("save_reports", END)
@@ -133,15 +143,19 @@ def create_patent_pipeline() -> StateGraph:
 patent_pipeline = create_patent_pipeline()
 
 
-def run_patent_pipeline(
+async def arun_patent_pipeline(
     patent_pdf_url: str,
     history_pdf_url: str,
+    bypass_cache: bool = False,
+    job_id: str | None = None,
 ) -> PatentPipelineState:
-    """Run the patent litigation report pipeline.
+    """Run the patent litigation report pipeline on the current event loop.
 
     Args:
         patent_pdf_url: Azure Blob URL for the issued patent PDF
         history_pdf_url: Azure Blob URL for the prosecution history PDF
+        bypass_cache: Regenerate every stage instead of reusing cached responses
+        job_id: Job identifier for the report progress channel (generated if omitted)
 
     Returns:
         Final pipeline state with report URLs
@@ -150,16 +164,31 @@ def run_patent_pipeline(
         "Starting patent pipeline",
         patent_pdf_url=patent_pdf_url[:50] + "...",
         history_pdf_url=history_pdf_url[:50] + "...",
+        bypass_cache=bypass_cache,
     )
 
     initial_state: PatentPipelineState = {
         "patent_pdf_url": patent_pdf_url,
         "history_pdf_url": history_pdf_url,
+        "bypass_cache": bypass_cache,
         "status": "pending",
     }
 
-    # Run the pipeline
-    result = patent_pipeline.invoke(initial_state)
+    # Run the pipeline (LLM nodes are async, so the graph must be awaited).
+    # Stage artifacts are serialized once per job and shared by all prompts,
+    # every LLM call is accounted to the job, streamed report text is
+    # published on the job's progress channel, and output token budgets
+    # follow the job's tech center and document size.
+    with (
+        prompt_fragment_scope() as fragments,
+        usage_scope() as usage,
+        report_stream_scope(job_id or str(uuid.uuid4())),
+        budget_profile_scope(),
+    ):
+        result = await patent_pipeline.ainvoke(initial_state)
+    fragments.log_report()
+    usage.log_summary()
+    result = {**result, "llm_usage": usage.summary()}
 
     logger.info(
         "Patent pipeline completed",
@@ -170,3 +199,97 @@ def run_patent_pipeline(
     )
 
     return result
+
+
+def run_patent_pipeline(
+    patent_pdf_url: str,
+    history_pdf_url: str,
+    bypass_cache: bool = False,
+) -> PatentPipelineState:
+    """Run the patent litigation report pipeline from synchronous code.
+
+    Must not be called from a running event loop; use
+    ``arun_patent_pipeline`` there instead.
+
+    Args:
+        patent_pdf_url: Azure Blob URL for the issued patent PDF
+        history_pdf_url: Azure Blob URL for the prosecution history PDF
+        bypass_cache: Regenerate every stage instead of reusing cached responses
+
+    Returns:
+        Final pipeline state with report URLs
+    """
+    return asyncio.run(arun_patent_pipeline(patent_pdf_url, history_pdf_url, bypass_cache))
+
+
+async def arun_patent_pipeline_batch(
+    jobs: list[tuple[str, str]],
+    bypass_cache: bool = False,
+    backend: BatchBackend | None = None,
+) -> list[PatentPipelineState]:
+    """Run many pipeline jobs with their text stage calls batched.
+
+    Jobs run concurrently (up to ``llm_batch_max_concurrent_jobs``). Their
+    text-only stage prompts are collected and submitted through the
+    provider's batch endpoint; each job resumes once the batch holding its
+    request completes. Stage 1 (which reads uploaded PDFs), continuations
+    and repairs still run online.
+
+    Args:
+        jobs: (patent PDF URL, prosecution history PDF URL) per job
+        bypass_cache: Regenerate every stage instead of reusing cached responses
+        backend: Batch endpoint (defaults to the configured provider backend)
+
+    Returns:
+        Final state per job, in input order (failed jobs have status "failed")
+    """
+    settings = get_settings()
+    scheduler = BatchScheduler(
+        backend or get_batch_backend(),
+        max_batch_size=settings.llm_batch_max_requests,
+        flush_seconds=settings.llm_batch_flush_seconds,
+        poll_seconds=settings.llm_batch_poll_seconds,
+    )
+    slots = asyncio.Semaphore(settings.llm_batch_max_concurrent_jobs)
+
+    async def run_job(patent_pdf_url: str, history_pdf_url: str) -> PatentPipelineState:
+        async with slots:
+            with scheduler.job():
+                try:
+                    return await arun_patent_pipeline(
+                        patent_pdf_url, history_pdf_url, bypass_cache
+                    )
+                except Exception as e:
+                    logger.error("Batched pipeline job failed", error=str(e))
+                    return {
+                        "patent_pdf_url": patent_pdf_url,
+                        "history_pdf_url": history_pdf_url,
+                        "status": "failed",
+                        "error": str(e),
+                    }
+
+    logger.info("Starting batched patent pipeline run", jobs=len(jobs))
+    with batch_scope(scheduler):
+        async with scheduler.running():
+            results = await asyncio.gather(*(run_job(*job) for job in jobs))
+    logger.info("Batched patent pipeline run completed", jobs=len(jobs), **scheduler.stats)
+    return list(results)
+
+
+def run_patent_pipeline_batch(
+    jobs: list[tuple[str, str]],
+    bypass_cache: bool = False,
+) -> list[PatentPipelineState]:
+    """Run many pipeline jobs in batch mode from synchronous code.
+
+    Must not be called from a running event loop; use
+    ``arun_patent_pipeline_batch`` there instead.
+
+    Args:
+        jobs: (patent PDF URL, prosecution history PDF URL) per job
+        bypass_cache: Regenerate every stage instead of reusing cached responses
+
+    Returns:
+        Final state per job, in input order
+    """
+    return asyncio.run(arun_patent_pipeline_batch(jobs, bypass_cache))
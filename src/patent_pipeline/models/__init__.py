@@ -12,7 +12,12 @@ from src.patent_pipeline.models.stage2 import (
     ConvergenceRow,
 )
 from src.patent_pipeline.models.stage3 import Stage3Report
-from src.patent_pipeline.models.stage4 import Stage4QC, Stage4QCIssue
+from src.patent_pipeline.models.stage4 import (
+    ReportEdit,
+    Stage4QC,
+    Stage4QCIssue,
+    Stage4Output,
+)
 from src.patent_pipeline.models.requests import GenerateReportRequest, GenerateReportResponse
 
 __all__ = [
@@ -30,6 +35,8 @@ __all__ = [
     "Stage3Report",
     "Stage4QC",
     "Stage4QCIssue",
+    "Stage4Output",
+    "ReportEdit",
     "GenerateReportRequest",
     "GenerateReportResponse",
 ]
@@ -20,6 +20,10 @@ class GenerateReportRequest(BaseModel):
         None,
         description="Optional tech center override (e.g., '2100', '2600')",
     )
+    bypass_cache: bool = Field(
+        False,
+        description="Regenerate all stages instead of reusing cached LLM responses",
+    )
 
 
 class GenerateReportResponse(BaseModel):
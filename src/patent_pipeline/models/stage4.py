@@ -72,3 +72,25 @@ class Stage4QC(BaseModel):
     approved_for_delivery: bool = Field(
         False, description="Whether report passes QC for delivery"
     )
+
+
+class ReportEdit(BaseModel):
+    """A correction to the Stage 3 report, applied locally."""
+
+    section: str = Field(
+        "", description="Heading text of the section containing the text ('' for anywhere)"
+    )
+    find: str = Field(
+        ..., description="Exact report text to replace, unique within the section"
+    )
+    replace: str = Field(..., description="Replacement text")
+    issue_id: str = Field("", description="QC issue this edit corrects")
+
+
+class Stage4Output(BaseModel):
+    """Stage 4 structured response: QC results plus edits to the Stage 3 report."""
+
+    qc: Stage4QC = Field(..., description="QC & verification results")
+    edits: list[ReportEdit] = Field(
+        default_factory=list, description="Corrections to apply to the Stage 3 report"
+    )
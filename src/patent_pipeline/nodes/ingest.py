@@ -4,21 +4,22 @@ import structlog
 
 from src.patent_pipeline.state import PatentPipelineState
 from src.patent_pipeline.services.azure_io import (
-    download_blob,
+    download_blobs,
     split_container_and_name,
     get_base_name,
 )
+from src.patent_pipeline.services.output_budget import budget_profile
 
 logger = structlog.get_logger(__name__)
 
 
-def ingest_pdfs_node(state: PatentPipelineState) -> PatentPipelineState:
+async def ingest_pdfs_node(state: PatentPipelineState) -> PatentPipelineState:
     """Download patent and prosecution history PDFs from Azure.
 
     This node:
-    1. Downloads the patent PDF (if URL provided)
-    2. Downloads the prosecution history PDF
-    3. Extracts Azure container URL and base name for later uploads
+    1. Downloads the prosecution history PDF and, if a URL is provided,
+       the patent PDF concurrently
+    2. Extracts Azure container URL and base name for later uploads
 
     Args:
         state: Pipeline state with patent_pdf_url and history_pdf_url
@@ -31,23 +32,25 @@ def ingest_pdfs_node(state: PatentPipelineState) -> PatentPipelineState:
     updates: dict = {"status": "processing"}
 
     try:
-        # Download patent PDF
+        # Prosecution history PDF is required; the patent PDF is optional
+        history_url = state["history_pdf_url"]
         patent_url = state.get("patent_pdf_url")
+        urls = [history_url, patent_url] if patent_url else [history_url]
+        logger.info("Downloading PDFs", count=len(urls))
+        downloaded = await download_blobs(*urls)
+
+        updates["history_pdf_bytes"] = downloaded[0]
         if patent_url:
-            logger.info("Downloading patent PDF")
-            updates["patent_pdf_bytes"] = download_blob(patent_url)
-            logger.info(
-                "Patent PDF downloaded",
-                size_bytes=len(updates["patent_pdf_bytes"]),
-            )
-
-        # Download prosecution history PDF (required)
-        history_url = state["history_pdf_url"]
-        logger.info("Downloading prosecution history PDF")
-        updates["history_pdf_bytes"] = download_blob(history_url)
+            updates["patent_pdf_bytes"] = downloaded[1]
         logger.info(
-            "History PDF downloaded",
-            size_bytes=len(updates["history_pdf_bytes"]),
+            "PDFs downloaded",
+            history_size_bytes=len(updates["history_pdf_bytes"]),
+            patent_size_bytes=len(updates.get("patent_pdf_bytes", b"")),
+        )
+
+        # Output token budgets depend on the document size
+        budget_profile().document_bytes = len(updates["history_pdf_bytes"]) + len(
+            updates.get("patent_pdf_bytes", b"")
         )
 
         # Extract Azure metadata from history URL for later uploads
@@ -5,10 +5,34 @@ import structlog
 
 from src.patent_pipeline.state import PatentPipelineState
 from src.patent_pipeline.services.azure_io import upload_blob
+from src.patent_pipeline.services.report_streaming import job_report_streams, report_blob_name
+from src.patent_pipeline.services.usage_accounting import job_usage
 
 logger = structlog.get_logger(__name__)
 
 
+def _save_markdown(container_url: str, blob_name: str, text: str) -> str:
+    """Save a Markdown report, committing its streamed blocks when they were staged.
+
+    Args:
+        container_url: Output container URL
+        blob_name: Report blob name
+        text: Final report text
+
+    Returns:
+        URL of the saved report
+    """
+    url = job_report_streams().commit(blob_name, text, "text/markdown")
+    if url is not None:
+        return url
+    return upload_blob(
+        container_url=container_url,
+        blob_name=blob_name,
+        content=text.encode("utf-8"),
+        content_type="text/markdown",
+    )
+
+
 def save_reports_node(state: PatentPipelineState) -> PatentPipelineState:
     """Save generated reports to Azure Blob Storage.
 
@@ -17,7 +41,8 @@ def save_reports_node(state: PatentPipelineState) -> PatentPipelineState:
     2. Uploads Stage 4 final report as Markdown
     3. Uploads Stage 4 QC JSON
     4. Uploads Search Intelligence report (if available)
-    5. Updates state with output URLs
+    5. Uploads the job's LLM usage JSON
+    6. Updates state with output URLs and LLM usage
 
     Args:
         state: Pipeline state with reports to save
@@ -40,22 +65,18 @@ def save_reports_node(state: PatentPipelineState) -> PatentPipelineState:
 
         # Save Stage 3 Report
         if state.get("stage3_report_md"):
-            stage3_url = upload_blob(
-                container_url=container_url,
-                blob_name=f"{base_name}_Stage3_Report.md",
-                content=state["stage3_report_md"].encode("utf-8"),
-                content_type="text/markdown",
+            stage3_url = _save_markdown(
+                container_url, report_blob_name(base_name, "stage3"), state["stage3_report_md"]
             )
             updates["stage3_url"] = stage3_url
             logger.info("Stage 3 report saved", url=stage3_url)
 
         # Save Stage 4 Final Report
         if state.get("stage4_final_report_md"):
-            stage4_url = upload_blob(
-                container_url=container_url,
-                blob_name=f"{base_name}_Stage4_Final_Report.md",
-                content=state["stage4_final_report_md"].encode("utf-8"),
-                content_type="text/markdown",
+            stage4_url = _save_markdown(
+                container_url,
+                report_blob_name(base_name, "stage4"),
+                state["stage4_final_report_md"],
             )
             updates["stage4_url"] = stage4_url
             logger.info("Stage 4 final report saved", url=stage4_url)
@@ -72,15 +93,30 @@ def save_reports_node(state: PatentPipelineState) -> PatentPipelineState:
 
         # Save Search Intelligence Report
         if state.get("search_intel_report_md"):
-            search_intel_url = upload_blob(
-                container_url=container_url,
-                blob_name=f"{base_name}_Search_Intelligence_Report.md",
-                content=state["search_intel_report_md"].encode("utf-8"),
-                content_type="text/markdown",
+            search_intel_url = _save_markdown(
+                container_url,
+                report_blob_name(base_name, "search_intel"),
+                state["search_intel_report_md"],
             )
             updates["search_intel_url"] = search_intel_url
             logger.info("Search Intelligence report saved", url=search_intel_url)
 
+        # Save LLM usage (all LLM calls are done by this node)
+        usage = job_usage().summary()
+        updates["llm_usage"] = usage
+        usage_url = upload_blob(
+            container_url=container_url,
+            blob_name=f"{base_name}_LLM_Usage.json",
+            content=json.dumps(usage, indent=2).encode("utf-8"),
+            content_type="application/json",
+        )
+        logger.info(
+            "LLM usage saved",
+            url=usage_url,
+            calls=usage["totals"]["calls"],
+            cost_usd=usage["totals"]["cost_usd"],
+        )
+
         # Mark pipeline as completed
         updates["status"] = "completed"
 
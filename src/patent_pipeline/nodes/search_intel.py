@@ -4,11 +4,12 @@ import structlog
 
 from src.patent_pipeline.state import PatentPipelineState
 from src.patent_pipeline.services.gemini_client import GeminiClient
+from src.patent_pipeline.services.report_streaming import job_report_streams
 
 logger = structlog.get_logger(__name__)
 
 
-def search_intel_node(state: PatentPipelineState) -> PatentPipelineState:
+async def search_intel_node(state: PatentPipelineState) -> PatentPipelineState:
     """Execute Search Intelligence Module (Pipeline 2).
 
     This node:
@@ -19,7 +20,8 @@ def search_intel_node(state: PatentPipelineState) -> PatentPipelineState:
         state: Pipeline state with stage1_extraction and stage2_forensic
 
     Returns:
-        Updated state with search_intel_report_md
+        State updates with search_intel_report_md (only the updates: this
+        node runs in parallel with Stage 3)
     """
     logger.info("Starting Search Intelligence Module")
 
@@ -38,9 +40,12 @@ def search_intel_node(state: PatentPipelineState) -> PatentPipelineState:
         if not stage1 or not stage2_forensic:
             logger.warning("Missing required data for Search Intelligence")
             updates["search_intel_report_md"] = None
-            return {**state, **updates}
+            return updates
 
-        client = GeminiClient()
+        client = GeminiClient(bypass_cache=state.get("bypass_cache", False))
+        stream = job_report_streams().open(
+            "search_intel", state.get("azure_container_url"), state.get("base_name")
+        )
 
         # Extract data needed for search intel
         search_records = stage1.get("search_records", {})
@@ -49,13 +54,15 @@ def search_intel_node(state: PatentPipelineState) -> PatentPipelineState:
         tech_pack_content = state.get("tech_pack_content", "")
 
         # Call Search Intelligence
-        report_md = client.call_search_intel(
+        report_md = await client.call_search_intel(
             search_records=search_records,
             convergence_rows=convergence_rows,
             technical_reps=technical_reps,
             tech_pack_content=tech_pack_content,
+            stream=stream,
         )
 
+        await stream.finish(report_md)
         updates["search_intel_report_md"] = report_md
 
         logger.info(
@@ -70,4 +77,4 @@ def search_intel_node(state: PatentPipelineState) -> PatentPipelineState:
         updates["search_intel_report_md"] = None
         logger.warning("Continuing pipeline without Search Intelligence report")
 
-    return {**state, **updates}
+    return updates
@@ -9,7 +9,7 @@ from src.patent_pipeline.models.stage1 import Stage1Extraction
 logger = structlog.get_logger(__name__)
 
 
-def stage1_extraction_node(state: PatentPipelineState) -> PatentPipelineState:
+async def stage1_extraction_node(state: PatentPipelineState) -> PatentPipelineState:
     """Execute Stage 1 - Record Extraction.
 
     This node:
@@ -33,10 +33,10 @@ def stage1_extraction_node(state: PatentPipelineState) -> PatentPipelineState:
         return state
 
     try:
-        client = GeminiClient()
+        client = GeminiClient(bypass_cache=state.get("bypass_cache", False))
 
         # Call Stage 1
-        result = client.call_stage1(
+        result = await client.call_stage1(
             history_pdf_bytes=state["history_pdf_bytes"],
             patent_pdf_bytes=state.get("patent_pdf_bytes"),
         )
@@ -9,7 +9,7 @@ from src.patent_pipeline.models.stage2 import Stage2A
 logger = structlog.get_logger(__name__)
 
 
-def stage2a_node(state: PatentPipelineState) -> PatentPipelineState:
+async def stage2a_node(state: PatentPipelineState) -> PatentPipelineState:
     """Execute Stage 2A - Claim Construction & Estoppel.
 
     This node:
@@ -33,10 +33,10 @@ def stage2a_node(state: PatentPipelineState) -> PatentPipelineState:
         return state
 
     try:
-        client = GeminiClient()
+        client = GeminiClient(bypass_cache=state.get("bypass_cache", False))
 
         # Call Stage 2A
-        result = client.call_stage2a(
+        result = await client.call_stage2a(
             stage1_extraction=state["stage1_extraction"],
             tech_pack_content=state.get("tech_pack_content", ""),
         )
@@ -9,7 +9,7 @@ from src.patent_pipeline.models.stage2 import Stage2B
 logger = structlog.get_logger(__name__)
 
 
-def stage2b_node(state: PatentPipelineState) -> PatentPipelineState:
+async def stage2b_node(state: PatentPipelineState) -> PatentPipelineState:
     """Execute Stage 2B - Search & Technical Premise.
 
     This node:
@@ -34,10 +34,10 @@ def stage2b_node(state: PatentPipelineState) -> PatentPipelineState:
         return state
 
     try:
-        client = GeminiClient()
+        client = GeminiClient(bypass_cache=state.get("bypass_cache", False))
 
         # Call Stage 2B
-        result = client.call_stage2b(
+        result = await client.call_stage2b(
             stage1_extraction=state["stage1_extraction"],
             stage2a=state["stage2a"],
             tech_pack_content=state.get("tech_pack_content", ""),
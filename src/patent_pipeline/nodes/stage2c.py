@@ -9,7 +9,7 @@ from src.patent_pipeline.models.stage2 import Stage2C
 logger = structlog.get_logger(__name__)
 
 
-def stage2c_node(state: PatentPipelineState) -> PatentPipelineState:
+async def stage2c_node(state: PatentPipelineState) -> PatentPipelineState:
     """Execute Stage 2C - Timeline & Global Synthesis.
 
     This node:
@@ -33,10 +33,10 @@ def stage2c_node(state: PatentPipelineState) -> PatentPipelineState:
         return state
 
     try:
-        client = GeminiClient()
+        client = GeminiClient(bypass_cache=state.get("bypass_cache", False))
 
         # Call Stage 2C
-        result = client.call_stage2c(
+        result = await client.call_stage2c(
             stage1_extraction=state["stage1_extraction"],
             stage2a=state["stage2a"],
             stage2b=state["stage2b"],
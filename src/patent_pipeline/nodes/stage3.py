@@ -4,11 +4,12 @@ import structlog
 
 from src.patent_pipeline.state import PatentPipelineState
 from src.patent_pipeline.services.gemini_client import GeminiClient
+from src.patent_pipeline.services.report_streaming import job_report_streams
 
 logger = structlog.get_logger(__name__)
 
 
-def stage3_report_node(state: PatentPipelineState) -> PatentPipelineState:
+async def stage3_report_node(state: PatentPipelineState) -> PatentPipelineState:
     """Execute Stage 3 - Report Generation.
 
     This node:
@@ -19,7 +20,8 @@ def stage3_report_node(state: PatentPipelineState) -> PatentPipelineState:
         state: Pipeline state with stage1_extraction and stage2_forensic
 
     Returns:
-        Updated state with stage3_report_md
+        State updates with stage3_report_md (only the updates: this node
+        runs in parallel with Search Intelligence)
     """
     logger.info("Starting Stage 3 - Report Generation")
 
@@ -28,17 +30,22 @@ def stage3_report_node(state: PatentPipelineState) -> PatentPipelineState:
     # Check for previous errors
     if state.get("status") == "failed":
         logger.warning("Skipping Stage 3 due to previous failure")
-        return state
+        return {}
 
     try:
-        client = GeminiClient()
+        client = GeminiClient(bypass_cache=state.get("bypass_cache", False))
+        stream = job_report_streams().open(
+            "stage3", state.get("azure_container_url"), state.get("base_name")
+        )
 
         # Call Stage 3
-        report_md = client.call_stage3(
+        report_md = await client.call_stage3(
             stage1_extraction=state["stage1_extraction"],
             stage2_forensic=state["stage2_forensic"],
+            stream=stream,
         )
 
+        await stream.finish(report_md)
         updates["stage3_report_md"] = report_md
 
         logger.info(
@@ -52,4 +59,4 @@ def stage3_report_node(state: PatentPipelineState) -> PatentPipelineState:
         updates["error"] = f"Stage 3 failed: {str(e)}"
         updates["status"] = "failed"
 
-    return {**state, **updates}
+    return updates
@@ -4,17 +4,18 @@ import structlog
 
 from src.patent_pipeline.state import PatentPipelineState
 from src.patent_pipeline.services.gemini_client import GeminiClient
+from src.patent_pipeline.services.report_streaming import job_report_streams
 from src.patent_pipeline.models.stage4 import Stage4QC
 
 logger = structlog.get_logger(__name__)
 
 
-def stage4_qc_node(state: PatentPipelineState) -> PatentPipelineState:
+async def stage4_qc_node(state: PatentPipelineState) -> PatentPipelineState:
     """Execute Stage 4 - QC & Verification.
 
     This node:
     1. Verifies Stage 3 report against source data
-    2. Identifies and corrects issues
+    2. Identifies issues and applies the model's corrections to the report
     3. Updates state with stage4_qc_json and stage4_final_report_md
 
     Args:
@@ -33,10 +34,10 @@ def stage4_qc_node(state: PatentPipelineState) -> PatentPipelineState:
         return state
 
     try:
-        client = GeminiClient()
+        client = GeminiClient(bypass_cache=state.get("bypass_cache", False))
 
-        # Call Stage 4
-        qc_json, final_report_md = client.call_stage4(
+        # Call Stage 4 (the final report is the Stage 3 report with QC edits applied)
+        qc_json, final_report_md = await client.call_stage4(
             stage1_extraction=state["stage1_extraction"],
             stage2_forensic=state["stage2_forensic"],
             stage3_report_md=state["stage3_report_md"],
@@ -53,6 +54,8 @@ def stage4_qc_node(state: PatentPipelineState) -> PatentPipelineState:
             )
 
         updates["stage4_qc_json"] = qc_json
+        # Not streamed (nothing to stage); subscribers still get the final report
+        job_report_streams().progress.complete("stage4", final_report_md)
         updates["stage4_final_report_md"] = final_report_md
 
         # Log QC metrics
@@ -63,6 +66,8 @@ def stage4_qc_node(state: PatentPipelineState) -> PatentPipelineState:
             issues_corrected=metrics.get("issues_corrected", 0),
             overall_score=metrics.get("overall_quality_score", 0),
             approved=qc_json.get("approved_for_delivery", False),
+            edits_applied=qc_json.get("edits_applied", 0),
+            edit_conflicts=len(qc_json.get("edit_conflicts", [])),
             final_report_length=len(final_report_md),
         )
 
@@ -4,6 +4,7 @@ import structlog
 
 from src.patent_pipeline.state import PatentPipelineState
 from src.patent_pipeline.services.gemini_client import load_tech_pack
+from src.patent_pipeline.services.output_budget import budget_profile
 
 logger = structlog.get_logger(__name__)
 
@@ -54,6 +55,7 @@ def tech_pack_router_node(state: PatentPipelineState) -> PatentPipelineState:
             logger.warning("Could not determine tech center, defaulting to 2100")
 
         updates["tech_center"] = tech_center
+        budget_profile().tech_center = tech_center
 
         # Load tech pack
         tech_pack_content = load_tech_pack(tech_center)
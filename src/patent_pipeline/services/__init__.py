@@ -2,16 +2,183 @@
 
 from src.patent_pipeline.services.azure_io import (
     download_blob,
+    download_blobs,
     upload_blob,
+    upload_report,
     split_container_and_name,
     AzureBlobService,
 )
-from src.patent_pipeline.services.gemini_client import GeminiClient
+from src.patent_pipeline.services.batch_mode import (
+    BatchBackend,
+    BatchScheduler,
+    GeminiBatchBackend,
+    LocalBatchServer,
+    batch_scope,
+    current_batch_scheduler,
+)
+from src.patent_pipeline.services.gemini_client import (
+    ContextCacheManager,
+    GeminiClient,
+    get_context_cache,
+)
+from src.patent_pipeline.services.hedging import Hedger, get_hedger
+from src.patent_pipeline.services.llm_backend import (
+    CassetteMissError,
+    LiveLLMBackend,
+    LLMBackend,
+    LLMRequest,
+    RecordingLLMBackend,
+    ReplayLLMBackend,
+    get_llm_backend,
+)
+from src.patent_pipeline.services.llm_registry import LLMRegistry, get_llm_registry
+from src.patent_pipeline.services.model_cascade import (
+    CascadePolicy,
+    cascade_policy,
+    get_cascade_metrics,
+)
+from src.patent_pipeline.services.output_budget import (
+    BudgetProfile,
+    OutputBudgets,
+    budget_profile,
+    budget_profile_scope,
+    get_output_budgets,
+)
+from src.patent_pipeline.services.output_repair import (
+    OutputRepairError,
+    get_repair_metrics,
+    is_transient_error,
+    repair_json_text,
+)
+from src.patent_pipeline.services.overload_control import (
+    AdaptiveConcurrency,
+    CircuitBreaker,
+    CircuitOpenError,
+    OverloadControl,
+    get_overload_control,
+)
+from src.patent_pipeline.services.prompt_fragments import (
+    PromptFragments,
+    job_fragments,
+    prompt_fragment_scope,
+)
+from src.patent_pipeline.services.provider_router import (
+    ProviderRouter,
+    get_provider_router,
+    is_provider_error,
+)
+from src.patent_pipeline.services.rate_limiter import (
+    LocalRateLimitBackend,
+    RateLimit,
+    RateLimiter,
+    RedisRateLimitBackend,
+    get_rate_limiter,
+)
+from src.patent_pipeline.services.usage_accounting import (
+    JobUsage,
+    job_usage,
+    record_llm_call,
+    usage_scope,
+)
+from src.patent_pipeline.services.single_flight import SingleFlight, get_single_flight
+from src.patent_pipeline.services.structured_output import (
+    gemini_response_schema,
+    parse_structured,
+)
+from src.patent_pipeline.services.report_edits import (
+    EditConflict,
+    EditResult,
+    apply_report_edits,
+    mark_corrected_issues,
+)
+from src.patent_pipeline.services.report_streaming import (
+    ReportProgress,
+    ReportStream,
+    get_progress_registry,
+    job_report_streams,
+    report_stream_scope,
+)
+from src.patent_pipeline.services.response_cache import (
+    DiskResponseCache,
+    RedisResponseCache,
+    ResponseCache,
+    get_response_cache,
+)
 
 __all__ = [
     "download_blob",
+    "download_blobs",
     "upload_blob",
+    "upload_report",
     "split_container_and_name",
     "AzureBlobService",
+    "BatchBackend",
+    "BatchScheduler",
+    "GeminiBatchBackend",
+    "LocalBatchServer",
+    "batch_scope",
+    "current_batch_scheduler",
     "GeminiClient",
+    "ContextCacheManager",
+    "get_context_cache",
+    "LLMBackend",
+    "LLMRequest",
+    "LiveLLMBackend",
+    "RecordingLLMBackend",
+    "ReplayLLMBackend",
+    "CassetteMissError",
+    "get_llm_backend",
+    "LLMRegistry",
+    "get_llm_registry",
+    "OutputBudgets",
+    "BudgetProfile",
+    "budget_profile",
+    "budget_profile_scope",
+    "get_output_budgets",
+    "OutputRepairError",
+    "get_repair_metrics",
+    "is_transient_error",
+    "repair_json_text",
+    "AdaptiveConcurrency",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "OverloadControl",
+    "get_overload_control",
+    "PromptFragments",
+    "job_fragments",
+    "prompt_fragment_scope",
+    "RateLimiter",
+    "RateLimit",
+    "LocalRateLimitBackend",
+    "RedisRateLimitBackend",
+    "get_rate_limiter",
+    "Hedger",
+    "get_hedger",
+    "CascadePolicy",
+    "cascade_policy",
+    "get_cascade_metrics",
+    "ProviderRouter",
+    "get_provider_router",
+    "is_provider_error",
+    "SingleFlight",
+    "get_single_flight",
+    "EditConflict",
+    "EditResult",
+    "apply_report_edits",
+    "mark_corrected_issues",
+    "ReportProgress",
+    "ReportStream",
+    "get_progress_registry",
+    "job_report_streams",
+    "report_stream_scope",
+    "ResponseCache",
+    "DiskResponseCache",
+    "RedisResponseCache",
+    "get_response_cache",
+    "JobUsage",
+    "job_usage",
+    "record_llm_call",
+    "usage_scope",
+    "gemini_response_schema",
+    "parse_structured",
 ]
@@ -1,8 +1,13 @@
 """Azure Blob Storage I/O service for patent pipeline."""
 
-import structlog
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse, parse_qs
-from azure.storage.blob import BlobClient, BlobServiceClient, ContentSettings
+
+import structlog
+from azure.storage.blob import BlobBlock, BlobClient, BlobServiceClient, ContentSettings
 from azure.core.exceptions import AzureError
 
 from src.config import get_settings
@@ -62,6 +67,9 @@ class AzureBlobService:
 def download_blob(url: str) -> bytes:
     """Download blob content from an Azure Blob URL.
 
+    Large blobs are read as ``azure_download_max_concurrency`` parallel
+    ranged requests. The download's duration and throughput are logged.
+
     Args:
         url: Full Azure Blob URL (may include SAS token)
 
@@ -74,15 +82,65 @@ def download_blob(url: str) -> bytes:
     logger.info("Downloading blob", url=_sanitize_url(url))
 
     try:
+        started = time.monotonic()
         blob_client = BlobClient.from_blob_url(url)
-        data = blob_client.download_blob().readall()
-        logger.info("Blob downloaded successfully", size_bytes=len(data))
+        data = blob_client.download_blob(
+            max_concurrency=get_settings().azure_download_max_concurrency
+        ).readall()
+        seconds = time.monotonic() - started
+        logger.info(
+            "Blob downloaded successfully",
+            url=_sanitize_url(url),
+            size_bytes=len(data),
+            seconds=round(seconds, 3),
+            mb_per_second=round(len(data) / (1024 * 1024) / seconds, 2) if seconds > 0 else None,
+        )
         return data
     except AzureError as e:
         logger.error("Failed to download blob", error=str(e), url=_sanitize_url(url))
         raise
 
 
+# Shared executor for blocking blob downloads
+_download_executor: ThreadPoolExecutor | None = None
+_download_executor_lock = threading.Lock()
+
+
+def _get_download_executor() -> ThreadPoolExecutor:
+    """Get or create the process-wide executor for blob downloads."""
+    global _download_executor
+    if _download_executor is None:
+        with _download_executor_lock:
+            if _download_executor is None:
+                _download_executor = ThreadPoolExecutor(
+                    max_workers=get_settings().azure_download_max_workers,
+                    thread_name_prefix="blob-download",
+                )
+    return _download_executor
+
+
+async def download_blobs(*urls: str) -> list[bytes]:
+    """Download several blobs concurrently without blocking the event loop.
+
+    Downloads run on a bounded shared executor, so concurrent jobs cannot
+    open an unbounded number of transfers.
+
+    Args:
+        *urls: Full Azure Blob URLs (may include SAS tokens)
+
+    Returns:
+        Blob contents, in the order of ``urls``
+
+    Raises:
+        AzureError: If any download fails
+    """
+    loop = asyncio.get_running_loop()
+    executor = _get_download_executor()
+    return list(
+        await asyncio.gather(*(loop.run_in_executor(executor, download_blob, url) for url in urls))
+    )
+
+
 def upload_blob(
     container_url: str,
     blob_name: str,
@@ -103,17 +161,7 @@ def upload_blob(
     Raises:
         AzureError: If upload fails
     """
-    # Construct blob URL from container URL
-    parsed = urlparse(container_url)
-
-    # Extract SAS token if present
-    sas_token = ""
-    if parsed.query:
-        sas_token = f"?{parsed.query}"
-
-    # Build blob URL
-    base_container = f"{parsed.scheme}://{parsed.netloc}{parsed.path.rstrip('/')}"
-    blob_url = f"{base_container}/{blob_name}{sas_token}"
+    blob_url, result_url = _blob_urls(container_url, blob_name)
 
     logger.info("Uploading blob", blob_name=blob_name, content_type=content_type)
 
@@ -129,7 +177,6 @@ def upload_blob(
         )
 
         # Return URL without SAS token
-        result_url = f"{base_container}/{blob_name}"
         logger.info("Blob uploaded successfully", url=result_url)
         return result_url
 
@@ -138,6 +185,114 @@ def upload_blob(
         raise
 
 
+def upload_report(content: str, blob_path: str, container_url: str | None = None) -> str:
+    """Upload a text report, deriving its content type from the file extension.
+
+    Args:
+        content: Report text
+        blob_path: Blob name, or "container/blob" when ``container_url`` is omitted
+        container_url: Container URL (defaults to the configured storage account,
+            using the first segment of ``blob_path`` as the container)
+
+    Returns:
+        URL of the uploaded report (without SAS token)
+
+    Raises:
+        ValueError: If no container URL is given and no storage account is configured
+        AzureError: If upload fails
+    """
+    blob_name = blob_path
+    if container_url is None:
+        settings = get_settings()
+        if not settings.azure_storage_account_url:
+            raise ValueError("No container URL given and AZURE_STORAGE_ACCOUNT_URL is not set")
+        container, _, blob_name = blob_path.partition("/")
+        if not blob_name:
+            raise ValueError(f"Report path must be 'container/blob': {blob_path}")
+        container_url = f"{settings.azure_storage_account_url.rstrip('/')}/{container}"
+        if settings.azure_storage_sas_token:
+            container_url += f"?{settings.azure_storage_sas_token.lstrip('?')}"
+
+    content_type = "application/json" if blob_name.endswith(".json") else "text/markdown"
+    return upload_blob(container_url, blob_name, content.encode("utf-8"), content_type)
+
+
+def stage_blob_block(container_url: str, blob_name: str, block_id: str, data: bytes) -> None:
+    """Stage one uncommitted block of a block blob.
+
+    Staged blocks are invisible until ``commit_blob_blocks`` is called;
+    uncommitted blocks are discarded by Azure after a week.
+
+    Args:
+        container_url: Container URL (with or without SAS token)
+        blob_name: Name of the blob
+        block_id: Block ID (all IDs of a blob must have the same length)
+        data: Block content
+
+    Raises:
+        AzureError: If staging fails
+    """
+    blob_url, _ = _blob_urls(container_url, blob_name)
+    BlobClient.from_blob_url(blob_url).stage_block(block_id=block_id, data=data)
+
+
+def commit_blob_blocks(
+    container_url: str,
+    blob_name: str,
+    block_ids: list[str],
+    content_type: str = "application/octet-stream",
+) -> str:
+    """Commit staged blocks as the blob's content, replacing any existing content.
+
+    Args:
+        container_url: Container URL (with or without SAS token)
+        blob_name: Name of the blob
+        block_ids: Staged block IDs in content order
+        content_type: MIME type of the content
+
+    Returns:
+        URL of the committed blob (without SAS token)
+
+    Raises:
+        AzureError: If the commit fails
+    """
+    blob_url, result_url = _blob_urls(container_url, blob_name)
+
+    try:
+        BlobClient.from_blob_url(blob_url).commit_block_list(
+            [BlobBlock(block_id=block_id) for block_id in block_ids],
+            content_settings=ContentSettings(content_type=content_type),
+        )
+        logger.info("Blob committed from staged blocks", url=result_url, blocks=len(block_ids))
+        return result_url
+
+    except AzureError as e:
+        logger.error("Failed to commit blob blocks", error=str(e), blob_name=blob_name)
+        raise
+
+
+def _blob_urls(container_url: str, blob_name: str) -> tuple[str, str]:
+    """Build a blob's URL from its container URL.
+
+    Args:
+        container_url: Container URL (with or without SAS token)
+        blob_name: Name of the blob
+
+    Returns:
+        Tuple of (blob URL with the container's SAS token, blob URL without it)
+    """
+    parsed = urlparse(container_url)
+
+    # Extract SAS token if present
+    sas_token = ""
+    if parsed.query:
+        sas_token = f"?{parsed.query}"
+
+    base_container = f"{parsed.scheme}://{parsed.netloc}{parsed.path.rstrip('/')}"
+    result_url = f"{base_container}/{blob_name}"
+    return f"{result_url}{sas_token}", result_url
+
+
 def split_container_and_name(blob_url: str) -> tuple[str, str]:
     """Split a blob URL into container URL and blob name.
 
@@ -0,0 +1,485 @@
+"""Batch execution of stage calls through provider batch endpoints.
+
+In batch mode, stage prompts from many concurrently running jobs are
+queued, submitted together as provider batches and polled until they
+complete. Each job's graph simply awaits its stage call, so it resumes as
+soon as the batch holding its request has finished.
+"""
+
+import asyncio
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any
+
+import httpx
+import structlog
+
+from src.config import get_settings
+
+logger = structlog.get_logger(__name__)
+
+GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta"
+
+# Batch requests are billed at half the online list price
+BATCH_PRICE_FACTOR = 0.5
+
+
+class BatchRequestError(ConnectionError):
+    """A batched request produced no result (batch failed, expired or dropped it).
+
+    Subclasses ``ConnectionError`` so stage calls retry it like a transport error.
+    """
+
+
+@dataclass
+class BatchRequest:
+    """One generate request inside a batch."""
+
+    model: str
+    contents: list[dict[str, Any]]
+    generation_config: dict[str, Any] | None = None
+    stage: str = "unknown"
+    custom_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    job: str | None = None  # scheduler job the request belongs to
+
+
+@dataclass
+class BatchResult:
+    """Result of one batched request."""
+
+    custom_id: str
+    text: str = ""
+    finish_reason: str = "STOP"
+    input_tokens: int = 0
+    output_tokens: int = 0
+    error: str | None = None
+
+
+def batch_contents(contents: Any) -> list[dict[str, Any]] | None:
+    """Convert request contents to batch request turns.
+
+    Args:
+        contents: Prompt string, list of text parts, or role/parts turns
+
+    Returns:
+        Request turns, or None if the contents cannot be batched (e.g.
+        they reference uploaded files)
+    """
+    if isinstance(contents, str):
+        return [{"role": "user", "parts": [{"text": contents}]}]
+    if not isinstance(contents, list) or not contents:
+        return None
+    if all(isinstance(part, str) for part in contents):
+        return [{"role": "user", "parts": [{"text": part} for part in contents]}]
+    turns = []
+    for turn in contents:
+        parts = turn.get("parts") if isinstance(turn, dict) else None
+        if not isinstance(parts, list) or not all(isinstance(p, str) for p in parts):
+            return None
+        turns.append({"role": turn.get("role", "user"), "parts": [{"text": p} for p in parts]})
+    return turns
+
+
+def batch_response(result: BatchResult) -> Any:
+    """Wrap a batch result in the shape of a Gemini response."""
+    return SimpleNamespace(
+        text=result.text,
+        candidates=[SimpleNamespace(finish_reason=result.finish_reason)],
+        usage_metadata=SimpleNamespace(
+            prompt_token_count=result.input_tokens,
+            candidates_token_count=result.output_tokens,
+            cached_content_token_count=0,
+            total_token_count=result.input_tokens + result.output_tokens,
+        ),
+    )
+
+
+class BatchBackend(ABC):
+    """Provider batch endpoint."""
+
+    name = "base"
+
+    @abstractmethod
+    async def submit(self, requests: list[BatchRequest]) -> str:
+        """Submit requests as one batch.
+
+        Args:
+            requests: Requests to run
+
+        Returns:
+            Batch identifier
+        """
+
+    @abstractmethod
+    async def poll(self, batch_id: str) -> str:
+        """Get a batch's state: "running", "succeeded" or "failed"."""
+
+    @abstractmethod
+    async def results(self, batch_id: str) -> list[BatchResult]:
+        """Get the results of a succeeded batch."""
+
+
+class LocalBatchServer(BatchBackend):
+    """In-process stand-in for a provider batch endpoint.
+
+    Batches complete ``completion_seconds`` after submission; each request
+    is answered by ``responder`` (a function of the request returning the
+    response text or a ``BatchResult``). Used to exercise batch scheduling
+    and job resumption offline.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        responder: Callable[[BatchRequest], str | BatchResult],
+        completion_seconds: float = 0.0,
+    ) -> None:
+        """Initialize the stand-in server.
+
+        Args:
+            responder: Produces each request's response
+            completion_seconds: Time from submission to completion
+        """
+        self.responder = responder
+        self.completion_seconds = completion_seconds
+        self.batches: dict[str, tuple[float, list[BatchRequest]]] = {}
+        self.polls = 0
+
+    async def submit(self, requests: list[BatchRequest]) -> str:
+        batch_id = f"batches/local-{len(self.batches) + 1}"
+        self.batches[batch_id] = (time.monotonic(), list(requests))
+        return batch_id
+
+    async def poll(self, batch_id: str) -> str:
+        self.polls += 1
+        submitted, _ = self.batches[batch_id]
+        done = time.monotonic() - submitted >= self.completion_seconds
+        return "succeeded" if done else "running"
+
+    async def results(self, batch_id: str) -> list[BatchResult]:
+        results = []
+        for request in self.batches[batch_id][1]:
+            answer = self.responder(request)
+            if isinstance(answer, BatchResult):
+                answer.custom_id = request.custom_id
+                results.append(answer)
+            else:
+                results.append(BatchResult(custom_id=request.custom_id, text=answer))
+        return results
+
+
+_GEMINI_STATES = {
+    "BATCH_STATE_SUCCEEDED": "succeeded",
+    "BATCH_STATE_FAILED": "failed",
+    "BATCH_STATE_CANCELLED": "failed",
+    "BATCH_STATE_EXPIRED": "failed",
+}
+
+
+class GeminiBatchBackend(BatchBackend):
+    """Gemini API batch mode with inline requests (REST)."""
+
+    name = "gemini"
+
+    def __init__(self, api_key: str, base_url: str = GEMINI_API_URL) -> None:
+        """Initialize the backend.
+
+        Args:
+            api_key: Gemini API key
+            base_url: API base URL
+        """
+        self.api_key = api_key
+        self.base_url = base_url
+        self._operations: dict[str, dict[str, Any]] = {}
+
+    async def _request(self, method: str, path: str, **kwargs: Any) -> dict[str, Any]:
+        """Call the REST API and return the JSON body."""
+        async with httpx.AsyncClient(timeout=60) as client:
+            response = await client.request(
+                method, f"{self.base_url}/{path}", params={"key": self.api_key}, **kwargs
+            )
+            response.raise_for_status()
+            return response.json()
+
+    async def submit(self, requests: list[BatchRequest]) -> str:
+        models = {request.model for request in requests}
+        if len(models) != 1:
+            raise ValueError(f"A Gemini batch must use one model, got {sorted(models)}")
+        inline = []
+        for request in requests:
+            body: dict[str, Any] = {"contents": request.contents}
+            if request.generation_config:
+                body["generation_config"] = request.generation_config
+            inline.append({"request": body, "metadata": {"key": request.custom_id}})
+        operation = await self._request(
+            "POST",
+            f"models/{models.pop()}:batchGenerateContent",
+            json={
+                "batch": {
+                    "display_name": f"patent-pipeline-{uuid.uuid4().hex[:8]}",
+                    "input_config": {"requests": {"requests": inline}},
+                }
+            },
+        )
+        return operation["name"]
+
+    async def poll(self, batch_id: str) -> str:
+        operation = await self._request("GET", batch_id)
+        self._operations[batch_id] = operation
+        state = operation.get("metadata", {}).get("state", "")
+        return _GEMINI_STATES.get(state, "running")
+
+    async def results(self, batch_id: str) -> list[BatchResult]:
+        operation = self._operations.pop(batch_id, None) or await self._request("GET", batch_id)
+        output = operation.get("response", {}).get("inlinedResponses", {})
+        results = []
+        for item in output.get("inlinedResponses", []):
+            custom_id = item.get("metadata", {}).get("key", "")
+            if "error" in item:
+                results.append(BatchResult(custom_id, error=str(item["error"])))
+                continue
+            response = item.get("response", {})
+            candidate = (response.get("candidates") or [{}])[0]
+            parts = candidate.get("content", {}).get("parts", [])
+            usage = response.get("usageMetadata", {})
+            results.append(
+                BatchResult(
+                    custom_id=custom_id,
+                    text="".join(part.get("text", "") for part in parts),
+                    finish_reason=candidate.get("finishReason", "STOP"),
+                    input_tokens=usage.get("promptTokenCount", 0),
+                    output_tokens=usage.get("candidatesTokenCount", 0),
+                )
+            )
+        return results
+
+
+class BatchScheduler:
+    """Collect stage requests across jobs and run them as provider batches.
+
+    Queued requests are submitted as one batch per model when the queue
+    reaches ``max_batch_size``, when every running job (see ``job``) is
+    waiting on a request (nothing else can make progress), or ``flush_seconds`` after
+    the oldest request was queued. Submitted batches are polled every
+    ``poll_seconds`` and each request's caller is resumed with its result.
+    """
+
+    def __init__(
+        self,
+        backend: BatchBackend,
+        max_batch_size: int = 1000,
+        flush_seconds: float = 300.0,
+        poll_seconds: float = 60.0,
+    ) -> None:
+        """Initialize the scheduler.
+
+        Args:
+            backend: Provider batch endpoint
+            max_batch_size: Most requests per batch
+            flush_seconds: Longest time a request waits before submission
+            poll_seconds: Interval between batch status checks
+        """
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.flush_seconds = flush_seconds
+        self.poll_seconds = poll_seconds
+        self.active_jobs = 0
+        self._pending: list[tuple[BatchRequest, asyncio.Future]] = []
+        self._oldest: float | None = None
+        self._batches: dict[str, dict[str, tuple[BatchRequest, asyncio.Future]]] = {}
+        self._last_poll: dict[str, float] = {}
+        self._wake: asyncio.Event | None = None
+        self._stopping = False
+        self.stats = {"requests": 0, "batches": 0, "failed_requests": 0}
+
+    def _notify(self) -> None:
+        """Wake the scheduling loop."""
+        if self._wake is not None:
+            self._wake.set()
+
+    @contextmanager
+    def job(self) -> Iterator[None]:
+        """Count the block as a running job whose requests belong together."""
+        token = _batch_job.set(uuid.uuid4().hex)
+        self.active_jobs += 1
+        try:
+            yield
+        finally:
+            self.active_jobs -= 1
+            _batch_job.reset(token)
+            # The remaining jobs may now all be waiting
+            self._notify()
+
+    @property
+    def waiting(self) -> int:
+        """Jobs (or job-less requests) with a request queued or in a submitted batch."""
+        requests = [request for request, _ in self._pending]
+        requests += [request for batch in self._batches.values() for request, _ in batch.values()]
+        return len({request.job or request.custom_id for request in requests})
+
+    async def submit(self, request: BatchRequest) -> BatchResult:
+        """Queue a request and wait for its result.
+
+        Args:
+            request: Request to run
+
+        Returns:
+            The request's result
+
+        Raises:
+            BatchRequestError: If the batch produced no result for the request
+        """
+        if request.job is None:
+            request.job = _batch_job.get()
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._pending.append((request, future))
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+        self.stats["requests"] += 1
+        self._notify()
+        try:
+            result = await future
+        except asyncio.CancelledError:
+            self._pending = [(r, f) for r, f in self._pending if f is not future]
+            raise
+        if result.error is not None:
+            raise BatchRequestError(f"Batched {request.stage} request failed: {result.error}")
+        return result
+
+    def _should_flush(self) -> bool:
+        """Whether queued requests should be submitted now."""
+        if not self._pending:
+            return False
+        if len(self._pending) >= self.max_batch_size:
+            return True
+        if self.waiting >= self.active_jobs:
+            return True
+        return self._oldest is not None and time.monotonic() - self._oldest >= self.flush_seconds
+
+    async def _flush(self) -> None:
+        """Submit queued requests, one batch per model."""
+        pending, self._pending, self._oldest = self._pending, [], None
+        by_model: dict[str, list[tuple[BatchRequest, asyncio.Future]]] = {}
+        for request, future in pending:
+            if not future.done():
+                by_model.setdefault(request.model, []).append((request, future))
+
+        for model, entries in by_model.items():
+            for start in range(0, len(entries), self.max_batch_size):
+                chunk = entries[start:start + self.max_batch_size]
+                try:
+                    batch_id = await self.backend.submit([request for request, _ in chunk])
+                except Exception as e:
+                    logger.error("Batch submission failed", model=model, error=str(e))
+                    self._fail(chunk, f"submission failed: {e}")
+                    continue
+                self._batches[batch_id] = {request.custom_id: (request, f) for request, f in chunk}
+                self._last_poll[batch_id] = time.monotonic()
+                self.stats["batches"] += 1
+                logger.info(
+                    "Submitted LLM batch",
+                    batch_id=batch_id,
+                    model=model,
+                    requests=len(chunk),
+                    stages=sorted({request.stage for request, _ in chunk}),
+                )
+
+    def _fail(self, entries: Iterable[tuple[BatchRequest, asyncio.Future]], error: str) -> None:
+        """Resolve requests with an error result."""
+        for request, future in entries:
+            if not future.done():
+                self.stats["failed_requests"] += 1
+                future.set_result(BatchResult(request.custom_id, error=error))
+
+    async def _poll(self) -> None:
+        """Check submitted batches that are due and resume callers of finished ones."""
+        now = time.monotonic()
+        for batch_id in list(self._batches):
+            if now - self._last_poll[batch_id] < self.poll_seconds:
+                continue
+            self._last_poll[batch_id] = now
+            try:
+                state = await self.backend.poll(batch_id)
+                if state == "running":
+                    continue
+                results = await self.backend.results(batch_id) if state == "succeeded" else []
+            except Exception as e:
+                logger.warning("Polling LLM batch failed", batch_id=batch_id, error=str(e))
+                continue
+
+            entries = self._batches.pop(batch_id)
+            del self._last_poll[batch_id]
+            for result in results:
+                _, future = entries.pop(result.custom_id, (None, None))
+                if future is not None and not future.done():
+                    if result.error is not None:
+                        self.stats["failed_requests"] += 1
+                    future.set_result(result)
+            self._fail(entries.values(), f"batch {state} without a result")
+            logger.info("LLM batch finished", batch_id=batch_id, state=state, results=len(results))
+
+    async def _run(self) -> None:
+        """Scheduling loop: flush the queue and poll batches until stopped."""
+        assert self._wake is not None
+        tick = max(min(self.poll_seconds, self.flush_seconds) / 4, 0.01)
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=tick)
+            except TimeoutError:
+                pass
+            self._wake.clear()
+            if self._should_flush():
+                await self._flush()
+            if self._batches:
+                await self._poll()
+
+    @asynccontextmanager
+    async def running(self) -> AsyncIterator["BatchScheduler"]:
+        """Run the scheduling loop for the duration of the block."""
+        self._wake = asyncio.Event()
+        self._stopping = False
+        task = asyncio.create_task(self._run())
+        try:
+            yield self
+        finally:
+            # Stopped with a flag rather than cancellation, so an in-flight
+            # submission is not lost between the provider and ``_batches``
+            self._stopping = True
+            self._notify()
+            await task
+            self._fail(self._pending, "scheduler stopped")
+            for entries in self._batches.values():
+                self._fail(entries.values(), "scheduler stopped")
+            self._pending, self._batches = [], {}
+
+
+_batch_job: ContextVar[str | None] = ContextVar("batch_job", default=None)
+_batch_scheduler: ContextVar[BatchScheduler | None] = ContextVar("batch_scheduler", default=None)
+
+
+def current_batch_scheduler() -> BatchScheduler | None:
+    """Get the batch scheduler of the current run (None outside batch mode)."""
+    return _batch_scheduler.get()
+
+
+@contextmanager
+def batch_scope(scheduler: BatchScheduler) -> Iterator[BatchScheduler]:
+    """Send batchable stage calls made inside the block through ``scheduler``."""
+    token = _batch_scheduler.set(scheduler)
+    try:
+        yield scheduler
+    finally:
+        _batch_scheduler.reset(token)
+
+
+def get_batch_backend() -> BatchBackend:
+    """Create the configured provider batch backend."""
+    settings = get_settings()
+    return GeminiBatchBackend(api_key=settings.google_api_key)
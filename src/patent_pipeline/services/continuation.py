@@ -0,0 +1,110 @@
+"""Continuation of responses cut off at the output token limit."""
+
+from dataclasses import dataclass, field
+from typing import Any
+
+# Follow-up turn asking the model to resume a truncated response
+CONTINUE_PROMPT = (
+    "Your previous response was cut off at the output limit. Continue it exactly "
+    "where it stopped: do not repeat any text, do not restart the output, do not "
+    "open a new code block and do not add commentary."
+)
+
+# Longest repeated overlap removed when stitching a continuation
+MAX_OVERLAP_CHARS = 500
+
+# Shortest overlap treated as repeated text unless it is made of whole lines;
+# shorter matches (a closing brace, a digit) are usually new content
+MIN_OVERLAP_CHARS = 20
+
+_USAGE_FIELDS = (
+    "prompt_token_count",
+    "candidates_token_count",
+    "cached_content_token_count",
+    "total_token_count",
+)
+
+
+def finish_reason(response: Any) -> str:
+    """Get the finish reason name of a response's first candidate ("" if unknown)."""
+    try:
+        reason = response.candidates[0].finish_reason
+    except (AttributeError, IndexError, TypeError):
+        return ""
+    name = getattr(reason, "name", reason)
+    return name if isinstance(name, str) else ""
+
+
+def is_truncated(response: Any) -> bool:
+    """Whether generation stopped at the output token limit."""
+    return finish_reason(response) == "MAX_TOKENS"
+
+
+def stitch(partial: str, continuation: str) -> str:
+    """Append a continuation to a partial response.
+
+    Drops a code fence the model reopened at the start of the continuation
+    and text it clearly repeated from the end of the partial output: an
+    overlap of at least ``MIN_OVERLAP_CHARS`` or of whole lines. Shorter
+    overlaps are kept, since they are as likely to be new text.
+
+    Args:
+        partial: Output so far
+        continuation: Text of the continuation response
+
+    Returns:
+        Combined output
+    """
+    if partial.count("```") % 2 == 1 and continuation.lstrip().startswith("```"):
+        # Still inside the partial's code block; skip the reopened fence line
+        continuation = continuation.lstrip().partition("\n")[2]
+
+    limit = min(len(partial), len(continuation), MAX_OVERLAP_CHARS)
+    for size in range(limit, 0, -1):
+        overlap = continuation[:size]
+        if partial.endswith(overlap) and _is_repeat(partial, overlap):
+            continuation = continuation[size:]
+            break
+    return partial + continuation
+
+
+def _is_repeat(partial: str, overlap: str) -> bool:
+    """Whether an overlap at the end of ``partial`` is clearly repeated text."""
+    if len(overlap) >= MIN_OVERLAP_CHARS:
+        return True
+    # Whole lines: starts a line of the partial output and ends with a newline
+    line_start = len(partial) == len(overlap) or partial[-len(overlap) - 1] == "\n"
+    return line_start and overlap.endswith("\n") and bool(overlap.strip())
+
+
+@dataclass
+class UsageTotals:
+    """Token usage summed over a response and its continuations."""
+
+    prompt_token_count: int = 0
+    candidates_token_count: int = 0
+    cached_content_token_count: int = 0
+    total_token_count: int = 0
+
+    def add(self, response: Any) -> None:
+        """Add a response's usage metadata."""
+        usage = getattr(response, "usage_metadata", None)
+        for name in _USAGE_FIELDS:
+            value = getattr(usage, name, 0)
+            if isinstance(value, int):
+                setattr(self, name, getattr(self, name) + value)
+
+
+@dataclass
+class ContinuedResponse:
+    """A response stitched together from a truncated call and its continuations."""
+
+    text: str
+    usage_metadata: UsageTotals
+    responses: list[Any] = field(default_factory=list)
+    truncated: bool = False  # still cut off after the last allowed continuation
+
+    @property
+    def candidates(self) -> list[Any]:
+        """Candidates of the last response (for finish reason checks)."""
+        return self.responses[-1].candidates if self.responses else []
@@ -1,109 +1,492 @@
 """Gemini LLM client for patent pipeline stages."""
 
+import asyncio
+import hashlib
 import json
+import threading
+import time
 import structlog
+from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Future
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from datetime import timedelta
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, TypeVar
 
 import google.generativeai as genai
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
-from tenacity import retry, stop_after_attempt, wait_exponential
+from google.generativeai import caching
+from pydantic import BaseModel
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
 
 from src.config import get_settings
+from src.patent_pipeline.models.stage1 import Stage1Extraction
+from src.patent_pipeline.models.stage2 import Stage2A, Stage2B, Stage2C
+from src.patent_pipeline.models.stage4 import Stage4Output
+from src.patent_pipeline.services.batch_mode import (
+    BATCH_PRICE_FACTOR,
+    BatchRequest,
+    BatchScheduler,
+    batch_contents,
+    batch_response,
+    current_batch_scheduler,
+)
+from src.patent_pipeline.services.continuation import (
+    CONTINUE_PROMPT,
+    ContinuedResponse,
+    UsageTotals,
+    is_truncated,
+    stitch,
+)
+from src.patent_pipeline.services.hedging import get_hedger
+from src.patent_pipeline.services.llm_backend import get_llm_backend
+from src.patent_pipeline.services.llm_registry import (
+    SAFETY_SETTINGS,
+    current_llm_stage,
+    get_llm_registry,
+    llm_stage,
+    run_gemini_call,
+)
+from src.patent_pipeline.services.model_cascade import (
+    CascadePolicy,
+    cascade_policy,
+    get_cascade_metrics,
+    quality_issue,
+)
+from src.patent_pipeline.services.output_budget import get_output_budgets
+from src.patent_pipeline.services.output_repair import (
+    REPAIR_PROMPT,
+    OutputRepairError,
+    get_repair_metrics,
+    is_transient_error,
+    repair_json_text,
+    usage_tokens,
+)
+from src.patent_pipeline.services.overload_control import get_overload_control
+from src.patent_pipeline.services.prompt_fragments import job_fragments
+from src.patent_pipeline.services.rate_limiter import estimate_tokens, get_rate_limiter
+from src.patent_pipeline.services.report_edits import apply_report_edits, mark_corrected_issues
+from src.patent_pipeline.services.report_streaming import (
+    MarkdownStreamExtractor,
+    ReportStream,
+)
+from src.patent_pipeline.services.response_cache import get_response_cache, response_cache_key
+from src.patent_pipeline.services.single_flight import get_single_flight
+from src.patent_pipeline.services.structured_output import (
+    gemini_response_schema,
+    gemini_schema_dict,
+    parse_structured,
+)
+from src.patent_pipeline.services.upload_cache import get_upload_cache
+from src.patent_pipeline.services.usage_accounting import (
+    gemini_usage,
+    job_usage,
+    record_llm_call,
+    record_retry,
+)
 
 logger = structlog.get_logger(__name__)
 
-# Base path for prompts
-PROMPTS_DIR = Path(__file__).parent.parent / "prompts"
+# Base path for tech packs
 TECHPACKS_DIR = Path(__file__).parent.parent / "techpacks"
 
+T = TypeVar("T")
+
+# Output instructions appended to the Stage 4 prompt
+STAGE4_OUTPUT_FORMAT = """---
+
+Do not reproduce the report. Respond with a single JSON object in a ```json
+code block: put your QC JSON in `qc` and your corrections in `edits`, a list of
+{"section": heading text of the section, "find": exact report text to replace
+(copied verbatim, long enough to occur only once in that section), "replace":
+corrected text, "issue_id": QC issue it fixes}."""
+
+# Stage 4 output instructions when the response is schema-constrained JSON
+STAGE4_STRUCTURED_OUTPUT_FORMAT = """---
+
+Do not reproduce the report. Respond with a single JSON object: put your QC
+JSON in `qc` and your corrections to the Stage 3 report in `edits`. Each edit
+names the section heading, the exact report text to replace (copied verbatim,
+long enough to occur only once in that section), the corrected text and the QC
+issue it fixes."""
+
+
+def _text_section(title: str, text: str) -> str:
+    """Format a titled text block for a stage prompt."""
+    return f"## {title}\n\n{text}"
+
+
+@dataclass
+class PromptLayout:
+    """A text prompt split into a cacheable prefix and a per-call suffix."""
+
+    prefix: list[str]
+    suffix: list[str]
+    ttl_seconds: int
+    scope: str  # "static" (shared across jobs) or "job"
+
+    def prefix_text(self) -> str:
+        """Get the cacheable prefix as one string."""
+        return "\n\n".join(self.prefix)
+
+    def suffix_text(self) -> str:
+        """Get the per-call remainder as one string."""
+        return "\n\n".join(self.suffix)
+
+    def text(self) -> str:
+        """Get the full prompt (used when no cached context is available)."""
+        return "\n\n".join(self.prefix + self.suffix)
+
+
+@dataclass
+class CachedContext:
+    """A cached prompt prefix and the model bound to it."""
+
+    key: str
+    handle: Any
+    model: Any
+    expires_at: float
+    last_used: float = field(default_factory=time.time)
+
+
+class ContextCacheProvider(ABC):
+    """Gemini context caching backend (blocking calls).
+
+    Subclasses create server-side cached content for a prompt prefix, extend
+    its TTL, and return a model whose requests are prefixed by it.
+    """
+
+    @abstractmethod
+    def create(
+        self, model_name: str, contents: list[str], ttl_seconds: int, display_name: str
+    ) -> tuple[Any, float]:
+        """Create cached content.
+
+        Returns:
+            Tuple of (provider handle, expiry UNIX timestamp)
+        """
+
+    @abstractmethod
+    def refresh(self, handle: Any, ttl_seconds: int) -> float:
+        """Extend cached content's TTL, returning the new expiry timestamp."""
+
+    @abstractmethod
+    def bind_model(self, handle: Any) -> Any:
+        """Get a model (with ``generate_content``) that uses the cached content."""
+
+
+class GeminiContextCacheProvider(ContextCacheProvider):
+    """Context caching through the Gemini ``CachedContent`` API."""
+
+    def __init__(self, temperature: float, max_output_tokens: int) -> None:
+        """Initialize the provider.
+
+        Args:
+            temperature: Sampling temperature for models bound to cached content
+            max_output_tokens: Output token limit for those models
+        """
+        self.temperature = temperature
+        self.max_output_tokens = max_output_tokens
+
+    def create(
+        self, model_name: str, contents: list[str], ttl_seconds: int, display_name: str
+    ) -> tuple[Any, float]:
+        get_llm_registry().configure()
+        cached = caching.CachedContent.create(
+            model=model_name,
+            display_name=display_name,
+            contents=contents,
+            ttl=timedelta(seconds=ttl_seconds),
+        )
+        return cached, cached.expire_time.timestamp()
+
+    def refresh(self, handle: Any, ttl_seconds: int) -> float:
+        handle.update(ttl=timedelta(seconds=ttl_seconds))
+        return handle.expire_time.timestamp()
+
+    def bind_model(self, handle: Any) -> Any:
+        return genai.GenerativeModel.from_cached_content(
+            cached_content=handle,
+            generation_config=genai.GenerationConfig(
+                temperature=self.temperature,
+                max_output_tokens=self.max_output_tokens,
+            ),
+            safety_settings=SAFETY_SETTINGS,
+        )
+
+
+class _ContextAbandonedError(Exception):
+    """The caller creating a shared cached context was cancelled."""
+
+
+class ContextCacheManager:
+    """Create, reuse and refresh Gemini cached content for prompt prefixes.
+
+    Entries are keyed by model and prefix content, so a (stage prompt, tech
+    pack) prefix is shared by every job in a tech center and a job's Stage 1
+    extraction prefix by all of that job's later stages. Entries close to
+    expiry are refreshed on use. Prefixes shorter than ``min_chars`` are not
+    cached (Gemini rejects content below a per-model token minimum), and a
+    failed create puts the prefix on a backoff so callers fall back to the
+    full prompt instead of retrying the cache on every call.
+    """
+
+    def __init__(
+        self,
+        provider: ContextCacheProvider | None = None,
+        refresh_margin: float | None = None,
+        min_chars: int | None = None,
+        failure_backoff: float | None = None,
+        enabled: bool | None = None,
+    ) -> None:
+        """Initialize the manager.
+
+        Args:
+            provider: Caching backend (defaults to the Gemini API)
+            refresh_margin: Refresh entries with less than this many seconds left
+            min_chars: Minimum prefix length worth caching
+            failure_backoff: Seconds to skip a prefix after a failed create
+            enabled: Whether context caching is used at all
+        """
+        settings = get_settings()
+        self.provider = provider or GeminiContextCacheProvider(
+            temperature=settings.gemini_temperature,
+            max_output_tokens=settings.gemini_max_output_tokens,
+        )
+        self.refresh_margin = (
+            refresh_margin
+            if refresh_margin is not None
+            else settings.gemini_context_cache_refresh_margin_seconds
+        )
+        self.min_chars = (
+            min_chars if min_chars is not None else settings.gemini_context_cache_min_chars
+        )
+        self.failure_backoff = (
+            failure_backoff
+            if failure_backoff is not None
+            else settings.gemini_context_cache_failure_backoff_seconds
+        )
+        self.enabled = enabled if enabled is not None else settings.gemini_context_cache_enabled
+        self._lock = threading.Lock()
+        self._entries: dict[str, CachedContext] = {}
+        self._in_flight: dict[str, Future] = {}
+        self._failed_until: dict[str, float] = {}
+        self._counters = {"hits": 0, "creates": 0, "refreshes": 0, "failures": 0, "skipped": 0}
+
+    def _key(self, model_name: str, contents: list[str]) -> str:
+        """Content hash identifying a cached prefix."""
+        digest = hashlib.sha256(model_name.encode("utf-8"))
+        for part in contents:
+            digest.update(b"\0")
+            digest.update(part.encode("utf-8"))
+        return digest.hexdigest()
+
+    async def get_model(
+        self,
+        model_name: str,
+        contents: list[str],
+        ttl_seconds: int,
+        display_name: str = "",
+    ) -> Any | None:
+        """Get a model bound to cached content for a prompt prefix.
+
+        Args:
+            model_name: Gemini model name
+            contents: Prefix parts to cache
+            ttl_seconds: TTL for new or refreshed cached content
+            display_name: Display name for new cached content
+
+        Returns:
+            Model using the cached prefix, or None to send the full prompt
+        """
+        if not self.enabled or sum(len(part) for part in contents) < self.min_chars:
+            with self._lock:
+                self._counters["skipped"] += 1
+            return None
+
+        key = await asyncio.to_thread(self._key, model_name, contents)
+
+        while True:
+            now = time.time()
+            with self._lock:
+                if self._failed_until.get(key, 0) > now:
+                    self._counters["skipped"] += 1
+                    return None
+
+                entry = self._entries.get(key)
+                if entry is not None and entry.expires_at - self.refresh_margin > now:
+                    entry.last_used = now
+                    self._counters["hits"] += 1
+                    return entry.model
+
+                pending = self._in_flight.get(key)
+                if pending is None:
+                    pending = Future()
+                    self._in_flight[key] = pending
+                    break
+
+            # Another caller is creating or refreshing this prefix; if it was
+            # cancelled, loop and take over
+            try:
+                return await asyncio.wrap_future(pending)
+            except _ContextAbandonedError:
+                continue
+
+        try:
+            model = await self._create_or_refresh(
+                key, entry, model_name, contents, ttl_seconds, display_name
+            )
+        except asyncio.CancelledError:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            pending.set_exception(_ContextAbandonedError())
+            raise
+
+        with self._lock:
+            self._in_flight.pop(key, None)
+        pending.set_result(model)
+        return model
+
+    async def _create_or_refresh(
+        self,
+        key: str,
+        entry: CachedContext | None,
+        model_name: str,
+        contents: list[str],
+        ttl_seconds: int,
+        display_name: str,
+    ) -> Any | None:
+        """Refresh a live entry or create new cached content, falling back to None."""
+        if entry is not None and entry.expires_at > time.time():
+            try:
+                expires_at = await run_gemini_call(self.provider.refresh, entry.handle, ttl_seconds)
+                with self._lock:
+                    entry.expires_at = expires_at
+                    entry.last_used = time.time()
+                    self._counters["refreshes"] += 1
+                logger.debug("Refreshed cached context", display_name=display_name)
+                return entry.model
+            except Exception as e:
+                logger.warning("Cached context refresh failed", error=str(e))
+
+        with self._lock:
+            self._entries.pop(key, None)
+            self._drop_expired()
+
+        try:
+            handle, expires_at = await run_gemini_call(
+                self.provider.create, model_name, contents, ttl_seconds, display_name
+            )
+            model = self.provider.bind_model(handle)
+        except Exception as e:
+            with self._lock:
+                self._failed_until[key] = time.time() + self.failure_backoff
+                self._counters["failures"] += 1
+            logger.warning(
+                "Context caching unavailable, sending full prompt",
+                display_name=display_name,
+                error=str(e),
+            )
+            return None
+
+        with self._lock:
+            self._entries[key] = CachedContext(
+                key=key, handle=handle, model=model, expires_at=expires_at
+            )
+            self._counters["creates"] += 1
+        logger.info(
+            "Created cached context",
+            display_name=display_name,
+            chars=sum(len(part) for part in contents),
+        )
+        return model
+
+    def _drop_expired(self) -> None:
+        """Forget entries Gemini has already expired (caller holds the lock)."""
+        now = time.time()
+        for key in [k for k, e in self._entries.items() if e.expires_at <= now]:
+            del self._entries[key]
+        for key in [k for k, until in self._failed_until.items() if until <= now]:
+            del self._failed_until[key]
+
+    def stats(self) -> dict[str, int]:
+        """Get context cache counters."""
+        with self._lock:
+            return {**self._counters, "entries": len(self._entries)}
+
+
+@lru_cache
+def get_context_cache() -> ContextCacheManager:
+    """Get the process-wide Gemini context cache manager."""
+    return ContextCacheManager()
+
 
 class GeminiClient:
     """Client for Gemini LLM interactions in the patent pipeline."""
 
-    def __init__(self) -> None:
-        """Initialize Gemini client."""
+    def __init__(self, bypass_cache: bool = False) -> None:
+        """Initialize Gemini client.
+
+        Args:
+            bypass_cache: Skip cached responses (fresh responses are still stored)
+        """
         self.settings = get_settings()
+        self.bypass_cache = bypass_cache
+        self.fragments = job_fragments()
         self._configure_client()
         self._load_prompts()
         self._model: genai.GenerativeModel | None = None
 
     def _configure_client(self) -> None:
-        """Configure the Gemini API client."""
-        if not self.settings.google_api_key:
-            logger.warning("Google API key not configured")
-            return
-        genai.configure(api_key=self.settings.google_api_key)
+        """Configure the Gemini API client (once per process)."""
+        get_llm_registry().configure()
 
     def _load_prompts(self) -> None:
-        """Load all prompt templates."""
-        self.prompts: dict[str, str] = {}
-
-        prompt_files = {
-            "stage1": "PROMPT_Pipeline1_Stage1_RecordExtraction_v2.md",
-            "stage2a": "PROMPT_Pipeline1_Stage2A_ClaimConstruction_Estoppel_v2.md",
-            "stage2b": "PROMPT_Pipeline1_Stage2B_Search_Technical_v2.md",
-            "stage2c": "PROMPT_Pipeline1_Stage2C_Timeline_Synthesis_v2.md",
-            "stage3": "PROMPT_Pipeline1_Stage3_ReportGeneration_v2.md",
-            "stage4": "PROMPT_Pipeline1_Stage4_QC_Verification_v2.md",
-            "search_intel": "PROMPT_Pipeline2_SearchIntelligence_Module_v1.md",
-        }
-
-        for key, filename in prompt_files.items():
-            path = PROMPTS_DIR / filename
-            if path.exists():
-                self.prompts[key] = path.read_text(encoding="utf-8")
-                logger.debug("Loaded prompt", key=key, path=str(path))
-            else:
-                logger.warning("Prompt file not found", key=key, path=str(path))
+        """Load all prompt templates from the shared registry."""
+        self.prompts: dict[str, str] = get_llm_registry().prompts()
 
     @property
     def model(self) -> genai.GenerativeModel:
-        """Get or create the Gemini model instance."""
+        """Get the shared Gemini model instance."""
         if self._model is None:
-            self._model = genai.GenerativeModel(
+            self._model = get_llm_registry().gemini_model(
                 model_name=self.settings.gemini_model,
-                generation_config=genai.GenerationConfig(
-                    temperature=self.settings.gemini_temperature,
-                    max_output_tokens=self.settings.gemini_max_output_tokens,
-                ),
-                safety_settings={
-                    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-                    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-                    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-                    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-                },
+                temperature=self.settings.gemini_temperature,
+                max_output_tokens=self.settings.gemini_max_output_tokens,
             )
         return self._model
 
-    def _upload_pdf(self, pdf_bytes: bytes, display_name: str) -> Any:
-        """Upload a PDF to Gemini for processing.
+    def _model_for(self, model_name: str) -> genai.GenerativeModel:
+        """Get the model handle for a model name (the shared model for the default)."""
+        if model_name == self.settings.gemini_model:
+            return self.model
+        return get_llm_registry().gemini_model(
+            model_name=model_name,
+            temperature=self.settings.gemini_temperature,
+            max_output_tokens=self.settings.gemini_max_output_tokens,
+        )
+
+    async def _upload_pdf(
+        self, leases: AsyncExitStack, pdf_bytes: bytes, display_name: str
+    ) -> Any:
+        """Upload a PDF to Gemini for processing, reusing cached uploads.
+
+        The file is leased until ``leases`` closes, so it is not deleted
+        while calls still reference it.
 
         Args:
+            leases: Stack holding the upload lease for the calls using the file
             pdf_bytes: PDF content as bytes
             display_name: Display name for the uploaded file
 
         Returns:
             Uploaded file reference
         """
-        import tempfile
-        import os
-
-        # Write to temp file (Gemini SDK requires file path)
-        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
-            f.write(pdf_bytes)
-            temp_path = f.name
-
-        try:
-            uploaded_file = genai.upload_file(
-                path=temp_path,
-                display_name=display_name,
-                mime_type="application/pdf",
-            )
-            logger.info("Uploaded PDF to Gemini", display_name=display_name)
-            return uploaded_file
-        finally:
-            os.unlink(temp_path)
+        return await leases.enter_async_context(
+            get_upload_cache().lease(pdf_bytes, display_name)
+        )
 
     def _parse_json_response(self, text: str) -> dict[str, Any]:
         """Parse JSON from LLM response.
@@ -126,11 +509,806 @@ class GeminiClient:
 
         return json.loads(text)
 
+    def _parse_markdown_response(self, text: str) -> str:
+        """Strip code block markers from a Markdown report response.
+
+        Args:
+            text: Raw response text
+
+        Returns:
+            Report Markdown
+        """
+        result = text.strip()
+
+        # Remove code block markers if present
+        if result.startswith("```markdown"):
+            result = result[11:]
+        elif result.startswith("```"):
+            result = result[3:]
+        if result.endswith("```"):
+            result = result[:-3]
+
+        return result.strip()
+
+    async def _generate(
+        self,
+        contents: Any,
+        response_model: type[BaseModel] | None = None,
+        kind: str = "generate",
+        on_text: Callable[[str], None] | None = None,
+        model_name: str | None = None,
+    ) -> Any:
+        """Generate content off the event loop.
+
+        A ``PromptLayout`` is sent against cached content for its prefix when
+        context caching is available, and as the full prompt otherwise.
+        Responses cut off at the output token limit are continued (see
+        ``_continue``). First attempts are hedged when enabled (see
+        ``_hedged_call``). In batch mode, text-only first attempts go through
+        the run's batch scheduler instead (see ``_batch_call``). The output
+        size of stage responses feeds the stage's output token budget.
+
+        Args:
+            contents: Prompt string, list of parts or PromptLayout
+            response_model: Request JSON constrained to this model's schema
+            kind: Call kind for usage accounting ("generate" or "repair")
+            on_text: Streams the response, calling this with the text so far
+            model_name: Model to call (defaults to ``gemini_model``)
+
+        Returns:
+            Gemini response, or a ContinuedResponse if it was continued
+        """
+        kwargs: dict[str, Any] = {}
+        if response_model is not None:
+            kwargs["generation_config"] = {
+                "response_mime_type": "application/json",
+                "response_schema": gemini_response_schema(response_model),
+            }
+
+        model_name = model_name or self.settings.gemini_model
+        model = self._model_for(model_name)
+        scheduler = current_batch_scheduler()
+        if scheduler is not None and kind == "generate":
+            text = contents.text() if isinstance(contents, PromptLayout) else contents
+            turns = batch_contents(text)
+            if turns is not None:
+                response = await self._batch_call(
+                    scheduler, turns, response_model, on_text, model_name
+                )
+                if is_truncated(response) and self.settings.gemini_max_continuations > 0:
+                    response = await self._continue(model, text, response, on_text, model_name)
+                self._record_output(response)
+                return response
+
+        if isinstance(contents, PromptLayout) and get_llm_backend().context_caching:
+            cached_model = await get_context_cache().get_model(
+                model_name=model_name,
+                contents=contents.prefix,
+                ttl_seconds=contents.ttl_seconds,
+                display_name=f"patent-pipeline-{contents.scope}",
+            )
+            if cached_model is not None:
+                model = cached_model
+                contents = contents.suffix_text()
+            else:
+                contents = contents.text()
+        elif isinstance(contents, PromptLayout):
+            contents = contents.text()
+
+        if kind == "generate":
+            response = await self._hedged_call(model, contents, on_text, model_name, **kwargs)
+        else:
+            response = await self._call_model(
+                model, contents, kind, on_text, model_name, **kwargs
+            )
+        if is_truncated(response) and self.settings.gemini_max_continuations > 0:
+            response = await self._continue(model, contents, response, on_text, model_name)
+        if kind == "generate":
+            self._record_output(response)
+        return response
+
+    @staticmethod
+    def _record_output(response: Any) -> None:
+        """Add a stage response's output size to its stage's budget history."""
+        if isinstance(response, ContinuedResponse):
+            truncated = response.truncated
+        else:
+            truncated = is_truncated(response)
+        get_output_budgets().record(
+            current_llm_stage(), gemini_usage(response).output_tokens, truncated
+        )
+
+    async def _batch_call(
+        self,
+        scheduler: BatchScheduler,
+        turns: list[dict[str, Any]],
+        response_model: type[BaseModel] | None = None,
+        on_text: Callable[[str], None] | None = None,
+        model_name: str | None = None,
+    ) -> Any:
+        """Run a stage's generate call as a request in the run's next batch.
+
+        Batch requests bypass context caching, hedging and the online rate
+        limiter, and are billed at the batch discount. The response arrives
+        whole, so ``on_text`` is called once with the full text.
+
+        Args:
+            scheduler: Batch scheduler of the current run
+            turns: Request turns (see ``batch_contents``)
+            response_model: Request JSON constrained to this model's schema
+            on_text: Called with the response text
+            model_name: Model to call (defaults to ``gemini_model``)
+
+        Returns:
+            Gemini-shaped response
+        """
+        model_name = model_name or self.settings.gemini_model
+        stage = current_llm_stage()
+        config: dict[str, Any] = {
+            "temperature": self.settings.gemini_temperature,
+            "max_output_tokens": get_output_budgets().budget(
+                stage, self.settings.gemini_max_output_tokens
+            ),
+        }
+        if response_model is not None:
+            config["response_mime_type"] = "application/json"
+            config["response_schema"] = gemini_schema_dict(response_model)
+
+        request = BatchRequest(
+            model=model_name,
+            contents=turns,
+            generation_config=config,
+            stage=stage or "unknown",
+        )
+        with record_llm_call("gemini", model_name, stage, "batch") as call:
+            result = await scheduler.submit(request)
+            response = batch_response(result)
+            call.set_usage(gemini_usage(response), price_factor=BATCH_PRICE_FACTOR)
+        if on_text is not None and response.text:
+            on_text(response.text)
+        return response
+
+    async def _hedged_call(
+        self,
+        model: Any,
+        contents: Any,
+        on_text: Callable[[str], None] | None = None,
+        model_name: str | None = None,
+        **kwargs: Any,
+    ) -> Any:
+        """Run a stage's generate call, duplicating it if it runs unusually long.
+
+        With hedging enabled both attempts stream, so the losing attempt
+        stops reading (and the server stops generating) when it is
+        cancelled. Only the primary attempt feeds ``on_text``. Latency
+        history is kept per stage, and per model for cascade tiers.
+
+        Args:
+            model: Model (or cached-content model) to call
+            contents: Request contents
+            on_text: Streams the response, calling this with the text so far
+            model_name: Model name for accounting (defaults to ``gemini_model``)
+            **kwargs: Extra ``generate_content`` arguments
+
+        Returns:
+            Gemini response of the first attempt to finish
+        """
+        hedger = get_hedger()
+        if not hedger.enabled:
+            return await self._call_model(
+                model, contents, "generate", on_text, model_name, **kwargs
+            )
+
+        def attempt(hedge: bool) -> Awaitable[Any]:
+            if hedge:
+                return self._call_model(
+                    model, contents, "hedge", _ignore_text, model_name, **kwargs
+                )
+            return self._call_model(
+                model, contents, "generate", on_text or _ignore_text, model_name, **kwargs
+            )
+
+        key = current_llm_stage() or "unknown"
+        if model_name and model_name != self.settings.gemini_model:
+            key = f"{key}/{model_name}"
+        return await hedger.run(key, attempt)
+
+    async def _call_model(
+        self,
+        model: Any,
+        contents: Any,
+        kind: str = "generate",
+        on_text: Callable[[str], None] | None = None,
+        model_name: str | None = None,
+        **kwargs: Any,
+    ) -> Any:
+        """Run one generate call once the shared rate limiter grants quota.
+
+        The call first passes the model's circuit breaker and adaptive
+        concurrency limit (see ``OverloadControl``), then goes through the
+        configured LLM backend (live, recording or replaying). The output
+        token limit of first attempts is the stage's learned budget (see
+        ``OutputBudgets``); continuation and repair calls keep the model's
+        full limit so they are not cut off again. The limit is also what
+        the call reserves from the TPM quota. Its tokens, latency and cost
+        are added to the job's usage.
+
+        Args:
+            model: Model (or cached-content model) to call
+            contents: Request contents
+            kind: Call kind for usage accounting
+            on_text: Streams the response, calling this with the text so far
+            model_name: Model name for accounting (defaults to ``gemini_model``)
+            **kwargs: Extra ``generate_content`` arguments
+
+        Returns:
+            Gemini response
+        """
+        model_name = model_name or self.settings.gemini_model
+        stage = current_llm_stage()
+        max_tokens = self.settings.gemini_max_output_tokens
+        if kind in ("generate", "hedge"):
+            max_tokens = get_output_budgets().budget(stage, max_tokens)
+        # Models are built with ``gemini_max_output_tokens``; only a different budget is sent
+        send_kwargs = kwargs
+        if max_tokens != self.settings.gemini_max_output_tokens:
+            send_kwargs = {
+                **kwargs,
+                "generation_config": {
+                    **kwargs.get("generation_config", {}),
+                    "max_output_tokens": max_tokens,
+                },
+            }
+        estimated = estimate_tokens(contents) + max_tokens
+        async with (
+            get_overload_control().call("gemini", model_name),
+            get_rate_limiter().slot("gemini", model_name, estimated) as slot,
+        ):
+            with record_llm_call("gemini", model_name, stage, kind, slot.waited) as call:
+
+                async def send(on_first_byte: Callable[[], None]) -> Any:
+                    if on_text is None:
+                        return await run_gemini_call(
+                            model.generate_content, contents, **send_kwargs
+                        )
+                    return await self._stream_model(
+                        model, contents, on_text, on_first_byte, **send_kwargs
+                    )
+
+                backend = get_llm_backend()
+                # The learned limit varies run to run, so it is not part of the request key
+                request = backend.request(
+                    "gemini", model_name, stage, {"contents": contents, **kwargs}
+                )
+                response = await backend.call(request, send, on_text, call.first_byte)
+                call.set_usage(gemini_usage(response))
+            slot.settle(usage_tokens(response))
+        return response
+
+    async def _stream_model(
+        self,
+        model: Any,
+        contents: Any,
+        on_text: Callable[[str], None],
+        on_first_byte: Callable[[], None],
+        **kwargs: Any,
+    ) -> Any:
+        """Run a streaming generate call, handing text to ``on_text`` as it arrives.
+
+        The SDK's stream iterator blocks, so it is consumed on the Gemini
+        executor and chunks are passed back to the event loop through a
+        queue. If the caller is cancelled the worker stops reading.
+
+        Args:
+            model: Model (or cached-content model) to call
+            contents: Request contents
+            on_text: Called on the event loop with the response text so far
+            on_first_byte: Called when the first chunk arrives
+            **kwargs: Extra ``generate_content`` arguments
+
+        Returns:
+            The fully consumed streaming response
+        """
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue[str | None] = asyncio.Queue()
+        stop = threading.Event()
+
+        def consume() -> Any:
+            try:
+                response = model.generate_content(contents, stream=True, **kwargs)
+                for chunk in response:
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(chunks.put_nowait, _chunk_text(chunk))
+                return response
+            finally:
+                loop.call_soon_threadsafe(chunks.put_nowait, None)
+
+        worker = asyncio.ensure_future(run_gemini_call(consume))
+        text = ""
+        try:
+            while (piece := await chunks.get()) is not None:
+                if piece:
+                    if not text:
+                        on_first_byte()
+                    text += piece
+                    on_text(text)
+            return await worker
+        except BaseException:
+            stop.set()
+            worker.cancel()
+            raise
+
+    async def _continue(
+        self,
+        model: Any,
+        contents: Any,
+        response: Any,
+        on_text: Callable[[str], None] | None = None,
+        model_name: str | None = None,
+    ) -> ContinuedResponse:
+        """Continue a response that stopped at the output token limit.
+
+        The prompt, the partial output (as a model turn) and a request to
+        resume are sent until the model finishes or
+        ``gemini_max_continuations`` is reached. Continuations are plain text
+        even for schema-constrained stages, since each one is only a fragment
+        of the JSON; the stitched text is validated by the stage parser.
+
+        Args:
+            model: Model (or cached-content model) that produced the response
+            contents: User contents of the original request
+            response: Truncated response
+            on_text: Called with the stitched text after each continuation
+            model_name: Model name for accounting (defaults to ``gemini_model``)
+
+        Returns:
+            Stitched response with usage summed over all calls
+        """
+        user_parts = contents if isinstance(contents, list) else [contents]
+        usage = UsageTotals()
+        usage.add(response)
+        combined = ContinuedResponse(
+            text=response.text, usage_metadata=usage, responses=[response], truncated=True
+        )
+
+        for attempt in range(1, self.settings.gemini_max_continuations + 1):
+            logger.info(
+                "Output hit the token limit, continuing",
+                continuation=attempt,
+                chars_so_far=len(combined.text),
+            )
+            history = [
+                {"role": "user", "parts": user_parts},
+                {"role": "model", "parts": [combined.text]},
+                {"role": "user", "parts": [CONTINUE_PROMPT]},
+            ]
+            continuation = await self._call_model(
+                model, history, "continuation", model_name=model_name
+            )
+            usage.add(continuation)
+            combined.responses.append(continuation)
+            combined.text = stitch(combined.text, continuation.text)
+            if on_text is not None:
+                on_text(combined.text)
+            if not is_truncated(continuation):
+                combined.truncated = False
+                break
+
+        if combined.truncated:
+            logger.warning(
+                "Output still truncated after continuations",
+                continuations=len(combined.responses) - 1,
+                chars=len(combined.text),
+            )
+        return combined
+
+    def _json_section(self, title: str, data: Any, label: str) -> str:
+        """Format a titled JSON block from the job's serialized fragment.
+
+        Args:
+            title: Section heading
+            data: Stage artifact
+            label: Fragment name for size reports
+
+        Returns:
+            Prompt section
+        """
+        return f"## {title}\n\n```json\n{self.fragments.json(data, label)}\n```"
+
+    def _layout(
+        self,
+        stage: str,
+        sections: list[str],
+        stage1_section: str | None = None,
+        tech_pack_section: str | None = None,
+    ) -> PromptLayout:
+        """Arrange a stage prompt so its longest shared part comes first.
+
+        Gemini applies one cached prefix per request. The (stage prompt, tech
+        pack) pair is shared by every job in a tech center; the Stage 1
+        extraction is shared by Stages 2A-4 of one job. Whichever is longer
+        becomes the cached prefix and everything else follows it.
+
+        Args:
+            stage: Prompt key (e.g. "stage2a")
+            sections: Remaining per-call sections, in order
+            stage1_section: Formatted Stage 1 extraction block, if used
+            tech_pack_section: Formatted tech pack block, if used
+
+        Returns:
+            Prompt layout
+        """
+        static = [self.prompts[stage]]
+        if tech_pack_section is not None:
+            static.append(tech_pack_section)
+
+        if stage1_section is not None and (
+            tech_pack_section is None or len(stage1_section) >= sum(len(p) for p in static)
+        ):
+            return PromptLayout(
+                prefix=[stage1_section],
+                suffix=static + sections,
+                ttl_seconds=self.settings.gemini_context_cache_job_ttl_seconds,
+                scope="job",
+            )
+
+        return PromptLayout(
+            prefix=static,
+            suffix=([stage1_section] if stage1_section is not None else []) + sections,
+            ttl_seconds=self.settings.gemini_context_cache_ttl_seconds,
+            scope="static",
+        )
+
+    def _response_key(
+        self,
+        stage: str,
+        inputs: dict[str, Any],
+        response_format: str = "text",
+        model: str | None = None,
+    ) -> str:
+        """Build the response cache key for a stage call.
+
+        Args:
+            stage: Prompt key (e.g. "stage2a")
+            inputs: Stage inputs (JSON-serializable; PDFs as content hashes)
+            response_format: "text" or the structured output model name
+            model: Model part of the key (defaults to ``gemini_model``)
+
+        Returns:
+            Cache key
+        """
+        prompt_version = hashlib.sha256(self.prompts[stage].encode("utf-8")).hexdigest()
+        return response_cache_key(
+            stage=stage,
+            model=model or self.settings.gemini_model,
+            temperature=self.settings.gemini_temperature,
+            max_output_tokens=self.settings.gemini_max_output_tokens,
+            prompt_version=prompt_version,
+            response_format=response_format,
+            inputs=inputs,
+        )
+
+    async def _generate_cached(
+        self,
+        stage: str,
+        inputs: dict[str, Any],
+        contents: Any | Callable[[], Awaitable[Any]],
+        parse: Callable[[str], T],
+        response_model: type[BaseModel] | None = None,
+        stream: ReportStream | None = None,
+        stream_extractor: Callable[[], Callable[[str], str]] | None = None,
+        validation_model: type[BaseModel] | None = None,
+    ) -> T:
+        """Generate and parse a stage response, reusing cached responses.
+
+        The raw response text is stored only after ``parse`` succeeds, so a
+        malformed response is never replayed. With ``bypass_cache`` set the
+        lookup is skipped but the fresh response still replaces the entry.
+
+        Stages with a model cascade run on the fast model first and move to
+        the configured model if the output does not parse (after local
+        repair), fails validation or trips a quality check (see
+        ``quality_issue``). The last tier's output is accepted as usual.
+
+        Concurrent calls with the same cache key (e.g. the same application
+        submitted twice) share one in-flight generation; the other callers
+        parse its text themselves (see ``SingleFlight``).
+
+        Args:
+            stage: Prompt key (e.g. "stage2a")
+            inputs: Stage inputs for the cache key
+            contents: Prompt contents, or an async factory for them (so
+                uploads only happen on a miss)
+            parse: Parser for the response text
+            response_model: Structured output model, if requesting JSON
+            stream: Report stream fed with partial text, if streaming
+            stream_extractor: Factory for the report text extractor of ``stream``
+            validation_model: Pydantic model a lower tier's JSON must satisfy
+
+        Returns:
+            Parsed response
+        """
+        cache = get_response_cache()
+        policy = cascade_policy(stage, self.settings)
+        response_format = response_model.__name__ if response_model else "text"
+        key = self._response_key(stage, inputs, response_format, policy.cache_model)
+
+        if not self.bypass_cache:
+            cached = await cache.get(key)
+            if cached is not None:
+                try:
+                    result = parse(cached)
+                    logger.info("Using cached LLM response", stage=stage, key=key[:12])
+                    job_usage().record_cache_hit(stage)
+                    return result
+                except Exception as e:
+                    logger.warning(
+                        "Discarding unparseable cached response", stage=stage, error=str(e)
+                    )
+
+        streaming = (
+            stream is not None and stream_extractor is not None and self.settings.gemini_streaming
+        )
+
+        async def generate() -> tuple[T, str]:
+            return await self._generate_tiers(
+                stage,
+                key,
+                contents,
+                parse,
+                response_model,
+                policy,
+                stream=stream if streaming else None,
+                stream_extractor=stream_extractor,
+                validation_model=validation_model,
+            )
+
+        (result, text), shared = await get_single_flight().run(key, generate)
+        if not shared:
+            return result
+
+        # Another job made the identical call: parse its text into this
+        # job's own objects and hand the finished report to this job's stream
+        logger.info("Sharing identical in-flight LLM call", stage=stage, key=key[:12])
+        job_usage().record_coalesced(stage)
+        if streaming:
+            stream.start(stream_extractor())(text)
+        return parse(text)
+
+    async def _generate_tiers(
+        self,
+        stage: str,
+        key: str,
+        contents: Any | Callable[[], Awaitable[Any]],
+        parse: Callable[[str], T],
+        response_model: type[BaseModel] | None,
+        policy: CascadePolicy,
+        stream: ReportStream | None = None,
+        stream_extractor: Callable[[], Callable[[str], str]] | None = None,
+        validation_model: type[BaseModel] | None = None,
+    ) -> tuple[T, str]:
+        """Generate a stage response through its cascade tiers and cache it.
+
+        Args:
+            stage: Prompt key (e.g. "stage2a")
+            key: Response cache key
+            contents: Prompt contents, or an async factory for them
+            parse: Parser for the response text
+            response_model: Structured output model, if requesting JSON
+            policy: The stage's cascade policy
+            stream: Report stream fed with partial text (None to not stream)
+            stream_extractor: Factory for the report text extractor of ``stream``
+            validation_model: Pydantic model a lower tier's JSON must satisfy
+
+        Returns:
+            Tuple of (parsed response, accepted response text)
+        """
+        if callable(contents):
+            contents = await contents()
+
+        metrics = get_cascade_metrics()
+        with llm_stage(stage):
+            for tier, model_name in enumerate(policy.models):
+                # Each tier restarts the report, so it gets a fresh extractor
+                on_text = stream.start(stream_extractor()) if stream is not None else None
+                response = await self._generate(
+                    contents,
+                    response_model=response_model,
+                    on_text=on_text,
+                    model_name=model_name,
+                )
+                text = response.text
+                if tier == len(policy.models) - 1:
+                    try:
+                        result = parse(text)
+                    except ValueError as e:
+                        result, text = await self._repair_output(
+                            stage, response, e, parse, response_model
+                        )
+                    break
+
+                accepted = self._accept_tier_output(response, parse, validation_model)
+                if isinstance(accepted, str):
+                    logger.info(
+                        "Escalating to the next model tier",
+                        stage=stage,
+                        model=model_name,
+                        reason=accepted,
+                    )
+                    metrics.record_escalation(stage, accepted)
+                    job_usage().record_escalation(stage)
+                    continue
+                result, text = accepted
+                break
+
+        if policy.cascaded:
+            logger.info("Stage served by model tier", stage=stage, model=model_name, tier=tier)
+        metrics.record_served(stage, model_name)
+        job_usage().record_served(stage, model_name)
+        await get_response_cache().set(key, text)
+        return result, text
+
+    def _accept_tier_output(
+        self,
+        response: Any,
+        parse: Callable[[str], T],
+        validation_model: type[BaseModel] | None,
+    ) -> tuple[T, str] | str:
+        """Parse a lower cascade tier's output and check whether to keep it.
+
+        Only local repair is tried; output that needs a repair call is
+        escalated instead.
+
+        Args:
+            response: Response of the lower tier
+            parse: Parser for the response text
+            validation_model: Pydantic model the JSON output must satisfy
+
+        Returns:
+            Tuple of (parsed response, text) to accept, or the escalation reason
+        """
+        text = response.text
+        try:
+            result = parse(text)
+        except ValueError:
+            text = repair_json_text(text)
+            try:
+                result = parse(text)
+            except ValueError:
+                return "unparseable"
+
+        issue = quality_issue(
+            result,
+            truncated=getattr(response, "truncated", False) is True,
+            validation_model=validation_model,
+            min_report_chars=self.settings.gemini_cascade_min_report_chars,
+        )
+        return issue if issue is not None else (result, text)
+
+    async def _repair_output(
+        self,
+        stage: str,
+        response: Any,
+        error: ValueError,
+        parse: Callable[[str], T],
+        response_model: type[BaseModel] | None = None,
+    ) -> tuple[T, str]:
+        """Repair an unparseable response instead of regenerating it.
+
+        Local syntax repair is tried first. If that fails, the model is asked
+        to fix its own output, which costs one short call instead of a full
+        regeneration (and any re-upload). Only if both fail is
+        ``OutputRepairError`` raised, which the stage retry treats as a last
+        resort full retry.
+
+        Args:
+            stage: Prompt key (e.g. "stage2a")
+            response: Response that failed to parse
+            error: Parse error
+            parse: Parser for the response text
+            response_model: Structured output model, if requesting JSON
+
+        Returns:
+            Tuple of (parsed response, repaired text)
+
+        Raises:
+            OutputRepairError: If the output could not be repaired
+        """
+        metrics = get_repair_metrics()
+        original_tokens = usage_tokens(response)
+        logger.warning("Unparseable LLM response, repairing", stage=stage, error=str(error))
+
+        repaired = repair_json_text(response.text)
+        try:
+            result = parse(repaired)
+            metrics.record(stage, "local_repairs", tokens_saved=original_tokens)
+            logger.info("Repaired LLM response locally", stage=stage)
+            return result, repaired
+        except ValueError:
+            pass
+
+        prompt = REPAIR_PROMPT.format(error=error, output=response.text)
+        repair_response = await self._generate(
+            prompt, response_model=response_model, kind="repair"
+        )
+        repair_tokens = usage_tokens(repair_response)
+        for candidate in (repair_response.text, repair_json_text(repair_response.text)):
+            try:
+                result = parse(candidate)
+            except ValueError:
+                continue
+            metrics.record(
+                stage,
+                "model_repairs",
+                tokens_saved=max(original_tokens - repair_tokens, 0),
+                repair_call_tokens=repair_tokens,
+            )
+            logger.info("Repaired LLM response with follow-up call", stage=stage)
+            return result, candidate
+
+        metrics.record(stage, "failures", repair_call_tokens=repair_tokens)
+        raise OutputRepairError(f"Could not repair {stage} output: {error}") from error
+
+    async def _generate_json(
+        self,
+        stage: str,
+        inputs: dict[str, Any],
+        contents: Any | Callable[[], Awaitable[Any]],
+        response_model: type[BaseModel],
+        **stream_kwargs: Any,
+    ) -> dict[str, Any]:
+        """Generate a JSON stage output.
+
+        With structured output enabled the response is constrained to the
+        model's schema; otherwise JSON is pulled out of free text. Either way
+        it is validated against the model while parsing, so output that does
+        not match goes through output repair like unparseable output.
+
+        Args:
+            stage: Prompt key (e.g. "stage2a")
+            inputs: Stage inputs for the cache key
+            contents: Prompt contents, or an async factory for them
+            response_model: Pydantic model for the stage output
+            **stream_kwargs: ``stream`` and ``stream_extractor`` for streamed stages
+
+        Returns:
+            Stage output JSON
+        """
+        if not self.settings.gemini_structured_output:
+
+            def parse(text: str) -> dict[str, Any]:
+                result = self._parse_json_response(text)
+                response_model.model_validate(result)
+                return result
+
+            return await self._generate_cached(
+                stage,
+                inputs,
+                contents,
+                parse,
+                validation_model=response_model,
+                **stream_kwargs,
+            )
+
+        return await self._generate_cached(
+            stage,
+            inputs,
+            contents,
+            lambda text: parse_structured(text, response_model),
+            response_model=response_model,
+            validation_model=response_model,
+            **stream_kwargs,
+        )
+
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=30),
+        retry=retry_if_exception(is_transient_error),
+        before_sleep=record_retry,
+        reraise=True,
     )
-    def call_stage1(
+    async def call_stage1(
         self,
         history_pdf_bytes: bytes,
         patent_pdf_bytes: bytes | None = None,
@@ -146,17 +1324,32 @@ class GeminiClient:
         """
         logger.info("Calling Stage 1 - Record Extraction")
 
-        # Upload PDFs
-        history_file = self._upload_pdf(history_pdf_bytes, "prosecution_history.pdf")
+        inputs = {
+            "history_pdf_sha256": await asyncio.to_thread(_sha256, history_pdf_bytes),
+            "patent_pdf_sha256": (
+                await asyncio.to_thread(_sha256, patent_pdf_bytes) if patent_pdf_bytes else None
+            ),
+        }
 
-        parts = [self.prompts["stage1"], history_file]
+        # Uploads stay leased until the stage (with any continuations) is done
+        async with AsyncExitStack() as leases:
 
-        if patent_pdf_bytes:
-            patent_file = self._upload_pdf(patent_pdf_bytes, "issued_patent.pdf")
-            parts.append(patent_file)
+            async def build_parts() -> list[Any]:
+                # Upload PDFs
+                history_file = await self._upload_pdf(
+                    leases, history_pdf_bytes, "prosecution_history.pdf"
+                )
 
-        response = self.model.generate_content(parts)
-        result = self._parse_json_response(response.text)
+                parts = [self.prompts["stage1"], history_file]
+
+                if patent_pdf_bytes:
+                    patent_file = await self._upload_pdf(
+                        leases, patent_pdf_bytes, "issued_patent.pdf"
+                    )
+                    parts.append(patent_file)
+                return parts
+
+            result = await self._generate_json("stage1", inputs, build_parts, Stage1Extraction)
 
         logger.info("Stage 1 completed", keys=list(result.keys()))
         return result
@@ -164,8 +1357,11 @@ class GeminiClient:
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=30),
+        retry=retry_if_exception(is_transient_error),
+        before_sleep=record_retry,
+        reraise=True,
     )
-    def call_stage2a(
+    async def call_stage2a(
         self,
         stage1_extraction: dict[str, Any],
         tech_pack_content: str,
@@ -181,21 +1377,20 @@ class GeminiClient:
         """
         logger.info("Calling Stage 2A - Claim Construction & Estoppel")
 
-        prompt = f"""{self.prompts["stage2a"]}
-
-## STAGE 1 EXTRACTION DATA
-
-```json
-{json.dumps(stage1_extraction, indent=2)}
-```
-
-## TECH PACK
-
-{tech_pack_content}
-"""
+        prompt = self._layout(
+            "stage2a",
+            sections=[],
+            stage1_section=self._json_section(
+                "STAGE 1 EXTRACTION DATA", stage1_extraction, "stage1_extraction"
+            ),
+            tech_pack_section=_text_section("TECH PACK", tech_pack_content),
+        )
 
-        response = self.model.generate_content(prompt)
-        result = self._parse_json_response(response.text)
+        inputs = {
+            "stage1": self.fragments.digest(stage1_extraction),
+            "tech_pack": tech_pack_content,
+        }
+        result = await self._generate_json("stage2a", inputs, prompt, Stage2A)
 
         logger.info("Stage 2A completed", keys=list(result.keys()))
         return result
@@ -203,8 +1398,11 @@ class GeminiClient:
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=30),
+        retry=retry_if_exception(is_transient_error),
+        before_sleep=record_retry,
+        reraise=True,
     )
-    def call_stage2b(
+    async def call_stage2b(
         self,
         stage1_extraction: dict[str, Any],
         stage2a: dict[str, Any],
@@ -222,27 +1420,21 @@ class GeminiClient:
         """
         logger.info("Calling Stage 2B - Search & Technical Premise")
 
-        prompt = f"""{self.prompts["stage2b"]}
-
-## STAGE 1 EXTRACTION DATA
-
-```json
-{json.dumps(stage1_extraction, indent=2)}
-```
-
-## STAGE 2A DATA
-
-```json
-{json.dumps(stage2a, indent=2)}
-```
-
-## TECH PACK
-
-{tech_pack_content}
-"""
+        prompt = self._layout(
+            "stage2b",
+            sections=[self._json_section("STAGE 2A DATA", stage2a, "stage2a")],
+            stage1_section=self._json_section(
+                "STAGE 1 EXTRACTION DATA", stage1_extraction, "stage1_extraction"
+            ),
+            tech_pack_section=_text_section("TECH PACK", tech_pack_content),
+        )
 
-        response = self.model.generate_content(prompt)
-        result = self._parse_json_response(response.text)
+        inputs = {
+            "stage1": self.fragments.digest(stage1_extraction),
+            "stage2a": self.fragments.digest(stage2a),
+            "tech_pack": tech_pack_content,
+        }
+        result = await self._generate_json("stage2b", inputs, prompt, Stage2B)
 
         logger.info("Stage 2B completed", keys=list(result.keys()))
         return result
@@ -250,8 +1442,11 @@ class GeminiClient:
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=30),
+        retry=retry_if_exception(is_transient_error),
+        before_sleep=record_retry,
+        reraise=True,
     )
-    def call_stage2c(
+    async def call_stage2c(
         self,
         stage1_extraction: dict[str, Any],
         stage2a: dict[str, Any],
@@ -271,33 +1466,25 @@ class GeminiClient:
         """
         logger.info("Calling Stage 2C - Timeline & Global Synthesis")
 
-        prompt = f"""{self.prompts["stage2c"]}
-
-## STAGE 1 EXTRACTION DATA
-
-```json
-{json.dumps(stage1_extraction, indent=2)}
-```
-
-## STAGE 2A DATA
-
-```json
-{json.dumps(stage2a, indent=2)}
-```
-
-## STAGE 2B DATA
-
-```json
-{json.dumps(stage2b, indent=2)}
-```
-
-## TECH PACK
-
-{tech_pack_content}
-"""
+        prompt = self._layout(
+            "stage2c",
+            sections=[
+                self._json_section("STAGE 2A DATA", stage2a, "stage2a"),
+                self._json_section("STAGE 2B DATA", stage2b, "stage2b"),
+            ],
+            stage1_section=self._json_section(
+                "STAGE 1 EXTRACTION DATA", stage1_extraction, "stage1_extraction"
+            ),
+            tech_pack_section=_text_section("TECH PACK", tech_pack_content),
+        )
 
-        response = self.model.generate_content(prompt)
-        result = self._parse_json_response(response.text)
+        inputs = {
+            "stage1": self.fragments.digest(stage1_extraction),
+            "stage2a": self.fragments.digest(stage2a),
+            "stage2b": self.fragments.digest(stage2b),
+            "tech_pack": tech_pack_content,
+        }
+        result = await self._generate_json("stage2c", inputs, prompt, Stage2C)
 
         logger.info("Stage 2C completed", keys=list(result.keys()))
         return result
@@ -305,59 +1492,63 @@ class GeminiClient:
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=30),
+        retry=retry_if_exception(is_transient_error),
+        before_sleep=record_retry,
+        reraise=True,
     )
-    def call_stage3(
+    async def call_stage3(
         self,
         stage1_extraction: dict[str, Any],
         stage2_forensic: dict[str, Any],
+        stream: ReportStream | None = None,
     ) -> str:
         """Call Stage 3 - Report Generation.
 
         Args:
             stage1_extraction: Stage 1 output
             stage2_forensic: Merged Stage 2 output
+            stream: Receives the report text while it is generated
 
         Returns:
             Stage 3 report as Markdown string
         """
         logger.info("Calling Stage 3 - Report Generation")
 
-        prompt = f"""{self.prompts["stage3"]}
-
-## STAGE 1 EXTRACTION DATA
-
-```json
-{json.dumps(stage1_extraction, indent=2)}
-```
-
-## STAGE 2 FORENSIC DATA
-
-```json
-{json.dumps(stage2_forensic, indent=2)}
-```
-"""
-
-        response = self.model.generate_content(prompt)
+        prompt = self._layout(
+            "stage3",
+            sections=[
+                self._json_section("STAGE 2 FORENSIC DATA", stage2_forensic, "stage2_forensic")
+            ],
+            stage1_section=self._json_section(
+                "STAGE 1 EXTRACTION DATA", stage1_extraction, "stage1_extraction"
+            ),
+        )
 
         # Stage 3 returns markdown, not JSON
-        result = response.text.strip()
-
-        # Remove code block markers if present
-        if result.startswith("```markdown"):
-            result = result[11:]
-        elif result.startswith("```"):
-            result = result[3:]
-        if result.endswith("```"):
-            result = result[:-3]
+        inputs = {
+            "stage1": self.fragments.digest(stage1_extraction),
+            "stage2_forensic": self.fragments.digest(stage2_forensic),
+        }
+        result = await self._generate_cached(
+            "stage3",
+            inputs,
+            prompt,
+            self._parse_markdown_response,
+            stream=stream,
+            stream_extractor=MarkdownStreamExtractor,
+        )
 
         logger.info("Stage 3 completed", report_length=len(result))
-        return result.strip()
+        return result
 
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=30),
+        retry=retry_if_exception(is_transient_error),
+        before_sleep=record_retry,
+        reraise=True,
     )
-    def call_stage4(
+    async def call_stage4(
         self,
         stage1_extraction: dict[str, Any],
         stage2_forensic: dict[str, Any],
@@ -365,6 +1556,11 @@ class GeminiClient:
     ) -> tuple[dict[str, Any], str]:
         """Call Stage 4 - QC & Verification.
 
+        The model returns its QC JSON and a list of edits instead of a
+        corrected copy of the report; the edits are applied to the Stage 3
+        report here (see ``apply_report_edits``). Edits that cannot be
+        applied are listed in the QC JSON's ``edit_conflicts``.
+
         Args:
             stage1_extraction: Stage 1 output
             stage2_forensic: Merged Stage 2 output
@@ -375,61 +1571,39 @@ class GeminiClient:
         """
         logger.info("Calling Stage 4 - QC & Verification")
 
-        prompt = f"""{self.prompts["stage4"]}
-
-## STAGE 1 EXTRACTION DATA
-
-```json
-{json.dumps(stage1_extraction, indent=2)}
-```
-
-## STAGE 2 FORENSIC DATA
-
-```json
-{json.dumps(stage2_forensic, indent=2)}
-```
-
-## STAGE 3 REPORT
-
-{stage3_report_md}
-
----
-
-Please provide your response in two clearly separated sections:
-
-### QC_JSON_OUTPUT
-```json
-{{your QC JSON here}}
-```
-
-### FINAL_REPORT_OUTPUT
-```markdown
-{{corrected final report here}}
-```
-"""
-
-        response = self.model.generate_content(prompt)
-        text = response.text
+        prompt = self._layout(
+            "stage4",
+            sections=[
+                self._json_section("STAGE 2 FORENSIC DATA", stage2_forensic, "stage2_forensic"),
+                _text_section("STAGE 3 REPORT", stage3_report_md),
+                (
+                    STAGE4_STRUCTURED_OUTPUT_FORMAT
+                    if self.settings.gemini_structured_output
+                    else STAGE4_OUTPUT_FORMAT
+                ),
+            ],
+            stage1_section=self._json_section(
+                "STAGE 1 EXTRACTION DATA", stage1_extraction, "stage1_extraction"
+            ),
+        )
 
-        # Parse QC JSON
-        qc_start = text.find("```json", text.find("QC_JSON_OUTPUT"))
-        qc_end = text.find("```", qc_start + 7)
-        qc_json_str = text[qc_start + 7:qc_end].strip()
-        qc_json = json.loads(qc_json_str)
-
-        # Parse final report
-        report_start = text.find("```markdown", text.find("FINAL_REPORT_OUTPUT"))
-        if report_start == -1:
-            report_start = text.find("```", text.find("FINAL_REPORT_OUTPUT"))
-            report_start = text.find("\n", report_start) + 1
-        else:
-            report_start += 11
-        report_end = text.rfind("```")
-        final_report = text[report_start:report_end].strip()
+        inputs = {
+            "stage1": self.fragments.digest(stage1_extraction),
+            "stage2_forensic": self.fragments.digest(stage2_forensic),
+            "stage3_report_md": stage3_report_md,
+        }
+        output = await self._generate_json("stage4", inputs, prompt, Stage4Output)
+        qc_json, edits = output["qc"], output.get("edits", [])
+        result = apply_report_edits(stage3_report_md, edits)
+        mark_corrected_issues(qc_json, result)
+        qc_json.update(result.summary())
+        final_report = result.report_md.strip()
 
         logger.info(
             "Stage 4 completed",
             qc_issues=len(qc_json.get("qc_issues", [])),
+            edits_applied=len(result.applied),
+            edit_conflicts=len(result.conflicts),
             report_length=len(final_report),
         )
         return qc_json, final_report
@@ -437,13 +1611,17 @@ Please provide your response in two clearly separated sections:
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=30),
+        retry=retry_if_exception(is_transient_error),
+        before_sleep=record_retry,
+        reraise=True,
     )
-    def call_search_intel(
+    async def call_search_intel(
         self,
         search_records: dict[str, Any],
         convergence_rows: list[dict[str, Any]],
         technical_reps: list[dict[str, Any]],
         tech_pack_content: str,
+        stream: ReportStream | None = None,
     ) -> str:
         """Call Search Intelligence Module (Pipeline 2).
 
@@ -452,52 +1630,58 @@ Please provide your response in two clearly separated sections:
             convergence_rows: Convergence analysis from Stage 2B
             technical_reps: Technical representations from Stage 2B
             tech_pack_content: Tech pack markdown content
+            stream: Receives the report text while it is generated
 
         Returns:
             Search Intelligence report as Markdown string
         """
         logger.info("Calling Search Intelligence Module")
 
-        prompt = f"""{self.prompts["search_intel"]}
-
-## SEARCH RECORDS
-
-```json
-{json.dumps(search_records, indent=2)}
-```
-
-## CONVERGENCE ANALYSIS
-
-```json
-{json.dumps(convergence_rows, indent=2)}
-```
+        prompt = self._layout(
+            "search_intel",
+            sections=[
+                self._json_section("SEARCH RECORDS", search_records, "search_records"),
+                self._json_section("CONVERGENCE ANALYSIS", convergence_rows, "convergence_rows"),
+                self._json_section("TECHNICAL REPRESENTATIONS", technical_reps, "technical_reps"),
+            ],
+            tech_pack_section=_text_section("TECH PACK", tech_pack_content),
+        )
 
-## TECHNICAL REPRESENTATIONS
+        # Returns markdown
+        inputs = {
+            "search_records": self.fragments.digest(search_records),
+            "convergence_rows": self.fragments.digest(convergence_rows),
+            "technical_reps": self.fragments.digest(technical_reps),
+            "tech_pack": tech_pack_content,
+        }
+        result = await self._generate_cached(
+            "search_intel",
+            inputs,
+            prompt,
+            self._parse_markdown_response,
+            stream=stream,
+            stream_extractor=MarkdownStreamExtractor,
+        )
 
-```json
-{json.dumps(technical_reps, indent=2)}
-```
+        logger.info("Search Intelligence completed", report_length=len(result))
+        return result
 
-## TECH PACK
 
-{tech_pack_content}
-"""
+def _ignore_text(text: str) -> None:
+    """Stream callback for attempts whose text is not published."""
 
-        response = self.model.generate_content(prompt)
 
-        # Returns markdown
-        result = response.text.strip()
+def _chunk_text(chunk: Any) -> str:
+    """Text of a streamed chunk ("" for chunks without text, e.g. the final one)."""
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
 
-        # Remove code block markers if present
-        if result.startswith("```markdown"):
-            result = result[11:]
-        elif result.startswith("```"):
-            result = result[3:]
-        if result.endswith("```"):
-            result = result[:-3]
 
-        logger.info("Search Intelligence completed", report_length=len(result))
-        return result.strip()
+def _sha256(data: bytes) -> str:
+    """Hex SHA-256 of a byte string."""
+    return hashlib.sha256(data).hexdigest()
 
 
 def load_tech_pack(tech_center: str) -> str:
@@ -0,0 +1,209 @@
+"""Hedged LLM calls: a duplicate request for calls slower than usual."""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from functools import lru_cache
+from typing import Any, TypeVar
+
+import structlog
+
+from src.config import get_settings
+
+logger = structlog.get_logger(__name__)
+
+T = TypeVar("T")
+
+# Upper bound on saved-up hedge credits per stage, so a long quiet period
+# cannot fund a burst of duplicates
+MAX_HEDGE_CREDITS = 10.0
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty sample list."""
+    ordered = sorted(samples)
+    rank = math.ceil(pct / 100 * len(ordered))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+class _StageHedging:
+    """Latency history, hedge budget and counters of one stage."""
+
+    def __init__(self, history_size: int) -> None:
+        self.latencies: deque[float] = deque(maxlen=history_size)
+        self.credits = 0.0
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+
+
+class Hedger:
+    """Send a duplicate of a stage call that is slower than usual.
+
+    Each stage keeps a window of recent call latencies. Once a call has
+    run longer than the configured percentile of that window, a second
+    identical call is started; whichever finishes first is used and the
+    other is cancelled. Every call earns ``budget_ratio`` of a hedge credit
+    for its stage and every hedge spends a whole credit, so duplicates stay
+    within that fraction of a stage's calls.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        min_samples: int = 20,
+        history_size: int = 200,
+        budget_ratio: float = 0.1,
+        enabled: bool = True,
+    ) -> None:
+        """Initialize the hedger.
+
+        Args:
+            percentile: Latency percentile after which a call is hedged
+            min_samples: Latencies a stage needs before its calls are hedged
+            history_size: Latencies kept per stage
+            budget_ratio: Hedge credits earned per call
+            enabled: If False, calls are never hedged
+        """
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.history_size = history_size
+        self.budget_ratio = budget_ratio
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stages: dict[str, _StageHedging] = {}
+
+    def _stage(self, stage: str) -> _StageHedging:
+        """Get a stage's state (call with the lock held)."""
+        entry = self._stages.get(stage)
+        if entry is None:
+            entry = _StageHedging(self.history_size)
+            self._stages[stage] = entry
+        return entry
+
+    def record_latency(self, stage: str, seconds: float) -> None:
+        """Add an observed call latency to a stage's history."""
+        with self._lock:
+            self._stage(stage).latencies.append(seconds)
+
+    def hedge_delay(self, stage: str) -> float | None:
+        """Seconds after which a stage call is hedged (None until enough history)."""
+        with self._lock:
+            latencies = list(self._stage(stage).latencies)
+        if len(latencies) < max(self.min_samples, 1):
+            return None
+        return percentile(latencies, self.percentile)
+
+    def _start_call(self, stage: str) -> None:
+        """Count a call and credit the stage's hedge budget."""
+        with self._lock:
+            entry = self._stage(stage)
+            entry.calls += 1
+            entry.credits = min(entry.credits + self.budget_ratio, MAX_HEDGE_CREDITS)
+
+    def _spend_credit(self, stage: str) -> bool:
+        """Take a hedge credit from the stage's budget, if one is available."""
+        with self._lock:
+            entry = self._stage(stage)
+            if entry.credits < 1.0:
+                entry.budget_denied += 1
+                return False
+            entry.credits -= 1.0
+            entry.hedged += 1
+            return True
+
+    async def run(self, stage: str, attempt: Callable[[bool], Awaitable[T]]) -> T:
+        """Run a call, hedging it if it outlasts the stage's latency percentile.
+
+        Args:
+            stage: Stage key the latency history and budget belong to
+            attempt: Starts one attempt; called with True for the duplicate
+
+        Returns:
+            Result of the first attempt to succeed
+
+        Raises:
+            Exception: The primary attempt's error if both attempts fail
+        """
+        if not self.enabled:
+            return await attempt(False)
+
+        delay = self.hedge_delay(stage)
+        self._start_call(stage)
+        started = time.monotonic()
+        primary = asyncio.ensure_future(attempt(False))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and self._spend_credit(stage):
+                logger.info(
+                    "Hedging slow LLM call", stage=stage, after_seconds=round(delay or 0, 2)
+                )
+                tasks.append(asyncio.ensure_future(attempt(True)))
+            winner = await self._first_success(tasks)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        if winner.exception() is not None:
+            return winner.result()
+        # A cancelled primary's runtime is a lower bound on its latency;
+        # keeping it preserves the tail of the distribution
+        self.record_latency(stage, time.monotonic() - started)
+        if winner is not primary:
+            with self._lock:
+                self._stage(stage).hedge_wins += 1
+        return winner.result()
+
+    @staticmethod
+    async def _first_success(tasks: list[asyncio.Future]) -> asyncio.Future:
+        """Wait for the first task to succeed (the first task's error if none does)."""
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in tasks:
+                if task in done and task.exception() is None:
+                    return task
+        return tasks[0]
+
+    def stats(self) -> dict[str, Any]:
+        """Get hedging counters and current hedge delays per stage."""
+        with self._lock:
+            stages = {
+                stage: {
+                    "calls": entry.calls,
+                    "hedged": entry.hedged,
+                    "hedge_wins": entry.hedge_wins,
+                    "budget_denied": entry.budget_denied,
+                    "credits": round(entry.credits, 2),
+                    "samples": len(entry.latencies),
+                }
+                for stage, entry in self._stages.items()
+            }
+        for stage, entry in stages.items():
+            delay = self.hedge_delay(stage)
+            entry["hedge_delay_seconds"] = round(delay, 3) if delay is not None else None
+        return {
+            "enabled": self.enabled,
+            "percentile": self.percentile,
+            "budget_ratio": self.budget_ratio,
+            "stages": stages,
+        }
+
+
+@lru_cache
+def get_hedger() -> Hedger:
+    """Get the process-wide hedger for Gemini stage calls."""
+    settings = get_settings()
+    return Hedger(
+        percentile=settings.gemini_hedge_percentile,
+        min_samples=settings.gemini_hedge_min_samples,
+        history_size=settings.gemini_hedge_history_size,
+        budget_ratio=settings.gemini_hedge_budget_ratio,
+        enabled=settings.gemini_hedging_enabled,
+    )
@@ -0,0 +1,459 @@
+"""Pluggable backend for LLM provider calls: live, recording or replaying cassettes.
+
+Every Gemini and Claude call made by ``GeminiClient`` and ``BaseAgent`` goes
+through the process's backend. The live backend simply sends the request.
+The recording backend sends it too and appends the response, with its
+timing, to a cassette file. The replaying backend serves responses from
+cassettes without any network access, optionally with simulated latency,
+so whole pipeline runs can be benchmarked and profiled offline.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from functools import cached_property, lru_cache
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import structlog
+
+from src.config import get_settings
+from src.patent_pipeline.services.continuation import finish_reason
+
+logger = structlog.get_logger(__name__)
+
+# Chunks a replayed streaming response is split into
+REPLAY_STREAM_CHUNKS = 20
+
+
+class CassetteMissError(LookupError):
+    """A replayed request has no recorded response."""
+
+
+@dataclass
+class LLMRequest:
+    """One provider request, identified by a canonical hash of its payload."""
+
+    provider: str
+    model: str
+    stage: str
+    payload: dict[str, Any]
+    files: dict[str, str] = field(default_factory=dict)  # uploaded file name -> content hash
+
+    @cached_property
+    def key(self) -> str:
+        """Canonical hash of the request (uploaded files by content hash)."""
+
+        def default(value: Any) -> str:
+            name = getattr(value, "name", None)
+            if isinstance(name, str) and name in self.files:
+                return f"file:{self.files[name]}"
+            return str(value)
+
+        canonical = json.dumps(
+            {"provider": self.provider, "model": self.model, "payload": self.payload},
+            sort_keys=True,
+            default=default,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _int(value: Any) -> int:
+    """Integer attribute value (0 if missing or not an integer)."""
+    return value if isinstance(value, int) else 0
+
+
+def _response_entry(request: LLMRequest, response: Any) -> dict[str, Any]:
+    """Serialize a provider response for a cassette."""
+    if request.provider == "claude":
+        usage = getattr(response, "usage", None)
+        return {
+            "text": response.content[0].text,
+            "finish_reason": getattr(response, "stop_reason", None) or "",
+            "usage": {
+                name: _int(getattr(usage, name, 0))
+                for name in (
+                    "input_tokens",
+                    "output_tokens",
+                    "cache_read_input_tokens",
+                    "cache_creation_input_tokens",
+                )
+            },
+        }
+    usage = getattr(response, "usage_metadata", None)
+    return {
+        "text": response.text,
+        "finish_reason": finish_reason(response),
+        "usage": {
+            name: _int(getattr(usage, name, 0))
+            for name in (
+                "prompt_token_count",
+                "candidates_token_count",
+                "cached_content_token_count",
+                "total_token_count",
+            )
+        },
+    }
+
+
+def _replayed_response(provider: str, entry: dict[str, Any]) -> Any:
+    """Rebuild a provider-shaped response from a cassette entry."""
+    usage = SimpleNamespace(**entry["usage"])
+    if provider == "claude":
+        return SimpleNamespace(
+            content=[SimpleNamespace(type="text", text=entry["text"])],
+            stop_reason=entry["finish_reason"],
+            usage=usage,
+        )
+    return SimpleNamespace(
+        text=entry["text"],
+        candidates=[SimpleNamespace(finish_reason=entry["finish_reason"])],
+        usage_metadata=usage,
+    )
+
+
+Send = Callable[[Callable[[], None]], Awaitable[Any]]
+
+
+def _ignore_first_byte() -> None:
+    """First-byte hook for callers that do not track it."""
+
+
+class LLMBackend(ABC):
+    """Executes LLM provider calls."""
+
+    name = "base"
+    context_caching = True  # whether Gemini context caches may be created
+
+    def __init__(self) -> None:
+        """Initialize the backend."""
+        self._files: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def request(
+        self, provider: str, model: str, stage: str | None, payload: dict[str, Any]
+    ) -> LLMRequest:
+        """Describe a provider request.
+
+        Args:
+            provider: Provider name ("gemini" or "claude")
+            model: Model name
+            stage: Stage key or agent name
+            payload: Everything sent to the provider besides the model
+
+        Returns:
+            Request description
+        """
+        with self._lock:
+            files = dict(self._files)
+        return LLMRequest(provider, model, stage or "unknown", payload, files)
+
+    @abstractmethod
+    async def call(
+        self,
+        request: LLMRequest,
+        send: Send,
+        on_text: Callable[[str], None] | None = None,
+        on_first_byte: Callable[[], None] | None = None,
+    ) -> Any:
+        """Execute a generate call.
+
+        Args:
+            request: Request description
+            send: Sends the request to the provider, given the first-byte
+                hook to call when a streamed response starts (the caller's
+                ``send`` streams through its own ``on_text``)
+            on_text: Streaming callback, for backends that do not call ``send``
+            on_first_byte: Caller's first-byte hook
+
+        Returns:
+            Provider response (or an object of the same shape)
+        """
+
+    async def upload_file(
+        self, sha256: str, display_name: str, send: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Upload a file to Gemini.
+
+        Args:
+            sha256: Content hash of the file
+            display_name: Display name of the upload
+            send: Performs the upload
+
+        Returns:
+            Uploaded file reference
+        """
+        uploaded = await send()
+        self._register_file(uploaded, sha256)
+        return uploaded
+
+    async def delete_file(self, name: str, send: Callable[[], Awaitable[Any]]) -> None:
+        """Delete an uploaded Gemini file.
+
+        Args:
+            name: File name
+            send: Performs the deletion
+        """
+        await send()
+        with self._lock:
+            self._files.pop(name, None)
+
+    def _register_file(self, uploaded: Any, sha256: str) -> None:
+        """Remember an uploaded file's content hash for request keys."""
+        name = getattr(uploaded, "name", None)
+        if isinstance(name, str):
+            with self._lock:
+                self._files[name] = sha256
+
+    def stats(self) -> dict[str, Any]:
+        """Get backend counters."""
+        return {"backend": self.name}
+
+
+class LiveLLMBackend(LLMBackend):
+    """Send every request to the provider."""
+
+    name = "live"
+
+    async def call(
+        self,
+        request: LLMRequest,
+        send: Send,
+        on_text: Callable[[str], None] | None = None,
+        on_first_byte: Callable[[], None] | None = None,
+    ) -> Any:
+        return await send(on_first_byte or _ignore_first_byte)
+
+
+class RecordingLLMBackend(LLMBackend):
+    """Send requests to the provider and append responses to a cassette.
+
+    Context caching is disabled so the recorded requests carry the full
+    prompt, matching what is replayed.
+    """
+
+    name = "record"
+    context_caching = False
+
+    def __init__(self, cassette_dir: str, cassette_name: str = "recording") -> None:
+        """Initialize the recorder.
+
+        Args:
+            cassette_dir: Directory of cassette files
+            cassette_name: Cassette file name (without ``.jsonl``)
+        """
+        super().__init__()
+        self.path = Path(cassette_dir) / f"{cassette_name}.jsonl"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.recorded = 0
+
+    async def call(
+        self,
+        request: LLMRequest,
+        send: Send,
+        on_text: Callable[[str], None] | None = None,
+        on_first_byte: Callable[[], None] | None = None,
+    ) -> Any:
+        started = time.monotonic()
+        ttfb: float | None = None
+
+        def first_byte() -> None:
+            nonlocal ttfb
+            if ttfb is None:
+                ttfb = time.monotonic() - started
+            if on_first_byte is not None:
+                on_first_byte()
+
+        response = await send(first_byte)
+        latency = time.monotonic() - started
+        entry = {
+            "key": request.key,
+            "provider": request.provider,
+            "model": request.model,
+            "stage": request.stage,
+            **_response_entry(request, response),
+            "latency_seconds": round(latency, 4),
+            "ttfb_seconds": round(ttfb, 4) if ttfb is not None else None,
+            "recorded_at": time.time(),
+        }
+        await asyncio.to_thread(self._append, json.dumps(entry, ensure_ascii=False))
+        return response
+
+    def _append(self, line: str) -> None:
+        """Append a cassette line."""
+        with self._lock:
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self.recorded += 1
+
+    def stats(self) -> dict[str, Any]:
+        """Get the cassette path and number of recorded responses."""
+        with self._lock:
+            return {"backend": self.name, "cassette": str(self.path), "recorded": self.recorded}
+
+
+class ReplayLLMBackend(LLMBackend):
+    """Serve recorded responses without calling any provider.
+
+    Requests are matched to cassette entries by key. A key recorded several
+    times replays its responses in turn (wrapping around), so one recording
+    can drive any number of concurrent jobs. Latency is simulated as:
+
+    - "none": responses return immediately
+    - "recorded": the recorded latency times ``latency_scale``
+    - "lognormal": a log-normal sample whose median is the recorded latency
+      times ``latency_scale``, with shape ``latency_sigma``
+
+    Streamed calls receive the text in chunks spread over the latency, after
+    the (scaled) recorded time to first byte. File uploads return stand-in
+    handles named after the content hash.
+    """
+
+    name = "replay"
+    context_caching = False
+
+    def __init__(
+        self,
+        cassette_dir: str,
+        latency: str = "recorded",
+        latency_scale: float = 1.0,
+        latency_sigma: float = 0.25,
+        seed: int | None = None,
+    ) -> None:
+        """Load the cassettes.
+
+        Args:
+            cassette_dir: Directory of ``.jsonl`` cassette files
+            latency: Latency model ("none", "recorded" or "lognormal")
+            latency_scale: Multiplier on recorded latencies
+            latency_sigma: Shape of the log-normal latency model
+            seed: Seed for sampled latencies (for repeatable runs)
+        """
+        super().__init__()
+        if latency not in ("none", "recorded", "lognormal"):
+            raise ValueError(f"Unknown replay latency model: {latency}")
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.latency_sigma = latency_sigma
+        self._random = random.Random(seed)
+        self._entries: dict[str, list[dict[str, Any]]] = {}
+        self._served: dict[str, int] = {}
+        self.misses = 0
+        for path in sorted(Path(cassette_dir).glob("*.jsonl")):
+            with path.open(encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry["key"], []).append(entry)
+        logger.info(
+            "Loaded LLM cassettes",
+            cassette_dir=cassette_dir,
+            requests=len(self._entries),
+            responses=sum(len(entries) for entries in self._entries.values()),
+        )
+
+    def _next_entry(self, request: LLMRequest) -> dict[str, Any]:
+        """Pick the recorded response for a request."""
+        with self._lock:
+            entries = self._entries.get(request.key)
+            if not entries:
+                self.misses += 1
+                raise CassetteMissError(
+                    f"No recorded {request.provider} response for {request.stage} "
+                    f"(key {request.key[:12]})"
+                )
+            served = self._served.get(request.key, 0)
+            self._served[request.key] = served + 1
+            return entries[served % len(entries)]
+
+    def _delay(self, entry: dict[str, Any]) -> float:
+        """Simulated latency of a replayed response."""
+        recorded = entry.get("latency_seconds") or 0.0
+        if self.latency == "none" or recorded <= 0:
+            return 0.0
+        median = recorded * self.latency_scale
+        if self.latency == "recorded":
+            return median
+        with self._lock:
+            return self._random.lognormvariate(math.log(median), self.latency_sigma)
+
+    async def call(
+        self,
+        request: LLMRequest,
+        send: Send,
+        on_text: Callable[[str], None] | None = None,
+        on_first_byte: Callable[[], None] | None = None,
+    ) -> Any:
+        entry = self._next_entry(request)
+        delay = self._delay(entry)
+        text = entry["text"]
+        if on_text is None or not text:
+            await asyncio.sleep(delay)
+        else:
+            recorded = entry.get("latency_seconds") or 0.0
+            ttfb = entry.get("ttfb_seconds")
+            share = min(ttfb / recorded, 1.0) if ttfb is not None and recorded > 0 else 0.0
+            await asyncio.sleep(delay * share)
+            if on_first_byte is not None:
+                on_first_byte()
+            step = math.ceil(len(text) / REPLAY_STREAM_CHUNKS)
+            gap = delay * (1 - share) / REPLAY_STREAM_CHUNKS
+            for end in range(step, len(text) + step, step):
+                on_text(text[:end])
+                await asyncio.sleep(gap)
+        return _replayed_response(request.provider, entry)
+
+    async def upload_file(
+        self, sha256: str, display_name: str, send: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        uploaded = SimpleNamespace(
+            name=f"files/replay-{sha256[:16]}",
+            display_name=display_name,
+            mime_type="application/pdf",
+            expiration_time=None,
+        )
+        self._register_file(uploaded, sha256)
+        return uploaded
+
+    async def delete_file(self, name: str, send: Callable[[], Awaitable[Any]]) -> None:
+        with self._lock:
+            self._files.pop(name, None)
+
+    def stats(self) -> dict[str, Any]:
+        """Get cassette size, served responses and misses."""
+        with self._lock:
+            return {
+                "backend": self.name,
+                "latency": self.latency,
+                "requests": len(self._entries),
+                "served": sum(self._served.values()),
+                "misses": self.misses,
+            }
+
+
+@lru_cache
+def get_llm_backend() -> LLMBackend:
+    """Get the process-wide LLM backend configured by ``llm_backend``."""
+    settings = get_settings()
+    mode = settings.llm_backend.lower()
+    if mode == "record":
+        return RecordingLLMBackend(settings.llm_cassette_dir, settings.llm_cassette_name)
+    if mode == "replay":
+        return ReplayLLMBackend(
+            settings.llm_cassette_dir,
+            latency=settings.llm_replay_latency,
+            latency_scale=settings.llm_replay_latency_scale,
+            latency_sigma=settings.llm_replay_latency_sigma,
+        )
+    if mode != "live":
+        logger.warning("Unknown LLM backend, using live", backend=mode)
+    return LiveLLMBackend()
@@ -0,0 +1,245 @@
+"""Process-wide registry of prompt templates and Gemini model handles."""
+
+import asyncio
+import contextvars
+import functools
+import hashlib
+import threading
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, TypeVar
+
+import google.generativeai as genai
+import structlog
+from google.generativeai.types import HarmBlockThreshold, HarmCategory
+
+from src.config import get_settings
+
+logger = structlog.get_logger(__name__)
+
+# Base path for prompts
+PROMPTS_DIR = Path(__file__).parent.parent / "prompts"
+
+# Pipeline stage keys and their prompt files
+PROMPT_FILES = {
+    "stage1": "PROMPT_Pipeline1_Stage1_RecordExtraction_v2.md",
+    "stage2a": "PROMPT_Pipeline1_Stage2A_ClaimConstruction_Estoppel_v2.md",
+    "stage2b": "PROMPT_Pipeline1_Stage2B_Search_Technical_v2.md",
+    "stage2c": "PROMPT_Pipeline1_Stage2C_Timeline_Synthesis_v2.md",
+    "stage3": "PROMPT_Pipeline1_Stage3_ReportGeneration_v2.md",
+    "stage4": "PROMPT_Pipeline1_Stage4_QC_Verification_v2.md",
+    "search_intel": "PROMPT_Pipeline2_SearchIntelligence_Module_v1.md",
+}
+
+SAFETY_SETTINGS = {
+    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+}
+
+T = TypeVar("T")
+
+# Pipeline stage or agent making the current LLM call (for per-stage metrics)
+_current_stage: contextvars.ContextVar[str] = contextvars.ContextVar("llm_stage", default="")
+
+
+def current_llm_stage() -> str:
+    """Get the stage or agent name set by the enclosing ``llm_stage`` block."""
+    return _current_stage.get()
+
+
+@contextmanager
+def llm_stage(stage: str) -> Iterator[None]:
+    """Attribute LLM calls made inside the block to a stage.
+
+    Args:
+        stage: Stage key (e.g. "stage2a") or agent name
+    """
+    token = _current_stage.set(stage)
+    try:
+        yield
+    finally:
+        _current_stage.reset(token)
+
+
+# Shared executor for blocking Gemini SDK calls (generation and file uploads)
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Get or create the process-wide executor for Gemini SDK calls."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=get_settings().gemini_max_concurrency,
+                    thread_name_prefix="gemini",
+                )
+    return _executor
+
+
+async def run_gemini_call(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking Gemini SDK call without blocking the event loop.
+
+    The SDK's grpc-asyncio client is bound to the first event loop that uses
+    it, while the pipeline may be driven from several loops (API server,
+    ``asyncio.run`` in scripts). Running the sync client on a bounded shared
+    executor works from any loop and lets concurrent stages and jobs overlap.
+
+    Args:
+        func: Blocking SDK callable (e.g. ``model.generate_content``)
+        *args: Positional arguments for ``func``
+        **kwargs: Keyword arguments for ``func``
+
+    Returns:
+        The callable's return value
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    return await loop.run_in_executor(_get_executor(), call)
+
+
+class LLMRegistry:
+    """Thread-safe cache of prompt files and Gemini model handles.
+
+    Pipeline nodes and agents are created per job (or per node call); routing
+    their prompt reads and ``GenerativeModel`` construction through one shared
+    registry means each prompt is read from disk once and each distinct model
+    configuration is built once per process.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self.settings = get_settings()
+        self._lock = threading.RLock()
+        self._configured = False
+        self._prompts: dict[str, str | None] = {}
+        self._models: dict[tuple, genai.GenerativeModel] = {}
+        self._counters = {
+            "configure_calls": 0,
+            "prompt_loads": 0,
+            "prompt_hits": 0,
+            "model_creations": 0,
+            "model_hits": 0,
+        }
+
+    def configure(self) -> None:
+        """Configure the Gemini SDK once per process."""
+        with self._lock:
+            if self._configured:
+                return
+            self._configured = True
+            if not self.settings.google_api_key:
+                logger.warning("Google API key not configured")
+                return
+            genai.configure(api_key=self.settings.google_api_key)
+            self._counters["configure_calls"] += 1
+
+    def preload(self) -> None:
+        """Configure the SDK and read all pipeline prompts (call at startup)."""
+        self.configure()
+        for filename in PROMPT_FILES.values():
+            self.prompt_text(filename)
+        logger.info("LLM registry preloaded", prompts=len(self._prompts))
+
+    def prompt_text(self, filename: str) -> str | None:
+        """Get a prompt file's content, reading it from disk only once.
+
+        Args:
+            filename: Prompt file name within the prompts directory
+
+        Returns:
+            Prompt content, or None if the file does not exist
+        """
+        with self._lock:
+            if filename in self._prompts:
+                self._counters["prompt_hits"] += 1
+                return self._prompts[filename]
+
+            path = PROMPTS_DIR / filename
+            text = None
+            if path.exists():
+                text = path.read_text(encoding="utf-8")
+                logger.debug("Loaded prompt", path=str(path))
+            else:
+                logger.warning("Prompt file not found", path=str(path))
+            self._prompts[filename] = text
+            self._counters["prompt_loads"] += 1
+            return text
+
+    def prompts(self) -> dict[str, str]:
+        """Get all pipeline stage prompts keyed by stage (e.g. "stage2a")."""
+        prompts = {}
+        for key, filename in PROMPT_FILES.items():
+            text = self.prompt_text(filename)
+            if text is not None:
+                prompts[key] = text
+        return prompts
+
+    def gemini_model(
+        self,
+        model_name: str,
+        temperature: float,
+        max_output_tokens: int,
+        system_instruction: str | None = None,
+    ) -> genai.GenerativeModel:
+        """Get a shared Gemini model handle for a generation configuration.
+
+        Args:
+            model_name: Gemini model name
+            temperature: Sampling temperature
+            max_output_tokens: Output token limit
+            system_instruction: Optional system instruction
+
+        Returns:
+            Cached GenerativeModel instance
+        """
+        instruction_key = (
+            hashlib.sha256(system_instruction.encode("utf-8")).hexdigest()
+            if system_instruction
+            else None
+        )
+        key = (model_name, temperature, max_output_tokens, instruction_key)
+
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._counters["model_hits"] += 1
+                return model
+
+            self.configure()
+            model = genai.GenerativeModel(
+                model_name=model_name,
+                generation_config=genai.GenerationConfig(
+                    temperature=temperature,
+                    max_output_tokens=max_output_tokens,
+                ),
+                safety_settings=SAFETY_SETTINGS,
+                system_instruction=system_instruction,
+            )
+            self._models[key] = model
+            self._counters["model_creations"] += 1
+            logger.debug("Created Gemini model", model=model_name, temperature=temperature)
+            return model
+
+    def stats(self) -> dict[str, int]:
+        """Get registry counters (loads/creations vs. cache hits)."""
+        with self._lock:
+            return {
+                **self._counters,
+                "prompts_cached": len(self._prompts),
+                "models_cached": len(self._models),
+            }
+
+
+@lru_cache
+def get_llm_registry() -> LLMRegistry:
+    """Get the process-wide LLM registry."""
+    return LLMRegistry()
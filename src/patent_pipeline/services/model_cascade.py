@@ -0,0 +1,131 @@
+"""Per-stage model cascades: a fast model first, the configured model on escalation."""
+
+import re
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+from pydantic import BaseModel, ValidationError
+
+from src.config import Settings
+
+_HEADING = re.compile(r"^#{1,6} \S", re.MULTILINE)
+
+
+@dataclass(frozen=True)
+class CascadePolicy:
+    """Models a stage tries, cheapest first; the last one's output is always accepted."""
+
+    stage: str
+    models: tuple[str, ...]
+
+    @property
+    def cascaded(self) -> bool:
+        """Whether the stage starts on a cheaper tier."""
+        return len(self.models) > 1
+
+    @property
+    def cache_model(self) -> str:
+        """Model part of the response cache key (accepted output depends on all tiers)."""
+        return ">".join(self.models)
+
+
+def cascade_stages(settings: Settings) -> set[str]:
+    """Stage keys configured to start on the fast model."""
+    return {s.strip() for s in settings.gemini_cascade_stages.split(",") if s.strip()}
+
+
+def cascade_policy(stage: str, settings: Settings) -> CascadePolicy:
+    """Get the cascade policy of a stage.
+
+    Args:
+        stage: Prompt key (e.g. "stage2c")
+        settings: Application settings
+
+    Returns:
+        The fast and default models for cascaded stages, otherwise just the default
+    """
+    fast = settings.gemini_fast_model
+    if stage in cascade_stages(settings) and fast and fast != settings.gemini_model:
+        return CascadePolicy(stage, (fast, settings.gemini_model))
+    return CascadePolicy(stage, (settings.gemini_model,))
+
+
+def quality_issue(
+    result: Any,
+    truncated: bool = False,
+    validation_model: type[BaseModel] | None = None,
+    min_report_chars: int = 0,
+) -> str | None:
+    """Check a lower tier's parsed output before accepting it.
+
+    JSON outputs must validate against the stage model (the same check the
+    pipeline nodes run). Markdown reports must be at least
+    ``min_report_chars`` long and contain a heading.
+
+    Args:
+        result: Parsed stage output
+        truncated: Output was still cut off after continuations
+        validation_model: Pydantic model for JSON outputs
+        min_report_chars: Shortest acceptable Markdown report
+
+    Returns:
+        Escalation reason, or None if the output is acceptable
+    """
+    if truncated:
+        return "truncated"
+    if isinstance(result, str):
+        if len(result.strip()) < min_report_chars:
+            return "report_too_short"
+        if not _HEADING.search(result):
+            return "no_headings"
+        return None
+    if isinstance(result, dict) and validation_model is not None:
+        try:
+            validation_model.model_validate(result)
+        except ValidationError:
+            return "validation_failed"
+    return None
+
+
+class CascadeMetrics:
+    """Process-wide counts of which tier served each stage and why calls escalated."""
+
+    def __init__(self) -> None:
+        """Initialize counters."""
+        self._lock = threading.Lock()
+        self._stages: dict[str, dict[str, Any]] = {}
+
+    def _stage(self, stage: str) -> dict[str, Any]:
+        """Get a stage's counters (call with the lock held)."""
+        return self._stages.setdefault(stage, {"served_by": {}, "escalations": {}})
+
+    def record_served(self, stage: str, model: str) -> None:
+        """Count a stage output accepted from a model."""
+        with self._lock:
+            served = self._stage(stage)["served_by"]
+            served[model] = served.get(model, 0) + 1
+
+    def record_escalation(self, stage: str, reason: str) -> None:
+        """Count an escalation to the next tier."""
+        with self._lock:
+            escalations = self._stage(stage)["escalations"]
+            escalations[reason] = escalations.get(reason, 0) + 1
+
+    def stats(self) -> dict[str, Any]:
+        """Get per-stage serving and escalation counts."""
+        with self._lock:
+            return {
+                stage: {
+                    "served_by": dict(entry["served_by"]),
+                    "escalations": dict(entry["escalations"]),
+                }
+                for stage, entry in self._stages.items()
+            }
+
+
+@lru_cache
+def get_cascade_metrics() -> CascadeMetrics:
+    """Get the process-wide cascade metrics."""
+    return CascadeMetrics()
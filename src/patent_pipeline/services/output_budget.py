@@ -0,0 +1,238 @@
+"""Per-stage output token budgets learned from recent output sizes."""
+
+import math
+import threading
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+import structlog
+
+from src.config import get_settings
+from src.patent_pipeline.services.hedging import percentile
+
+logger = structlog.get_logger(__name__)
+
+# Upper bounds (in MB of source PDFs) of the document size classes
+SIZE_CLASS_LIMITS_MB = (1, 4, 16)
+
+# Sample size recorded for output still cut off at the budget: its real size is unknown
+TRUNCATED_GROWTH = 2.0
+
+
+@dataclass
+class BudgetProfile:
+    """What the current job's output sizes depend on besides the stage.
+
+    Filled in as the job learns it: the document size at ingest and the
+    tech center once Stage 1 metadata is routed.
+    """
+
+    tech_center: str | None = None
+    document_bytes: int = 0
+
+    @property
+    def size_class(self) -> str:
+        """Document size class (e.g. "1-4MB")."""
+        megabytes = self.document_bytes / (1024 * 1024)
+        lower = 0
+        for limit in SIZE_CLASS_LIMITS_MB:
+            if megabytes < limit:
+                return f"{lower}-{limit}MB"
+            lower = limit
+        return f"{lower}MB+"
+
+
+_budget_profile: ContextVar[BudgetProfile | None] = ContextVar("budget_profile", default=None)
+
+
+def budget_profile() -> BudgetProfile:
+    """Get the current job's profile (a fresh, unshared one outside a scope)."""
+    return _budget_profile.get() or BudgetProfile()
+
+
+@contextmanager
+def budget_profile_scope() -> Iterator[BudgetProfile]:
+    """Share one budget profile across everything run inside the block.
+
+    Tasks created inside the block (e.g. LangGraph nodes) inherit the
+    profile, so a node can fill it in for the stages after it.
+
+    Yields:
+        The job's profile
+    """
+    profile = BudgetProfile()
+    token = _budget_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _budget_profile.reset(token)
+
+
+def parse_caps(spec: str) -> dict[str, int]:
+    """Parse per-stage output token caps.
+
+    Args:
+        spec: Comma-separated ``stage:tokens`` entries (e.g. "stage1:32768,QC:16384")
+
+    Returns:
+        Cap per stage key or agent name
+    """
+    caps: dict[str, int] = {}
+    for entry in spec.split(","):
+        stage, _, tokens = entry.partition(":")
+        try:
+            cap = int(tokens)
+        except ValueError:
+            if entry.strip():
+                logger.warning("Ignoring invalid output token cap", entry=entry)
+            continue
+        if stage.strip() and cap > 0:
+            caps[stage.strip()] = cap
+    return caps
+
+
+class OutputBudgets:
+    """Size each call's output token limit from recent outputs of its stage.
+
+    Output sizes are kept per (stage, tech center, document size class),
+    plus coarser keys without the tech center and/or size class. A call's
+    budget is the configured percentile of the most specific history with
+    at least ``min_samples`` sizes, plus ``headroom``, clamped to
+    ``min_tokens`` and the stage's cap. Until then the caller's default is
+    used. Output still truncated when recorded counts as
+    ``TRUNCATED_GROWTH`` times its size, so budgets grow after truncation.
+    """
+
+    def __init__(
+        self,
+        caps: dict[str, int] | None = None,
+        max_tokens: int = 65536,
+        min_tokens: int = 1024,
+        headroom: float = 0.25,
+        percentile: float = 95.0,
+        min_samples: int = 10,
+        history_size: int = 200,
+        enabled: bool = True,
+    ) -> None:
+        """Initialize the budgets.
+
+        Args:
+            caps: Hard cap per stage key or agent name
+            max_tokens: Cap of stages without their own
+            min_tokens: Smallest learned budget
+            headroom: Fraction added to the learned output size
+            percentile: Output size percentile budgets cover
+            min_samples: Sizes a history needs before it sets budgets
+            history_size: Sizes kept per history
+            enabled: If False, callers' defaults are used
+        """
+        self.caps = caps or {}
+        self.max_tokens = max_tokens
+        self.min_tokens = min_tokens
+        self.headroom = headroom
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.history_size = history_size
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._history: dict[tuple[str, str, str], deque[float]] = {}
+        self._counts = {"learned": 0, "default": 0, "truncated": 0}
+
+    def cap(self, stage: str) -> int:
+        """Hard output token cap of a stage."""
+        return self.caps.get(stage, self.max_tokens)
+
+    @staticmethod
+    def _keys(stage: str, profile: BudgetProfile) -> list[tuple[str, str, str]]:
+        """History keys of a call, most specific first."""
+        tech_center = profile.tech_center or "*"
+        size_class = profile.size_class if profile.document_bytes else "*"
+        return [
+            (stage, tech_center, size_class),
+            (stage, tech_center, "*"),
+            (stage, "*", size_class),
+            (stage, "*", "*"),
+        ]
+
+    def budget(self, stage: str | None, default: int) -> int:
+        """Get the output token limit for a call in the current job.
+
+        Args:
+            stage: Stage key or agent name
+            default: Limit to use before the stage has history
+
+        Returns:
+            Output token limit
+        """
+        stage = stage or "unknown"
+        cap = self.cap(stage)
+        if not self.enabled:
+            return min(default, cap)
+        with self._lock:
+            for key in self._keys(stage, budget_profile()):
+                sizes = self._history.get(key)
+                if sizes is not None and len(sizes) >= self.min_samples:
+                    learned = percentile(list(sizes), self.percentile) * (1 + self.headroom)
+                    self._counts["learned"] += 1
+                    return min(max(math.ceil(learned), self.min_tokens), cap)
+            self._counts["default"] += 1
+        return min(default, cap)
+
+    def record(self, stage: str | None, output_tokens: int, truncated: bool = False) -> None:
+        """Record the output size of a finished call in the current job.
+
+        Args:
+            stage: Stage key or agent name
+            output_tokens: Output tokens generated (summed over continuations)
+            truncated: Output was still cut off at the limit
+        """
+        if not self.enabled or output_tokens <= 0:
+            return
+        size = output_tokens * TRUNCATED_GROWTH if truncated else float(output_tokens)
+        with self._lock:
+            if truncated:
+                self._counts["truncated"] += 1
+            for key in self._keys(stage or "unknown", budget_profile()):
+                sizes = self._history.get(key)
+                if sizes is None:
+                    sizes = self._history[key] = deque(maxlen=self.history_size)
+                sizes.append(size)
+
+    def stats(self) -> dict[str, Any]:
+        """Get budget counters and the current stage-wide budgets."""
+        with self._lock:
+            stages = {
+                stage: math.ceil(percentile(list(sizes), self.percentile) * (1 + self.headroom))
+                for (stage, tech_center, size_class), sizes in self._history.items()
+                if tech_center == "*" and size_class == "*" and len(sizes) >= self.min_samples
+            }
+            return {
+                "enabled": self.enabled,
+                "histories": len(self._history),
+                "stage_budgets": {
+                    stage: min(max(tokens, self.min_tokens), self.cap(stage))
+                    for stage, tokens in stages.items()
+                },
+                **self._counts,
+            }
+
+
+@lru_cache
+def get_output_budgets() -> OutputBudgets:
+    """Get the process-wide output token budgets."""
+    settings = get_settings()
+    return OutputBudgets(
+        caps=parse_caps(settings.llm_output_token_caps),
+        max_tokens=settings.llm_output_token_max,
+        min_tokens=settings.llm_output_token_min,
+        headroom=settings.llm_output_token_headroom,
+        percentile=settings.llm_output_token_percentile,
+        min_samples=settings.llm_output_token_min_samples,
+        history_size=settings.llm_output_token_history_size,
+        enabled=settings.llm_output_budgets_enabled,
+    )
@@ -0,0 +1,216 @@
+"""Repair of unparseable LLM output and retry classification for stage calls."""
+
+import threading
+from functools import lru_cache
+from typing import Any
+
+import structlog
+from google.api_core import exceptions as api_exceptions
+from googleapiclient.errors import HttpError
+
+logger = structlog.get_logger(__name__)
+
+# Follow-up prompt asking the model to fix its own output without regenerating it
+REPAIR_PROMPT = """The output below could not be parsed.
+
+Parser error: {error}
+
+Return the same content with only the syntax fixed (for example unbalanced
+brackets, missing or trailing commas, unescaped quotes, or truncated JSON).
+Keep every field and value, keep the same overall format, and do not add
+commentary.
+
+## OUTPUT TO FIX
+
+{output}
+"""
+
+_TRANSIENT_API_ERRORS = (
+    api_exceptions.TooManyRequests,
+    api_exceptions.ResourceExhausted,
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.InternalServerError,
+    api_exceptions.GatewayTimeout,
+    api_exceptions.DeadlineExceeded,
+    api_exceptions.Aborted,
+)
+
+
+class OutputRepairError(ValueError):
+    """LLM output could not be parsed even after local and model repair."""
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Whether a stage call failure is worth a full retry.
+
+    Transport errors (rate limits, 5xx, timeouts, dropped connections) are
+    retried. So is output that stayed unparseable after repair, as a last
+    resort. Other failures (bad requests, auth, programming errors) are not.
+
+    Args:
+        error: Exception raised by a stage call
+
+    Returns:
+        True if the call should be retried
+    """
+    if isinstance(error, (OutputRepairError, ConnectionError, TimeoutError)):
+        return True
+    if isinstance(error, _TRANSIENT_API_ERRORS):
+        return True
+    if isinstance(error, HttpError):
+        status = getattr(error.resp, "status", 0)
+        return status == 429 or status >= 500
+    return False
+
+
+def extract_json_candidate(text: str) -> str:
+    """Get the JSON part of a response (fenced block or outermost brackets)."""
+    if "```json" in text:
+        start = text.find("```json") + 7
+        end = text.find("```", start)
+        return text[start:end if end != -1 else len(text)].strip()
+    if "```" in text:
+        start = text.find("```") + 3
+        end = text.find("```", start)
+        return text[start:end if end != -1 else len(text)].strip()
+
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return text.strip()
+    return text[min(starts):].strip()
+
+
+def repair_json_text(text: str) -> str:
+    """Apply local syntax repairs to JSON text.
+
+    Removes trailing commas, replaces smart quotes outside strings, closes an
+    unterminated string and closes unbalanced brackets (truncated output).
+    Text after the outermost value is dropped.
+
+    Args:
+        text: Response text containing JSON
+
+    Returns:
+        Repaired JSON text (which may still fail to parse)
+    """
+    text = extract_json_candidate(text)
+    out: list[str] = []
+    stack: list[str] = []
+    in_string = False
+    smart_string = False
+    escaped = False
+    pending_comma = False
+
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"' or (smart_string and char == "”"):
+                char = '"'
+                in_string = False
+            out.append(char)
+            continue
+
+        if char in "“”":
+            char = '"'
+            smart_string = True
+        elif char == '"':
+            smart_string = False
+        if char.isspace():
+            if not pending_comma:
+                out.append(char)
+            continue
+        if char == ",":
+            # Hold commas until the next token shows they are not trailing
+            pending_comma = True
+            continue
+        if char in "}]":
+            pending_comma = False
+            if stack:
+                out.append(stack.pop())
+            if not stack:
+                break
+            continue
+
+        if pending_comma:
+            out.append(",")
+            pending_comma = False
+        if char == '"':
+            in_string = True
+        elif char == "{":
+            stack.append("}")
+        elif char == "[":
+            stack.append("]")
+        out.append(char)
+
+    if in_string:
+        if escaped:
+            out.pop()
+        out.append('"')
+    while stack:
+        out.append(stack.pop())
+    return "".join(out)
+
+
+def usage_tokens(response: Any) -> int:
+    """Total tokens billed for a response (0 if usage is unavailable)."""
+    usage = getattr(response, "usage_metadata", None)
+    total = getattr(usage, "total_token_count", 0)
+    return total if isinstance(total, int) else 0
+
+
+class RepairMetrics:
+    """Process-wide counters for the output repair path."""
+
+    def __init__(self) -> None:
+        """Initialize counters."""
+        self._lock = threading.Lock()
+        self._counters = {
+            "attempts": 0,
+            "local_repairs": 0,
+            "model_repairs": 0,
+            "failures": 0,
+            "repair_call_tokens": 0,
+            "tokens_saved": 0,
+        }
+        self._by_stage: dict[str, dict[str, int]] = {}
+
+    def record(
+        self, stage: str, outcome: str, tokens_saved: int = 0, repair_call_tokens: int = 0
+    ) -> None:
+        """Record one repair attempt.
+
+        Args:
+            stage: Pipeline stage key
+            outcome: "local_repairs", "model_repairs" or "failures"
+            tokens_saved: Regeneration tokens avoided
+            repair_call_tokens: Tokens spent on the repair call
+        """
+        with self._lock:
+            self._counters["attempts"] += 1
+            self._counters[outcome] += 1
+            self._counters["tokens_saved"] += tokens_saved
+            self._counters["repair_call_tokens"] += repair_call_tokens
+            stage_counts = self._by_stage.setdefault(stage, {"attempts": 0, "repaired": 0})
+            stage_counts["attempts"] += 1
+            if outcome != "failures":
+                stage_counts["repaired"] += 1
+
+    def stats(self) -> dict[str, Any]:
+        """Get counters and the repair success rate."""
+        with self._lock:
+            attempts = self._counters["attempts"]
+            repaired = self._counters["local_repairs"] + self._counters["model_repairs"]
+            return {
+                **self._counters,
+                "success_rate": repaired / attempts if attempts else None,
+                "by_stage": {stage: dict(c) for stage, c in self._by_stage.items()},
+            }
+
+
+@lru_cache
+def get_repair_metrics() -> RepairMetrics:
+    """Get the process-wide repair metrics."""
+    return RepairMetrics()
@@ -0,0 +1,443 @@
+"""Adaptive concurrency and circuit breaking for LLM provider calls."""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any
+
+import anthropic
+import structlog
+
+from src.config import get_settings
+from src.patent_pipeline.services.llm_registry import current_llm_stage
+from src.patent_pipeline.services.output_repair import OutputRepairError, is_transient_error
+
+logger = structlog.get_logger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """A provider's circuit breaker rejected the call.
+
+    Not a ``ConnectionError``, so stage retries do not spin on an open
+    breaker; agent calls may still fail over to another provider.
+    """
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """Whether a call failure signals provider overload.
+
+    Rate limits, 5xx responses, timeouts and dropped connections count;
+    unparseable output and request errors do not.
+    """
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    if isinstance(error, anthropic.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return is_transient_error(error) and not isinstance(error, OutputRepairError)
+
+
+class AdaptiveConcurrency:
+    """AIMD limit on in-flight calls.
+
+    Each successful call within the latency target raises the limit by
+    ``1 / limit`` (about +1 per limit's worth of calls). An overload error
+    or a call slower than the target multiplies it by ``decrease_factor``,
+    at most once per round trip: only calls started after the previous
+    decrease can lower it again, so one burst of failures counts once.
+    Waiters may sit on different event loops; each is woken on its own.
+    """
+
+    def __init__(
+        self,
+        initial: int = 16,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        latency_target_seconds: float = 180.0,
+        decrease_factor: float = 0.5,
+    ) -> None:
+        """Initialize the limiter.
+
+        Args:
+            initial: Starting limit
+            min_limit: Lowest limit
+            max_limit: Highest limit
+            latency_target_seconds: Calls slower than this count as congestion
+            decrease_factor: Multiplier applied to the limit on congestion
+        """
+        self.limit = float(max(min(initial, max_limit), min_limit))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target_seconds = latency_target_seconds
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self._waiters: deque[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+
+    async def acquire(self) -> float:
+        """Wait for a free slot.
+
+        Returns:
+            Monotonic time the slot was granted (pass it to ``release``)
+        """
+        with self._lock:
+            if self.in_flight < int(self.limit) and not self._waiters:
+                self.in_flight += 1
+                return time.monotonic()
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = (loop, future) not in self._waiters
+                if not granted:
+                    self._waiters.remove((loop, future))
+            if granted:
+                self.release(time.monotonic(), None)
+            raise
+        return time.monotonic()
+
+    def release(self, started: float, congested: bool | None) -> None:
+        """Free a slot and adjust the limit.
+
+        Args:
+            started: Value returned by ``acquire``
+            congested: Whether the call hit overload or ran past the latency
+                target (None to leave the limit unchanged)
+        """
+        with self._lock:
+            self.in_flight -= 1
+            if congested is True and started >= self._last_decrease:
+                self.limit = max(self.limit * self.decrease_factor, float(self.min_limit))
+                self._last_decrease = time.monotonic()
+                self.decreases += 1
+            elif congested is False:
+                self.limit = min(self.limit + 1 / self.limit, float(self.max_limit))
+            while self._waiters and self.in_flight < int(self.limit):
+                loop, future = self._waiters.popleft()
+                self.in_flight += 1
+                loop.call_soon_threadsafe(_grant, future)
+
+    def stats(self) -> dict[str, Any]:
+        """Get the current limit, in-flight calls, waiters and decreases."""
+        with self._lock:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "waiting": len(self._waiters),
+                "decreases": self.decreases,
+            }
+
+
+def _grant(future: asyncio.Future) -> None:
+    """Wake a waiter (on its own loop) unless it gave up."""
+    if not future.done():
+        future.set_result(None)
+
+
+class CircuitBreaker:
+    """Stop calling a provider that keeps failing, then probe it.
+
+    Closed: calls pass; the breaker trips open when the last ``window``
+    calls hold at least ``min_calls`` and their overload error rate reaches
+    ``failure_rate``. Open: calls are rejected for ``open_seconds``. Half
+    open: up to ``probe_calls`` calls go through as probes; a successful
+    probe closes the breaker, a failed one opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        window: int = 20,
+        min_calls: int = 10,
+        open_seconds: float = 30.0,
+        probe_calls: int = 1,
+    ) -> None:
+        """Initialize the breaker.
+
+        Args:
+            name: Provider/model the breaker guards (for logs and metrics)
+            failure_rate: Overload error rate at which the breaker trips
+            window: Recent call outcomes considered
+            min_calls: Outcomes needed before the breaker can trip
+            open_seconds: Time calls are rejected before probing
+            probe_calls: Concurrent probe calls while half open
+        """
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.probe_calls = probe_calls
+        self.state = CLOSED
+        self.rejected = 0
+        self.transitions: dict[str, int] = {}
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def _transition(self, state: str, reason: str) -> None:
+        """Move to a new state (call with the lock held)."""
+        key = f"{self.state}->{state}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        log = logger.warning if state == OPEN else logger.info
+        log(
+            "LLM circuit breaker state change",
+            breaker=self.name,
+            transition=key,
+            reason=reason,
+            stage=current_llm_stage(),
+        )
+        self.state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self._probes = 0
+        elif state == CLOSED:
+            self._outcomes.clear()
+
+    def retry_after(self) -> float:
+        """Seconds until an open breaker starts probing (0 if not open)."""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(self._opened_at + self.open_seconds - time.monotonic(), 0.0)
+
+    def try_acquire(self) -> bool | None:
+        """Ask to make a call.
+
+        Returns:
+            False for a normal call, True for a probe call, None if rejected
+        """
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    self.rejected += 1
+                    return None
+                self._transition(HALF_OPEN, "open_timeout")
+            if self.state == HALF_OPEN:
+                if self._probes >= self.probe_calls:
+                    self.rejected += 1
+                    return None
+                self._probes += 1
+                return True
+            return False
+
+    def record(self, probe: bool, failed: bool | None) -> None:
+        """Record a call outcome.
+
+        Args:
+            probe: Whether the call was a probe
+            failed: Whether the call hit overload (None if the outcome says
+                nothing about provider health, e.g. the call was cancelled)
+        """
+        with self._lock:
+            if probe:
+                self._probes = max(self._probes - 1, 0)
+                if self.state == HALF_OPEN and failed is not None:
+                    if failed:
+                        self._transition(OPEN, "probe_failed")
+                    else:
+                        self._transition(CLOSED, "probe_succeeded")
+                return
+            if failed is None or self.state != CLOSED:
+                return
+            self._outcomes.append(failed)
+            failures = sum(self._outcomes)
+            if (
+                len(self._outcomes) >= self.min_calls
+                and failures / len(self._outcomes) >= self.failure_rate
+            ):
+                self._transition(OPEN, "failure_rate")
+
+    def stats(self) -> dict[str, Any]:
+        """Get state, recent failure rate, rejections and transition counts."""
+        with self._lock:
+            outcomes = list(self._outcomes)
+            return {
+                "state": self.state,
+                "recent_calls": len(outcomes),
+                "recent_failure_rate": (
+                    round(sum(outcomes) / len(outcomes), 3) if outcomes else 0.0
+                ),
+                "rejected": self.rejected,
+                "transitions": dict(self.transitions),
+            }
+
+
+class OverloadControl:
+    """Adaptive concurrency limit and circuit breaker per provider/model.
+
+    A call first passes the breaker: while it is open the call either fails
+    fast with ``CircuitOpenError`` or, in "park" mode, waits (up to
+    ``max_park_seconds``) until probe calls have closed it again. It then
+    waits for a slot under the adaptive concurrency limit. Its outcome feeds
+    both.
+    """
+
+    def __init__(
+        self,
+        mode: str = "park",
+        max_park_seconds: float = 600.0,
+        park_poll_seconds: float = 1.0,
+        enabled: bool = True,
+        limiter_options: dict[str, Any] | None = None,
+        breaker_options: dict[str, Any] | None = None,
+    ) -> None:
+        """Initialize the controller.
+
+        Args:
+            mode: "park" to hold calls while a breaker is open, "fail_fast" to reject them
+            max_park_seconds: Longest a call is parked before it is rejected
+            park_poll_seconds: Interval at which parked calls recheck the breaker
+            enabled: If False, calls pass straight through
+            limiter_options: ``AdaptiveConcurrency`` arguments
+            breaker_options: ``CircuitBreaker`` arguments
+        """
+        self.mode = mode
+        self.max_park_seconds = max_park_seconds
+        self.park_poll_seconds = park_poll_seconds
+        self.enabled = enabled
+        self.limiter_options = limiter_options or {}
+        self.breaker_options = breaker_options or {}
+        self._lock = threading.Lock()
+        self._limiters: dict[str, AdaptiveConcurrency] = {}
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._parked = 0
+
+    def _guards(self, key: str) -> tuple[AdaptiveConcurrency, CircuitBreaker]:
+        """Get the limiter and breaker for a provider/model."""
+        with self._lock:
+            if key not in self._limiters:
+                self._limiters[key] = AdaptiveConcurrency(**self.limiter_options)
+                self._breakers[key] = CircuitBreaker(key, **self.breaker_options)
+            return self._limiters[key], self._breakers[key]
+
+    async def _pass_breaker(self, breaker: CircuitBreaker) -> bool:
+        """Wait until the breaker admits the call.
+
+        Returns:
+            Whether the call is a probe
+
+        Raises:
+            CircuitOpenError: If the breaker rejects the call (fail-fast mode,
+                or parked longer than ``max_park_seconds``)
+        """
+        admitted = breaker.try_acquire()
+        if admitted is not None:
+            return admitted
+        if self.mode != "park":
+            raise CircuitOpenError(f"Circuit breaker for {breaker.name} is {breaker.state}")
+
+        deadline = time.monotonic() + self.max_park_seconds
+        logger.info("Parking LLM call until the provider recovers", breaker=breaker.name)
+        with self._lock:
+            self._parked += 1
+        try:
+            while admitted is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CircuitOpenError(
+                        f"Circuit breaker for {breaker.name} stayed {breaker.state} "
+                        f"for {self.max_park_seconds:.0f}s"
+                    )
+                delay = breaker.retry_after() or self.park_poll_seconds
+                await asyncio.sleep(min(delay, self.park_poll_seconds, remaining))
+                admitted = breaker.try_acquire()
+        finally:
+            with self._lock:
+                self._parked -= 1
+        return admitted
+
+    @asynccontextmanager
+    async def call(self, provider: str, model: str) -> AsyncIterator[None]:
+        """Run the block as one provider call under the breaker and concurrency limit.
+
+        Args:
+            provider: Provider name (e.g. "gemini")
+            model: Model name
+
+        Raises:
+            CircuitOpenError: If the provider's breaker rejects the call
+        """
+        if not self.enabled:
+            yield
+            return
+
+        limiter, breaker = self._guards(f"{provider}/{model}")
+        probe = await self._pass_breaker(breaker)
+        try:
+            started = await limiter.acquire()
+        except BaseException:
+            breaker.record(probe, None)
+            raise
+
+        failed: bool | None = None
+        try:
+            yield
+            failed = False
+        except Exception as e:
+            failed = is_overload_error(e)
+            raise
+        finally:
+            breaker.record(probe, failed)
+            slow = time.monotonic() - started > limiter.latency_target_seconds
+            limiter.release(started, None if failed is None else failed or slow)
+
+    def stats(self) -> dict[str, Any]:
+        """Get limiter and breaker state per provider/model."""
+        with self._lock:
+            keys = list(self._limiters)
+            parked = self._parked
+        return {
+            "enabled": self.enabled,
+            "mode": self.mode,
+            "parked": parked,
+            "providers": {
+                key: {
+                    "concurrency": self._limiters[key].stats(),
+                    "breaker": self._breakers[key].stats(),
+                }
+                for key in keys
+            },
+        }
+
+
+@lru_cache
+def get_overload_control() -> OverloadControl:
+    """Get the process-wide overload controller for LLM provider calls."""
+    settings = get_settings()
+    mode = settings.llm_breaker_mode.lower()
+    if mode not in ("park", "fail_fast"):
+        logger.warning("Unknown circuit breaker mode, parking calls", mode=mode)
+        mode = "park"
+    return OverloadControl(
+        mode=mode,
+        max_park_seconds=settings.llm_breaker_max_park_seconds,
+        enabled=settings.llm_overload_control_enabled,
+        limiter_options={
+            "initial": settings.llm_concurrency_initial,
+            "min_limit": settings.llm_concurrency_min,
+            "max_limit": settings.llm_concurrency_max,
+            "latency_target_seconds": settings.llm_concurrency_latency_target_seconds,
+            "decrease_factor": settings.llm_concurrency_decrease_factor,
+        },
+        breaker_options={
+            "failure_rate": settings.llm_breaker_failure_rate,
+            "window": settings.llm_breaker_window,
+            "min_calls": settings.llm_breaker_min_calls,
+            "open_seconds": settings.llm_breaker_open_seconds,
+            "probe_calls": settings.llm_breaker_probe_calls,
+        },
+    )
@@ -0,0 +1,161 @@
+"""Per-job prompt fragments: stage artifacts serialized once for all prompts."""
+
+import hashlib
+import json
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+# Rough characters-per-token ratio used for size estimates
+CHARS_PER_TOKEN = 4
+
+
+def serialize_compact(data: Any) -> str:
+    """Serialize data as compact canonical JSON (sorted keys, no whitespace).
+
+    Args:
+        data: JSON-serializable data
+
+    Returns:
+        JSON string
+    """
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+@dataclass
+class Fragment:
+    """A serialized stage artifact and its size."""
+
+    label: str
+    text: str
+    sha256: str
+    uses: int = 0  # prompts that included the fragment
+
+    @property
+    def size_bytes(self) -> int:
+        """UTF-8 size of the fragment."""
+        return len(self.text.encode("utf-8"))
+
+    @property
+    def est_tokens(self) -> int:
+        """Estimated token count of the fragment."""
+        return len(self.text) // CHARS_PER_TOKEN
+
+
+class PromptFragments:
+    """Memo of serialized stage artifacts for one job.
+
+    Stage outputs flow through the pipeline state unchanged, so the same
+    extraction dict reaches Stages 2A-4 (and the agents) as the same object.
+    Fragments are memoized by object identity and hold a reference to the
+    object, so an id is never reused while its entry exists. Artifacts must
+    not be mutated after they are first serialized.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty memo."""
+        self._lock = threading.Lock()
+        self._fragments: dict[int, tuple[Any, Fragment]] = {}
+
+    def fragment(self, data: Any, label: str = "artifact") -> Fragment:
+        """Get the fragment for an artifact, serializing it on first use.
+
+        Args:
+            data: Stage artifact (dict or list)
+            label: Name used in size reports
+
+        Returns:
+            Memoized fragment
+        """
+        with self._lock:
+            entry = self._fragments.get(id(data))
+            if entry is not None and entry[0] is data:
+                return entry[1]
+
+        text = serialize_compact(data)
+        fragment = Fragment(
+            label=label,
+            text=text,
+            sha256=hashlib.sha256(text.encode("utf-8")).hexdigest(),
+        )
+        with self._lock:
+            self._fragments[id(data)] = (data, fragment)
+
+        logger.debug(
+            "Serialized prompt fragment",
+            label=label,
+            size_bytes=fragment.size_bytes,
+            est_tokens=fragment.est_tokens,
+        )
+        return fragment
+
+    def json(self, data: Any, label: str = "artifact") -> str:
+        """Get the compact JSON text for an artifact (counted as a prompt use)."""
+        fragment = self.fragment(data, label)
+        with self._lock:
+            fragment.uses += 1
+        return fragment.text
+
+    def digest(self, data: Any, label: str = "artifact") -> str:
+        """Get the SHA-256 of an artifact's compact JSON."""
+        return self.fragment(data, label).sha256
+
+    def report(self) -> list[dict[str, Any]]:
+        """Get the size and reuse count of every fragment."""
+        with self._lock:
+            fragments = [fragment for _, fragment in self._fragments.values()]
+        return [
+            {
+                "label": f.label,
+                "size_bytes": f.size_bytes,
+                "est_tokens": f.est_tokens,
+                "uses": f.uses,
+            }
+            for f in fragments
+        ]
+
+    def log_report(self) -> None:
+        """Log fragment sizes for the job."""
+        report = self.report()
+        logger.info(
+            "Prompt fragment sizes",
+            fragments=report,
+            total_bytes=sum(f["size_bytes"] for f in report),
+            total_est_tokens=sum(f["est_tokens"] for f in report),
+        )
+
+
+_job_fragments: ContextVar[PromptFragments | None] = ContextVar("job_fragments", default=None)
+
+
+def job_fragments() -> PromptFragments:
+    """Get the current job's fragments.
+
+    Outside a ``prompt_fragment_scope`` a fresh, unshared memo is returned,
+    so callers still get compact serialization without cross-call reuse.
+    """
+    return _job_fragments.get() or PromptFragments()
+
+
+@contextmanager
+def prompt_fragment_scope() -> Iterator[PromptFragments]:
+    """Share one fragment memo across everything run inside the block.
+
+    Tasks created inside the block (e.g. LangGraph nodes) inherit the memo.
+
+    Yields:
+        The job's fragments
+    """
+    fragments = PromptFragments()
+    token = _job_fragments.set(fragments)
+    try:
+        yield fragments
+    finally:
+        _job_fragments.reset(token)
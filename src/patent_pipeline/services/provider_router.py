@@ -0,0 +1,288 @@
+"""Health-aware routing of agent calls between LLM providers."""
+
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any
+
+import anthropic
+import structlog
+
+from src.config import get_settings
+from src.patent_pipeline.services.hedging import percentile
+from src.patent_pipeline.services.output_repair import is_transient_error
+from src.patent_pipeline.services.overload_control import CircuitOpenError
+
+logger = structlog.get_logger(__name__)
+
+PROVIDERS = ("gemini", "claude")
+
+
+def is_provider_error(error: BaseException) -> bool:
+    """Whether a call failure points at the provider rather than the request.
+
+    Rate limits, overload, 5xx responses, timeouts and dropped connections
+    count against a provider's health, as does a call rejected by the
+    provider's open circuit breaker; bad requests and auth errors do not.
+    """
+    if isinstance(error, CircuitOpenError):
+        return True
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    if isinstance(error, anthropic.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return is_transient_error(error)
+
+
+def parse_allow_list(spec: str) -> dict[str, tuple[str, ...]]:
+    """Parse per-stage failover targets.
+
+    Args:
+        spec: Comma-separated ``stage:provider|provider`` entries
+            (e.g. "Analyst:claude,Writer:gemini")
+
+    Returns:
+        Providers each stage may fail over to
+    """
+    allow: dict[str, tuple[str, ...]] = {}
+    for entry in spec.split(","):
+        stage, _, providers = entry.partition(":")
+        targets = tuple(p.strip().lower() for p in providers.split("|") if p.strip())
+        unknown = [p for p in targets if p not in PROVIDERS]
+        if unknown:
+            logger.warning("Ignoring unknown failover providers", stage=stage, providers=unknown)
+        targets = tuple(p for p in targets if p in PROVIDERS)
+        if stage.strip() and targets:
+            allow[stage.strip()] = targets
+    return allow
+
+
+class ProviderHealth:
+    """Rolling window of call outcomes for one provider and model."""
+
+    def __init__(self, window_seconds: float) -> None:
+        """Initialize the window.
+
+        Args:
+            window_seconds: Outcomes older than this are forgotten
+        """
+        self.window_seconds = window_seconds
+        self._samples: deque[tuple[float, float, bool]] = deque()
+
+    def record(self, latency: float, ok: bool) -> None:
+        """Add a call outcome."""
+        self._samples.append((time.monotonic(), latency, ok))
+        self._expire()
+
+    def _expire(self) -> None:
+        """Drop outcomes that left the window."""
+        cutoff = time.monotonic() - self.window_seconds
+        while self._samples and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+
+    def stats(self) -> dict[str, Any]:
+        """Get sample count, error rate and p95 latency over the window."""
+        self._expire()
+        samples = list(self._samples)
+        if not samples:
+            return {"samples": 0, "error_rate": 0.0, "p95_latency_seconds": None}
+        errors = sum(1 for _, _, ok in samples if not ok)
+        latencies = [latency for _, latency, ok in samples if ok]
+        return {
+            "samples": len(samples),
+            "error_rate": round(errors / len(samples), 3),
+            "p95_latency_seconds": round(percentile(latencies, 95), 3) if latencies else None,
+        }
+
+
+class ProviderRouter:
+    """Route agent calls away from a degraded provider.
+
+    Each provider/model keeps a rolling window of outcomes. A provider is
+    degraded once the window holds enough calls and either its error rate
+    or its p95 latency crosses the threshold. Calls of stages on the
+    allow-list then go to an allowed, healthy provider instead. Once the
+    failing calls age out of the window, traffic returns to the primary.
+    """
+
+    def __init__(
+        self,
+        models: dict[str, str],
+        allow: dict[str, tuple[str, ...]],
+        available: set[str] | None = None,
+        error_rate_threshold: float = 0.5,
+        latency_threshold_seconds: float = 300.0,
+        window_seconds: float = 300.0,
+        min_samples: int = 5,
+        enabled: bool = True,
+    ) -> None:
+        """Initialize the router.
+
+        Args:
+            models: Model name used per provider
+            allow: Providers each stage may fail over to
+            available: Providers with credentials (defaults to all)
+            error_rate_threshold: Error rate at which a provider is degraded
+            latency_threshold_seconds: p95 latency at which a provider is degraded
+            window_seconds: Length of the rolling window
+            min_samples: Calls in the window before a provider can be degraded
+            enabled: If False, calls always use their configured provider
+        """
+        self.models = models
+        self.allow = allow
+        self.available = set(PROVIDERS) if available is None else available
+        self.error_rate_threshold = error_rate_threshold
+        self.latency_threshold_seconds = latency_threshold_seconds
+        self.window_seconds = window_seconds
+        self.min_samples = min_samples
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._health: dict[str, ProviderHealth] = {}
+        self._failovers: dict[str, int] = {}
+
+    def _key(self, provider: str) -> str:
+        """Health key of a provider's configured model."""
+        return f"{provider}/{self.models.get(provider, '')}"
+
+    def _window(self, provider: str) -> ProviderHealth:
+        """Get a provider's window (call with the lock held)."""
+        key = self._key(provider)
+        health = self._health.get(key)
+        if health is None:
+            health = ProviderHealth(self.window_seconds)
+            self._health[key] = health
+        return health
+
+    def record(self, provider: str, latency: float, ok: bool) -> None:
+        """Add a call outcome to a provider's window."""
+        with self._lock:
+            self._window(provider).record(latency, ok)
+
+    @contextmanager
+    def observe(self, provider: str) -> Iterator[None]:
+        """Record the latency and outcome of the call made inside the block.
+
+        Failures that are not the provider's fault (see ``is_provider_error``)
+        are not recorded.
+        """
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            if is_provider_error(e):
+                self.record(provider, time.monotonic() - started, ok=False)
+            raise
+        self.record(provider, time.monotonic() - started, ok=True)
+
+    def degraded(self, provider: str) -> str | None:
+        """Why a provider is degraded (None if healthy)."""
+        with self._lock:
+            stats = self._window(provider).stats()
+        if stats["samples"] < self.min_samples:
+            return None
+        if stats["error_rate"] >= self.error_rate_threshold:
+            return "error_rate"
+        p95 = stats["p95_latency_seconds"]
+        if p95 is not None and p95 >= self.latency_threshold_seconds:
+            return "latency"
+        return None
+
+    def failover_target(self, stage: str, provider: str, portable: bool = True) -> str | None:
+        """Get a healthy provider a stage may move to from ``provider``.
+
+        Args:
+            stage: Stage (agent) name
+            provider: Provider being moved away from
+            portable: Whether the request can be sent to another provider
+                (requests carrying provider-specific file handles cannot)
+
+        Returns:
+            Target provider, or None if the stage has nowhere to go
+        """
+        if not self.enabled or not portable:
+            return None
+        for target in self.allow.get(stage, ()):
+            if target != provider and target in self.available and not self.degraded(target):
+                return target
+        return None
+
+    def route(self, stage: str, provider: str, portable: bool = True) -> str:
+        """Choose the provider for a stage's call.
+
+        Args:
+            stage: Stage (agent) name
+            provider: The stage's configured provider
+            portable: Whether the request can be sent to another provider
+
+        Returns:
+            Provider to call
+        """
+        if not self.enabled or not portable:
+            return provider
+        reason = self.degraded(provider)
+        if reason is None:
+            return provider
+        target = self.failover_target(stage, provider, portable)
+        if target is None:
+            return provider
+        self.count_failover(stage, provider, target, reason)
+        return target
+
+    def count_failover(self, stage: str, provider: str, target: str, reason: str) -> None:
+        """Count and log a call moved to another provider."""
+        key = f"{stage}:{provider}->{target}"
+        with self._lock:
+            self._failovers[key] = self._failovers.get(key, 0) + 1
+        logger.warning(
+            "Routing LLM call to another provider",
+            stage=stage,
+            provider=provider,
+            target=target,
+            reason=reason,
+        )
+
+    def stats(self) -> dict[str, Any]:
+        """Get provider health, degradation state and failover counts."""
+        with self._lock:
+            health = {key: window.stats() for key, window in self._health.items()}
+            failovers = dict(self._failovers)
+        return {
+            "enabled": self.enabled,
+            "providers": {
+                provider: {
+                    **health.get(self._key(provider), ProviderHealth(0).stats()),
+                    "model": self.models.get(provider),
+                    "available": provider in self.available,
+                    "degraded": self.degraded(provider),
+                }
+                for provider in PROVIDERS
+            },
+            "failovers": failovers,
+        }
+
+
+@lru_cache
+def get_provider_router() -> ProviderRouter:
+    """Get the process-wide provider router."""
+    settings = get_settings()
+    available = {
+        provider
+        for provider, key in (
+            ("gemini", settings.google_api_key),
+            ("claude", settings.anthropic_api_key),
+        )
+        if key
+    }
+    return ProviderRouter(
+        models={"gemini": settings.gemini_model, "claude": settings.default_model},
+        allow=parse_allow_list(settings.llm_failover_stages),
+        available=available,
+        error_rate_threshold=settings.llm_failover_error_rate,
+        latency_threshold_seconds=settings.llm_failover_p95_latency_seconds,
+        window_seconds=settings.llm_failover_window_seconds,
+        min_samples=settings.llm_failover_min_samples,
+        enabled=settings.llm_failover_enabled,
+    )
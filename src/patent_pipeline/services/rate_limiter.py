@@ -0,0 +1,386 @@
+"""Shared requests/minute and tokens/minute limiter for LLM calls."""
+
+import asyncio
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+import redis.asyncio as redis
+import structlog
+
+from src.config import get_settings
+from src.patent_pipeline.services.llm_registry import current_llm_stage
+from src.patent_pipeline.services.prompt_fragments import CHARS_PER_TOKEN
+
+logger = structlog.get_logger(__name__)
+
+# Limits are per minute; a full minute of quota may be used as a burst
+WINDOW_SECONDS = 60.0
+
+# Rough token estimate for uploaded files (a PDF page is ~258 tokens and
+# roughly 100 KB); the reservation is corrected from usage after the call
+FILE_BYTES_PER_TOKEN = 400
+
+# A bucket to charge: (key, seconds of quota per unit, units)
+Bucket = tuple[str, float, float]
+
+
+def estimate_tokens(contents: Any) -> int:
+    """Estimate the input tokens of request contents.
+
+    Args:
+        contents: Prompt string, list of parts, or list of role/parts turns
+
+    Returns:
+        Estimated token count
+    """
+    if isinstance(contents, str):
+        return len(contents) // CHARS_PER_TOKEN
+    if isinstance(contents, dict):
+        return estimate_tokens(contents.get("parts", contents.get("content", "")))
+    if isinstance(contents, (list, tuple)):
+        return sum(estimate_tokens(part) for part in contents)
+    size = getattr(contents, "size_bytes", 0)
+    return size // FILE_BYTES_PER_TOKEN if isinstance(size, int) else 0
+
+
+class RateLimitBackend(ABC):
+    """Shared quota state.
+
+    Buckets use the generic cell rate algorithm: each bucket stores the time
+    at which its quota is fully spent ("theoretical arrival time"). A
+    reservation pushes that time forward by ``units * interval`` and must
+    wait until it is no more than one window ahead of now. Reservations are
+    granted in arrival order, so queued callers are served first-come,
+    first-served.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def reserve(self, buckets: list[Bucket]) -> float:
+        """Reserve quota in all buckets.
+
+        Args:
+            buckets: Buckets to charge
+
+        Returns:
+            Seconds to wait before the reserved call may start
+        """
+
+    @abstractmethod
+    async def release(self, buckets: list[Bucket]) -> None:
+        """Return quota to buckets (negative units charge extra)."""
+
+
+class LocalRateLimitBackend(RateLimitBackend):
+    """Quota state for this process only."""
+
+    name = "local"
+
+    def __init__(self) -> None:
+        """Initialize empty buckets."""
+        self._lock = threading.Lock()
+        self._tat: dict[str, float] = {}
+
+    async def reserve(self, buckets: list[Bucket]) -> float:
+        now = time.monotonic()
+        wait = 0.0
+        with self._lock:
+            for key, interval, units in buckets:
+                tat = max(self._tat.get(key, now), now) + units * interval
+                self._tat[key] = tat
+                wait = max(wait, tat - WINDOW_SECONDS - now)
+        return wait
+
+    async def release(self, buckets: list[Bucket]) -> None:
+        with self._lock:
+            for key, interval, units in buckets:
+                if key in self._tat:
+                    self._tat[key] -= units * interval
+
+
+# Reserve in all buckets atomically using the server clock. KEYS are bucket
+# keys; ARGV is the window followed by (interval, units) per key.
+_RESERVE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local window = tonumber(ARGV[1])
+local wait = 0
+for i, key in ipairs(KEYS) do
+  local interval = tonumber(ARGV[i * 2])
+  local units = tonumber(ARGV[i * 2 + 1])
+  local tat = tonumber(redis.call('GET', key) or '0')
+  if tat < now then tat = now end
+  tat = tat + units * interval
+  redis.call('SET', key, tostring(tat), 'EX', math.ceil(tat - now + window))
+  if tat - window - now > wait then wait = tat - window - now end
+end
+return tostring(wait)
+"""
+
+
+# Return units to all buckets, keeping each key's TTL. Keys that already
+# expired are skipped rather than recreated without one. KEYS are bucket
+# keys; ARGV is the amount to subtract per key.
+_RELEASE_SCRIPT = """
+for i, key in ipairs(KEYS) do
+  local ttl = redis.call('PTTL', key)
+  if ttl > 0 then
+    local tat = tonumber(redis.call('GET', key)) - tonumber(ARGV[i])
+    redis.call('SET', key, tostring(tat), 'PX', ttl)
+  end
+end
+return 0
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Quota state shared by all processes through Redis."""
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "llm-ratelimit:") -> None:
+        """Initialize the Redis backend.
+
+        Args:
+            url: Redis connection URL
+            prefix: Key prefix
+        """
+        self.url = url
+        self.prefix = prefix
+        # redis.asyncio connections belong to the loop that opened them
+        self._clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def _client(self) -> redis.Redis:
+        """Get the Redis client for the running event loop."""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = redis.from_url(self.url)
+            self._clients[loop] = client
+        return client
+
+    async def reserve(self, buckets: list[Bucket]) -> float:
+        args: list[Any] = [WINDOW_SECONDS]
+        for _, interval, units in buckets:
+            args.extend([interval, units])
+        keys = [self.prefix + key for key, _, _ in buckets]
+        wait = await self._client().eval(_RESERVE_SCRIPT, len(keys), *keys, *args)
+        return float(wait)
+
+    async def release(self, buckets: list[Bucket]) -> None:
+        keys = [self.prefix + key for key, _, _ in buckets]
+        amounts = [units * interval for _, interval, units in buckets]
+        await self._client().eval(_RELEASE_SCRIPT, len(keys), *keys, *amounts)
+
+
+@dataclass
+class RateLimit:
+    """Per-minute limits for one provider (0 disables a limit)."""
+
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+
+
+class RateLimitSlot:
+    """A granted reservation; report actual usage with ``settle``."""
+
+    def __init__(self, estimated_tokens: int, waited: float) -> None:
+        """Initialize the slot.
+
+        Args:
+            estimated_tokens: Tokens reserved for the call
+            waited: Seconds spent queued for quota
+        """
+        self.estimated_tokens = estimated_tokens
+        self.actual_tokens: int | None = None
+        self.waited = waited
+
+    def settle(self, actual_tokens: int) -> None:
+        """Record the tokens the call actually used (0 or less is ignored)."""
+        if actual_tokens > 0:
+            self.actual_tokens = actual_tokens
+
+
+class RateLimiter:
+    """Queue LLM calls so each provider/model stays within RPM and TPM quotas.
+
+    Every call reserves one request plus its estimated tokens (input estimate
+    plus the output limit) before it starts, and waits until the quota
+    allows it instead of running into 429s. After the call the token
+    reservation is corrected to the reported usage. With the Redis backend
+    all API workers share one quota; if Redis is unreachable the limiter
+    falls back to per-process state.
+    """
+
+    def __init__(
+        self,
+        limits: dict[str, RateLimit],
+        backend: RateLimitBackend | None = None,
+        enabled: bool = True,
+    ) -> None:
+        """Initialize the limiter.
+
+        Args:
+            limits: Limits by provider (e.g. "gemini", "claude")
+            backend: Shared quota state (defaults to local)
+            enabled: If False, calls are never queued
+        """
+        self.limits = limits
+        self.backend = backend or LocalRateLimitBackend()
+        self.enabled = enabled
+        self._fallback = LocalRateLimitBackend()
+        self._lock = threading.Lock()
+        self._waits: dict[str, dict[str, float]] = {}
+        self.backend_errors = 0
+
+    def _buckets(self, provider: str, model: str, tokens: int) -> list[Bucket]:
+        """Get the buckets charged by a call."""
+        limit = self.limits.get(provider)
+        if limit is None:
+            return []
+        buckets = []
+        if limit.requests_per_minute > 0:
+            buckets.append(
+                (f"{provider}:{model}:rpm", WINDOW_SECONDS / limit.requests_per_minute, 1)
+            )
+        if limit.tokens_per_minute > 0:
+            buckets.append(
+                (f"{provider}:{model}:tpm", WINDOW_SECONDS / limit.tokens_per_minute, tokens)
+            )
+        return buckets
+
+    async def _call_backend(self, method: str, buckets: list[Bucket]) -> Any:
+        """Run a backend operation, falling back to local state on errors."""
+        try:
+            return await getattr(self.backend, method)(buckets)
+        except Exception as e:
+            with self._lock:
+                self.backend_errors += 1
+            logger.warning(
+                "Rate limit backend failed, using local limits",
+                backend=self.backend.name,
+                error=str(e),
+            )
+            return await getattr(self._fallback, method)(buckets)
+
+    @asynccontextmanager
+    async def slot(
+        self, provider: str, model: str, estimated_tokens: int
+    ) -> AsyncIterator[RateLimitSlot]:
+        """Wait for quota, then run the block as one call.
+
+        Args:
+            provider: Provider name (e.g. "gemini")
+            model: Model name
+            estimated_tokens: Estimated input plus output tokens
+
+        Yields:
+            Slot for reporting actual usage
+        """
+        buckets = self._buckets(provider, model, estimated_tokens) if self.enabled else []
+        if not buckets:
+            yield RateLimitSlot(estimated_tokens, 0.0)
+            return
+
+        started = time.monotonic()
+        wait = await self._call_backend("reserve", buckets)
+        if wait > 0:
+            if wait >= 1:
+                logger.info(
+                    "Waiting for LLM quota",
+                    provider=provider,
+                    model=model,
+                    stage=current_llm_stage(),
+                    wait_seconds=round(wait, 2),
+                )
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                await self._call_backend("release", buckets)
+                raise
+        slot = RateLimitSlot(estimated_tokens, time.monotonic() - started)
+        self._record_wait(provider, slot.waited)
+
+        try:
+            yield slot
+        finally:
+            if slot.actual_tokens is not None:
+                token_buckets = [b for b in buckets if b[0].endswith(":tpm")]
+                correction = [
+                    (key, interval, estimated_tokens - slot.actual_tokens)
+                    for key, interval, _ in token_buckets
+                ]
+                if correction:
+                    await self._call_backend("release", correction)
+
+    def _record_wait(self, provider: str, waited: float) -> None:
+        """Add a queue wait to the stage's counters."""
+        stage = current_llm_stage() or "unknown"
+        with self._lock:
+            entry = self._waits.setdefault(
+                f"{provider}/{stage}",
+                {"calls": 0, "queued": 0, "total_wait_seconds": 0.0, "max_wait_seconds": 0.0},
+            )
+            entry["calls"] += 1
+            if waited > 0.001:
+                entry["queued"] += 1
+            entry["total_wait_seconds"] += waited
+            entry["max_wait_seconds"] = max(entry["max_wait_seconds"], waited)
+
+    def stats(self) -> dict[str, Any]:
+        """Get limits and queue wait times per provider and stage."""
+        with self._lock:
+            waits = {
+                key: {
+                    **entry,
+                    "total_wait_seconds": round(entry["total_wait_seconds"], 3),
+                    "max_wait_seconds": round(entry["max_wait_seconds"], 3),
+                    "avg_wait_seconds": round(entry["total_wait_seconds"] / entry["calls"], 3),
+                }
+                for key, entry in self._waits.items()
+            }
+            return {
+                "enabled": self.enabled,
+                "backend": self.backend.name,
+                "backend_errors": self.backend_errors,
+                "limits": {
+                    provider: {
+                        "requests_per_minute": limit.requests_per_minute,
+                        "tokens_per_minute": limit.tokens_per_minute,
+                    }
+                    for provider, limit in self.limits.items()
+                },
+                "waits": waits,
+            }
+
+
+@lru_cache
+def get_rate_limiter() -> RateLimiter:
+    """Get the process-wide rate limiter."""
+    settings = get_settings()
+    backend_name = settings.llm_rate_limit_backend.lower()
+
+    backend: RateLimitBackend
+    if backend_name == "redis":
+        backend = RedisRateLimitBackend(settings.redis_url)
+    else:
+        if backend_name != "local":
+            logger.warning("Unknown rate limit backend, using local", backend=backend_name)
+        backend = LocalRateLimitBackend()
+
+    return RateLimiter(
+        limits={
+            "gemini": RateLimit(settings.gemini_rpm, settings.gemini_tpm),
+            "claude": RateLimit(settings.claude_rpm, settings.claude_tpm),
+        },
+        backend=backend,
+        enabled=settings.llm_rate_limit_enabled,
+    )
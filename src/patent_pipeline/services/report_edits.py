@@ -0,0 +1,171 @@
+"""Apply Stage 4 QC edit operations to the Stage 3 report."""
+
+import re
+from collections.abc import Sequence
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+import structlog
+from pydantic import ValidationError
+
+from src.patent_pipeline.models.stage4 import ReportEdit
+
+logger = structlog.get_logger(__name__)
+
+_HEADING = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t#]*$", re.MULTILINE)
+
+
+@dataclass
+class EditConflict:
+    """An edit that could not be applied."""
+
+    index: int  # position in the edit list
+    reason: str  # invalid, section_not_found, section_ambiguous, not_found, ambiguous, overlap
+    section: str = ""
+    find: str = ""
+    issue_id: str = ""
+
+
+@dataclass
+class EditResult:
+    """The edited report and what happened to each edit."""
+
+    report_md: str
+    applied: list[int] = field(default_factory=list)
+    applied_issues: list[str] = field(default_factory=list)
+    conflicts: list[EditConflict] = field(default_factory=list)
+
+    def summary(self) -> dict[str, Any]:
+        """Get the edit outcome for the QC JSON."""
+        return {
+            "edits_applied": len(self.applied),
+            "edit_conflicts": [asdict(conflict) for conflict in self.conflicts],
+        }
+
+
+def _heading_key(text: str) -> str:
+    """Normalize heading text for matching (case, emphasis and spacing)."""
+    return " ".join(text.replace("*", "").replace("_", " ").lower().split())
+
+
+def _section_span(report: str, anchor: str) -> tuple[int, int] | str:
+    """Find the section under the heading matching ``anchor``.
+
+    The section runs to the next heading of the same or a higher level.
+    An exact heading match is preferred over a heading containing the anchor.
+
+    Returns:
+        (start, end) offsets of the section, or the conflict reason
+    """
+    headings = list(_HEADING.finditer(report))
+    key = _heading_key(anchor.lstrip("#"))
+    matches = [h for h in headings if _heading_key(h.group(2)) == key]
+    if not matches:
+        matches = [h for h in headings if key in _heading_key(h.group(2))]
+    if not matches:
+        return "section_not_found"
+    if len(matches) > 1:
+        return "section_ambiguous"
+
+    heading = matches[0]
+    level = len(heading.group(1))
+    end = len(report)
+    for later in headings:
+        if later.start() > heading.start() and len(later.group(1)) <= level:
+            end = later.start()
+            break
+    return heading.start(), end
+
+
+def _locate(
+    report: str, edit: ReportEdit, accepted: list[tuple[int, int, str]]
+) -> tuple[int, int] | str:
+    """Find the report text an edit replaces.
+
+    Returns:
+        (start, end) offsets of the text, or the conflict reason
+    """
+    if not edit.find:
+        return "invalid"
+    span = _section_span(report, edit.section) if edit.section else (0, len(report))
+    if isinstance(span, str):
+        return span
+
+    start = report.find(edit.find, *span)
+    if start == -1:
+        return "not_found"
+    if report.find(edit.find, start + 1, span[1]) != -1:
+        return "ambiguous"
+    end = start + len(edit.find)
+    if any(start < other_end and other_start < end for other_start, other_end, _ in accepted):
+        return "overlap"
+    return start, end
+
+
+def apply_report_edits(
+    report_md: str, edits: Sequence[ReportEdit | dict[str, Any]]
+) -> EditResult:
+    """Apply find/replace edits to a report.
+
+    Every edit is located in the original report: ``find`` must occur
+    exactly once within its section (or the whole report if no section is
+    given). An edit whose text overlaps one accepted earlier in the list is
+    a conflict. Conflicting edits are skipped and reported; the rest are
+    applied together.
+
+    Args:
+        report_md: Stage 3 report Markdown
+        edits: Edit operations, in priority order
+
+    Returns:
+        The edited report with the applied edits and conflicts
+    """
+    result = EditResult(report_md=report_md)
+    accepted: list[tuple[int, int, str]] = []
+
+    for index, raw in enumerate(edits):
+        try:
+            edit = raw if isinstance(raw, ReportEdit) else ReportEdit.model_validate(raw)
+        except ValidationError:
+            result.conflicts.append(EditConflict(index, "invalid"))
+            continue
+
+        target = _locate(report_md, edit, accepted)
+        if isinstance(target, str):
+            result.conflicts.append(
+                EditConflict(index, target, edit.section, edit.find, edit.issue_id)
+            )
+            continue
+        accepted.append((*target, edit.replace))
+        result.applied.append(index)
+        if edit.issue_id:
+            result.applied_issues.append(edit.issue_id)
+
+    edited = report_md
+    for start, end, replace in sorted(accepted, reverse=True):
+        edited = edited[:start] + replace + edited[end:]
+    result.report_md = edited
+
+    if result.conflicts:
+        logger.warning(
+            "Some report edits were not applied",
+            applied=len(result.applied),
+            conflicts=[(c.index, c.reason) for c in result.conflicts],
+        )
+    return result
+
+
+def mark_corrected_issues(qc_json: dict[str, Any], result: EditResult) -> None:
+    """Set ``corrected`` on the QC issues that edits referred to.
+
+    An issue is corrected when all of its edits were applied.
+
+    Args:
+        qc_json: QC JSON whose ``qc_issues`` carry ``issue_id``
+        result: Outcome of applying the edits
+    """
+    failed = {c.issue_id for c in result.conflicts if c.issue_id}
+    fixed = set(result.applied_issues) - failed
+    for issue in qc_json.get("qc_issues", []):
+        if isinstance(issue, dict) and issue.get("issue_id") in fixed | failed:
+            issue["corrected"] = issue["issue_id"] in fixed
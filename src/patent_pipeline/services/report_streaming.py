@@ -0,0 +1,418 @@
+"""Streaming of report text to a progress channel and to staged blob blocks."""
+
+import asyncio
+import base64
+import threading
+import time
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any
+
+import structlog
+
+from src.config import get_settings
+from src.patent_pipeline.services.azure_io import commit_blob_blocks, stage_blob_block
+
+logger = structlog.get_logger(__name__)
+
+# Blob name suffixes of the streamed reports
+REPORT_BLOB_SUFFIXES = {
+    "stage3": "_Stage3_Report.md",
+    "stage4": "_Stage4_Final_Report.md",
+    "search_intel": "_Search_Intelligence_Report.md",
+}
+
+# Characters held back from staging; the final parse may trim the end of
+# the streamed text (closing code fence, whitespace)
+STAGING_HOLDBACK_CHARS = 64
+
+
+def report_blob_name(base_name: str, stage: str) -> str:
+    """Get the blob name of a stage's report (e.g. "APP_Stage3_Report.md")."""
+    return f"{base_name}{REPORT_BLOB_SUFFIXES[stage]}"
+
+
+class MarkdownStreamExtractor:
+    """Report text of a streamed Markdown response (opening code fence removed)."""
+
+    def __call__(self, raw: str) -> str:
+        text = raw.lstrip()
+        if text.startswith("```"):
+            newline = text.find("\n")
+            if newline == -1:
+                return ""
+            text = text[newline + 1:].lstrip()
+        return text
+
+
+class ReportProgress:
+    """Partial report text for one job, pushed to subscribers as it grows.
+
+    Subscribers may live on any event loop; events are handed over with
+    ``call_soon_threadsafe``.
+    """
+
+    def __init__(self, job_id: str) -> None:
+        """Initialize the channel.
+
+        Args:
+            job_id: Job identifier
+        """
+        self.job_id = job_id
+        self._lock = threading.Lock()
+        self._reports: dict[str, str] = {}
+        self._done: set[str] = set()
+        self._subscribers: list[tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+        self.closed = False
+        self.closed_at: float | None = None
+
+    def _emit(self, event: dict[str, Any] | None) -> None:
+        """Send an event (None ends the stream) to all subscribers."""
+        for loop, queue in self._subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                # Subscriber's loop is closed
+                pass
+
+    def publish(self, stage: str, text: str) -> None:
+        """Publish a stage's report text so far.
+
+        Args:
+            stage: Stage key (e.g. "stage3")
+            text: Report text generated so far
+        """
+        with self._lock:
+            previous = self._reports.get(stage, "")
+            if text == previous:
+                return
+            self._reports[stage] = text
+            self._done.discard(stage)
+            if text.startswith(previous):
+                event = {"type": "chunk", "stage": stage, "delta": text[len(previous):]}
+            else:
+                # A retry restarted the stage
+                event = {"type": "reset", "stage": stage, "text": text}
+            event["chars"] = len(text)
+            self._emit(event)
+
+    def complete(self, stage: str, text: str) -> None:
+        """Publish a stage's final report text."""
+        self.publish(stage, text)
+        with self._lock:
+            self._done.add(stage)
+            self._emit({"type": "done", "stage": stage, "chars": len(text)})
+
+    def close(self) -> None:
+        """End the channel (the job finished)."""
+        with self._lock:
+            self.closed = True
+            self.closed_at = time.time()
+            self._emit(None)
+            self._subscribers = []
+
+    def snapshot(self) -> dict[str, Any]:
+        """Get every stage's report text so far."""
+        with self._lock:
+            return {
+                "job_id": self.job_id,
+                "closed": self.closed,
+                "reports": {
+                    stage: {"text": text, "chars": len(text), "done": stage in self._done}
+                    for stage, text in self._reports.items()
+                },
+            }
+
+    async def events(self) -> AsyncIterator[dict[str, Any]]:
+        """Iterate over progress events until the job finishes.
+
+        The text generated before subscribing is replayed first.
+
+        Yields:
+            Event dicts ("chunk", "reset" or "done")
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        with self._lock:
+            replay = [
+                {"type": "reset", "stage": stage, "text": text, "chars": len(text)}
+                for stage, text in self._reports.items()
+            ]
+            replay += [
+                {"type": "done", "stage": stage, "chars": len(self._reports[stage])}
+                for stage in self._done
+            ]
+            closed = self.closed
+            if not closed:
+                self._subscribers.append((asyncio.get_running_loop(), queue))
+
+        for event in replay:
+            yield event
+        if closed:
+            return
+
+        try:
+            while (event := await queue.get()) is not None:
+                yield event
+        finally:
+            with self._lock:
+                self._subscribers = [s for s in self._subscribers if s[1] is not queue]
+
+
+class ProgressRegistry:
+    """Progress channels of running jobs, kept for a while after they finish."""
+
+    def __init__(self, retention_seconds: float) -> None:
+        """Initialize the registry.
+
+        Args:
+            retention_seconds: Keep finished jobs' channels this long
+        """
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        self._channels: dict[str, ReportProgress] = {}
+
+    def open(self, job_id: str) -> ReportProgress:
+        """Create (or get) a job's channel and drop expired ones."""
+        now = time.time()
+        with self._lock:
+            expired = [
+                key
+                for key, channel in self._channels.items()
+                if channel.closed_at is not None
+                and now - channel.closed_at > self.retention_seconds
+            ]
+            for key in expired:
+                del self._channels[key]
+            channel = self._channels.get(job_id)
+            if channel is None or channel.closed:
+                channel = ReportProgress(job_id)
+                self._channels[job_id] = channel
+            return channel
+
+    def get(self, job_id: str) -> ReportProgress | None:
+        """Get a job's channel (None if unknown or expired)."""
+        with self._lock:
+            return self._channels.get(job_id)
+
+
+@lru_cache
+def get_progress_registry() -> ProgressRegistry:
+    """Get the process-wide progress registry."""
+    return ProgressRegistry(get_settings().report_progress_retention_seconds)
+
+
+class BlockStager:
+    """Stage a report blob's blocks while its text is still being generated.
+
+    Stable text (everything but the last ``STAGING_HOLDBACK_CHARS``) is cut
+    into blocks of ``block_chars`` characters and staged in the background.
+    ``commit`` uploads the remaining tail as a last block and commits the
+    list, provided the final report still starts with the staged text;
+    otherwise it returns None and the caller uploads the whole report.
+    """
+
+    def __init__(self, container_url: str, blob_name: str, block_chars: int) -> None:
+        """Initialize the stager.
+
+        Args:
+            container_url: Container URL (may include SAS token)
+            blob_name: Report blob name
+            block_chars: Characters per staged block
+        """
+        self.container_url = container_url
+        self.blob_name = blob_name
+        self.block_chars = block_chars
+        self._generation = 0
+        self._block_ids: list[str] = []
+        self._staged_text = ""
+        self._tasks: list[asyncio.Task] = []
+        self.failed = False
+
+    def _block_id(self, index: int) -> str:
+        """Fixed-length block ID, unique per attempt."""
+        return base64.b64encode(f"{self._generation:04d}-{index:08d}".encode()).decode()
+
+    def _stage(self, data: bytes) -> None:
+        """Stage the next block in the background."""
+        block_id = self._block_id(len(self._block_ids))
+        self._block_ids.append(block_id)
+        self._tasks.append(
+            asyncio.get_running_loop().create_task(
+                asyncio.to_thread(
+                    stage_blob_block, self.container_url, self.blob_name, block_id, data
+                )
+            )
+        )
+
+    def feed(self, text: str) -> None:
+        """Stage full blocks of the report text so far (call on the event loop)."""
+        if self.failed:
+            return
+        if not text.startswith(self._staged_text):
+            # A retry restarted the report; staged blocks are abandoned
+            self._generation += 1
+            self._block_ids = []
+            self._staged_text = ""
+
+        stable = len(text) - STAGING_HOLDBACK_CHARS
+        while stable - len(self._staged_text) >= self.block_chars:
+            start = len(self._staged_text)
+            piece = text[start:start + self.block_chars]
+            self._stage(piece.encode("utf-8"))
+            self._staged_text = text[:start + self.block_chars]
+
+    async def flush(self) -> None:
+        """Wait for background staging; any failure disables the stager."""
+        tasks, self._tasks = self._tasks, []
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, BaseException):
+                self.failed = True
+                logger.warning(
+                    "Staging report block failed", blob_name=self.blob_name, error=str(result)
+                )
+
+    def commit(self, content: str, content_type: str) -> str | None:
+        """Commit staged blocks plus the remaining tail as the final report (blocking).
+
+        Args:
+            content: Final report text
+            content_type: MIME type of the report
+
+        Returns:
+            Blob URL, or None if nothing usable was staged
+        """
+        if self.failed or self._tasks or not self._block_ids:
+            return None
+        if not content.startswith(self._staged_text):
+            logger.info("Final report differs from streamed text", blob_name=self.blob_name)
+            return None
+
+        block_ids = list(self._block_ids)
+        tail = content[len(self._staged_text):]
+        try:
+            if tail:
+                tail_id = self._block_id(len(block_ids))
+                stage_blob_block(
+                    self.container_url, self.blob_name, tail_id, tail.encode("utf-8")
+                )
+                block_ids.append(tail_id)
+            return commit_blob_blocks(self.container_url, self.blob_name, block_ids, content_type)
+        except Exception as e:
+            logger.warning(
+                "Committing staged report failed", blob_name=self.blob_name, error=str(e)
+            )
+            return None
+
+
+class ReportStream:
+    """Sink for one stage's streamed report: progress channel and blob staging."""
+
+    def __init__(
+        self, stage: str, progress: ReportProgress, stager: BlockStager | None = None
+    ) -> None:
+        """Initialize the stream.
+
+        Args:
+            stage: Stage key (e.g. "stage3")
+            progress: Job's progress channel
+            stager: Blob block stager for the report, if staging
+        """
+        self.stage = stage
+        self.progress = progress
+        self.stager = stager
+
+    def start(self, extractor: Callable[[str], str]) -> Callable[[str], None]:
+        """Begin an attempt; returns the callback for raw response text so far.
+
+        Args:
+            extractor: Maps raw response text to report text
+
+        Returns:
+            Callback taking the raw response text received so far
+        """
+
+        def on_text(raw: str) -> None:
+            text = extractor(raw)
+            self.progress.publish(self.stage, text)
+            if self.stager is not None:
+                self.stager.feed(text)
+
+        return on_text
+
+    async def finish(self, text: str) -> None:
+        """Publish the final report and wait for background staging."""
+        self.progress.complete(self.stage, text)
+        if self.stager is not None:
+            await self.stager.flush()
+
+
+class JobReportStreams:
+    """Report streams of one job, keyed by report blob name."""
+
+    def __init__(self, progress: ReportProgress) -> None:
+        """Initialize the job's streams.
+
+        Args:
+            progress: Job's progress channel
+        """
+        self.progress = progress
+        self._stagers: dict[str, BlockStager] = {}
+
+    def open(self, stage: str, container_url: str | None, base_name: str | None) -> ReportStream:
+        """Open the stream for a stage's report.
+
+        Args:
+            stage: Stage key ("stage3" or "search_intel")
+            container_url: Output container URL (blocks are staged if set)
+            base_name: Report base name (e.g. "APPNO")
+
+        Returns:
+            Report stream
+        """
+        settings = get_settings()
+        stager = None
+        if container_url and base_name and settings.report_stream_block_chars > 0:
+            blob_name = report_blob_name(base_name, stage)
+            stager = BlockStager(container_url, blob_name, settings.report_stream_block_chars)
+            self._stagers[blob_name] = stager
+        return ReportStream(stage, self.progress, stager)
+
+    def commit(self, blob_name: str, content: str, content_type: str) -> str | None:
+        """Commit a report from its staged blocks (None if not staged)."""
+        stager = self._stagers.get(blob_name)
+        if stager is None:
+            return None
+        return stager.commit(content, content_type)
+
+
+_job_streams: ContextVar[JobReportStreams | None] = ContextVar("job_streams", default=None)
+
+
+def job_report_streams() -> JobReportStreams:
+    """Get the current job's report streams.
+
+    Outside a ``report_stream_scope`` a fresh, unregistered set is returned,
+    so streaming still works but nobody can subscribe to it.
+    """
+    return _job_streams.get() or JobReportStreams(ReportProgress("unregistered"))
+
+
+@contextmanager
+def report_stream_scope(job_id: str) -> Iterator[JobReportStreams]:
+    """Register a job's progress channel for everything run inside the block.
+
+    Args:
+        job_id: Job identifier (subscribers look the channel up by it)
+
+    Yields:
+        The job's report streams
+    """
+    streams = JobReportStreams(get_progress_registry().open(job_id))
+    token = _job_streams.set(streams)
+    try:
+        yield streams
+    finally:
+        _job_streams.reset(token)
+        streams.progress.close()
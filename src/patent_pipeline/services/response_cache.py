@@ -0,0 +1,319 @@
+"""Persistent, content-addressed cache of LLM responses for pipeline stages."""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import redis.asyncio as redis
+import structlog
+
+from src.config import get_settings
+
+logger = structlog.get_logger(__name__)
+
+# Bump when the key layout or stored value format changes
+CACHE_FORMAT_VERSION = 1
+
+# Longest time between disk cache sweeps for expired entries
+DISK_SWEEP_INTERVAL_SECONDS = 600
+
+
+def response_cache_key(**parts: Any) -> str:
+    """Build a canonical cache key from the inputs that determine a response.
+
+    Parts are serialized as JSON with sorted keys and no whitespace, so the
+    same model settings, prompt version and inputs always hash to the same
+    key regardless of dict ordering.
+
+    Args:
+        **parts: Model name, generation settings, prompt version, inputs, etc.
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = json.dumps(
+        {"format": CACHE_FORMAT_VERSION, **parts},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache(ABC):
+    """Base class for response cache backends.
+
+    Backends store raw response text under a key from ``response_cache_key``.
+    Lookups and writes never raise: backend errors are logged and treated as
+    misses so a cache outage cannot fail a pipeline stage.
+    """
+
+    backend = "base"
+
+    def __init__(self) -> None:
+        """Initialize counters."""
+        self._counter_lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "errors": 0}
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        """Increment a counter."""
+        with self._counter_lock:
+            self._counters[name] += amount
+
+    async def get(self, key: str) -> str | None:
+        """Get a cached response.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached response text, or None on a miss
+        """
+        try:
+            value = await self._get(key)
+        except Exception as e:
+            self._count("errors")
+            logger.warning("Response cache lookup failed", key=key[:12], error=str(e))
+            return None
+        self._count("hits" if value is not None else "misses")
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        """Store a response.
+
+        Args:
+            key: Cache key
+            value: Response text
+        """
+        try:
+            await self._set(key, value)
+            self._count("writes")
+        except Exception as e:
+            self._count("errors")
+            logger.warning("Response cache write failed", key=key[:12], error=str(e))
+
+    def stats(self) -> dict[str, Any]:
+        """Get cache counters."""
+        with self._counter_lock:
+            return {"backend": self.backend, **self._counters}
+
+    @abstractmethod
+    async def _get(self, key: str) -> str | None:
+        """Backend lookup."""
+
+    @abstractmethod
+    async def _set(self, key: str, value: str) -> None:
+        """Backend write."""
+
+
+class NullResponseCache(ResponseCache):
+    """Cache that stores nothing (caching disabled)."""
+
+    backend = "none"
+
+    async def _get(self, key: str) -> str | None:
+        return None
+
+    async def _set(self, key: str, value: str) -> None:
+        return None
+
+
+class DiskResponseCache(ResponseCache):
+    """Response cache stored as JSON files in a local directory.
+
+    Each entry is ``<directory>/<key[:2]>/<key>.json``. Entries older than
+    ``ttl_seconds`` are treated as misses and removed; when the directory
+    grows beyond ``max_bytes`` the least recently used entries (by file
+    mtime, refreshed on every hit) are deleted.
+
+    Writes keep a running estimate of the directory size instead of
+    scanning it. The directory is swept (and the estimate re-measured) on
+    the first write, when the estimate exceeds ``max_bytes``, and at least
+    every ``DISK_SWEEP_INTERVAL_SECONDS``, which also corrects for writes
+    from other processes sharing the directory.
+    """
+
+    backend = "disk"
+
+    def __init__(self, directory: str | Path, ttl_seconds: int, max_bytes: int) -> None:
+        """Initialize the disk cache.
+
+        Args:
+            directory: Cache directory (created on first write)
+            ttl_seconds: Maximum entry age
+            max_bytes: Maximum total size of cached entries
+        """
+        super().__init__()
+        self.directory = Path(directory)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._evict_lock = threading.Lock()
+        self._total_bytes: int | None = None  # estimate; None until the first sweep
+        self._last_sweep = 0.0
+
+    def _path(self, key: str) -> Path:
+        """Get the file path for a key."""
+        return self.directory / key[:2] / f"{key}.json"
+
+    async def _get(self, key: str) -> str | None:
+        return await asyncio.to_thread(self._read, key)
+
+    async def _set(self, key: str, value: str) -> None:
+        await asyncio.to_thread(self._write, key, value)
+
+    def _read(self, key: str) -> str | None:
+        """Read an entry, dropping it if expired (blocking)."""
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+
+        if time.time() - entry["stored_at"] > self.ttl_seconds:
+            path.unlink(missing_ok=True)
+            self._count("evictions")
+            return None
+
+        # Refresh mtime so size eviction removes least recently used entries
+        os.utime(path)
+        return entry["value"]
+
+    def _write(self, key: str, value: str) -> None:
+        """Write an entry atomically and enforce the size limit (blocking)."""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(
+            {"stored_at": time.time(), "value": value}, ensure_ascii=False
+        ).encode("utf-8")
+        try:
+            replaced = path.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+        temp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+
+        with self._evict_lock:
+            if self._total_bytes is not None:
+                self._total_bytes += len(data) - replaced
+            sweep = (
+                self._total_bytes is None
+                or self._total_bytes > self.max_bytes
+                or time.monotonic() - self._last_sweep >= DISK_SWEEP_INTERVAL_SECONDS
+            )
+        if sweep:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Remove expired entries, then least recently used ones over the size limit."""
+        with self._evict_lock:
+            now = time.time()
+            entries = []
+            for path in self.directory.glob("*/*.json"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = 0
+            evicted = 0
+            live = []
+            for mtime, size, path in entries:
+                # mtime only moves forward, so an old mtime bounds the entry age
+                if now - mtime > self.ttl_seconds:
+                    path.unlink(missing_ok=True)
+                    evicted += 1
+                else:
+                    live.append((mtime, size, path))
+                    total += size
+
+            live.sort()
+            for _, size, path in live:
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                evicted += 1
+
+            self._total_bytes = total
+            self._last_sweep = time.monotonic()
+
+        if evicted:
+            self._count("evictions", evicted)
+            logger.info("Evicted cached LLM responses", count=evicted, total_bytes=total)
+
+
+class RedisResponseCache(ResponseCache):
+    """Response cache stored in Redis.
+
+    Entries are written with a TTL of ``ttl_seconds``. Size-based eviction is
+    left to the server: configure ``maxmemory`` with an ``allkeys-lru`` or
+    ``volatile-lru`` policy on the cache instance.
+    """
+
+    backend = "redis"
+
+    def __init__(self, url: str, ttl_seconds: int, prefix: str = "llm-response:") -> None:
+        """Initialize the Redis cache.
+
+        Args:
+            url: Redis connection URL
+            ttl_seconds: Entry TTL
+            prefix: Key prefix
+        """
+        super().__init__()
+        self.url = url
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        # redis.asyncio connections belong to the loop that opened them
+        self._clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def _client(self) -> redis.Redis:
+        """Get the Redis client for the running event loop."""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = redis.from_url(self.url)
+            self._clients[loop] = client
+        return client
+
+    async def _get(self, key: str) -> str | None:
+        value = await self._client().get(self.prefix + key)
+        if value is None:
+            return None
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    async def _set(self, key: str, value: str) -> None:
+        await self._client().set(self.prefix + key, value, ex=self.ttl_seconds)
+
+
+@lru_cache
+def get_response_cache() -> ResponseCache:
+    """Get the process-wide response cache for the configured backend."""
+    settings = get_settings()
+    backend = settings.llm_response_cache_backend.lower()
+
+    if backend == "disk":
+        return DiskResponseCache(
+            directory=settings.llm_response_cache_dir,
+            ttl_seconds=settings.llm_response_cache_ttl_seconds,
+            max_bytes=settings.llm_response_cache_max_bytes,
+        )
+    if backend == "redis":
+        return RedisResponseCache(
+            url=settings.redis_url,
+            ttl_seconds=settings.llm_response_cache_ttl_seconds,
+        )
+    if backend != "none":
+        logger.warning("Unknown response cache backend, caching disabled", backend=backend)
+    return NullResponseCache()
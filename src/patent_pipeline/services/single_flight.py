@@ -0,0 +1,113 @@
+"""Single-flight coalescing of identical in-flight stage calls."""
+
+import asyncio
+import threading
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Generic, TypeVar
+
+from src.config import get_settings
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Flight(Generic[T]):
+    """One in-flight call and the callers waiting on it."""
+
+    task: asyncio.Future[T]
+    waiters: int = 0
+
+
+class SingleFlight:
+    """Share one in-flight call among concurrent callers with the same key.
+
+    The first caller for a key starts the call as a separate task; callers
+    arriving while it runs wait on that task instead of starting their own.
+    An error is raised to every waiter. A cancelled waiter only stops
+    waiting: the call keeps running for the others and is cancelled once
+    nobody waits on it. Calls are shared within an event loop.
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        """Initialize the coalescer.
+
+        Args:
+            enabled: If False, every caller makes its own call
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._flights: dict[tuple[int, str], _Flight[Any]] = {}
+        self._counts = {"flights": 0, "coalesced": 0, "shared_errors": 0, "abandoned": 0}
+
+    def _count(self, name: str) -> None:
+        """Increment a counter."""
+        with self._lock:
+            self._counts[name] += 1
+
+    async def run(self, key: str, call: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """Run ``call``, or wait on an identical call already in flight.
+
+        Args:
+            key: Canonical hash of the call's inputs
+            call: Starts the call
+
+        Returns:
+            Tuple of (result, whether it came from another caller's call)
+
+        Raises:
+            Exception: The call's error, for every waiter
+        """
+        if not self.enabled:
+            return await call(), False
+
+        flight_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            flight = self._flights.get(flight_key)
+            shared = flight is not None
+            if flight is None:
+                flight = _Flight(asyncio.ensure_future(call()))
+                self._flights[flight_key] = flight
+                self._counts["flights"] += 1
+            else:
+                self._counts["coalesced"] += 1
+            flight.waiters += 1
+
+        if not shared:
+            flight.task.add_done_callback(lambda _: self._finish(flight_key, flight))
+
+        try:
+            result = await asyncio.shield(flight.task)
+        except Exception:
+            if shared:
+                self._count("shared_errors")
+            raise
+        finally:
+            with self._lock:
+                flight.waiters -= 1
+                abandoned = flight.waiters == 0 and not flight.task.done()
+            if abandoned:
+                self._count("abandoned")
+                flight.task.cancel()
+        return result, shared
+
+    def _finish(self, flight_key: tuple[int, str], flight: _Flight[Any]) -> None:
+        """Forget a finished call so later callers start a fresh one."""
+        with self._lock:
+            if self._flights.get(flight_key) is flight:
+                del self._flights[flight_key]
+        if not flight.task.cancelled():
+            # Mark the error retrieved (it was raised to every waiter)
+            flight.task.exception()
+
+    def stats(self) -> dict[str, Any]:
+        """Get coalescing counters and the number of calls in flight."""
+        with self._lock:
+            return {"enabled": self.enabled, "in_flight": len(self._flights), **self._counts}
+
+
+@lru_cache
+def get_single_flight() -> SingleFlight:
+    """Get the process-wide stage call coalescer."""
+    return SingleFlight(enabled=get_settings().llm_single_flight_enabled)
@@ -0,0 +1,191 @@
+"""Gemini response schemas derived from the pipeline's Pydantic models."""
+
+import json
+from functools import lru_cache
+from typing import Any
+
+from google.generativeai import protos
+from pydantic import BaseModel
+
+# Gemini rejects OBJECT schemas without properties, so free-form dicts are
+# requested as a list of key/value pairs and decoded back into dicts. Values
+# are JSON-encoded so numbers, booleans and nested objects keep their types.
+FREEFORM_OBJECT_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "key": {"type": "string"},
+            "value": {
+                "type": "string",
+                "description": 'JSON-encoded value (e.g. "\\"text\\"", "3", "true", "{...}")',
+            },
+        },
+        "required": ["key", "value"],
+    },
+}
+
+_TYPE_MAP = {
+    "string": "STRING",
+    "integer": "INTEGER",
+    "number": "NUMBER",
+    "boolean": "BOOLEAN",
+    "array": "ARRAY",
+    "object": "OBJECT",
+}
+
+
+def _resolve(schema: dict[str, Any], defs: dict[str, Any]) -> dict[str, Any]:
+    """Follow a ``$ref`` into the model's ``$defs``."""
+    while "$ref" in schema:
+        schema = defs[schema["$ref"].rsplit("/", 1)[-1]]
+    return schema
+
+
+def _split_nullable(schema: dict[str, Any]) -> tuple[dict[str, Any], bool]:
+    """Unwrap ``X | None`` (``anyOf`` with a null branch)."""
+    options = schema.get("anyOf")
+    if not options:
+        return schema, False
+    non_null = [option for option in options if option.get("type") != "null"]
+    if len(non_null) != 1:
+        raise ValueError(f"Unsupported union in response schema: {options}")
+    merged = {**non_null[0]}
+    if "description" in schema:
+        merged.setdefault("description", schema["description"])
+    return merged, len(non_null) < len(options)
+
+
+def _is_freeform(schema: dict[str, Any]) -> bool:
+    """Whether a schema is an object with no declared properties."""
+    return schema.get("type") == "object" and not schema.get("properties")
+
+
+def _convert(schema: dict[str, Any], defs: dict[str, Any]) -> dict[str, Any]:
+    """Convert a JSON Schema node to Gemini's OpenAPI schema subset."""
+    schema, nullable = _split_nullable(schema)
+    description = schema.get("description")
+    schema = _resolve(schema, defs)
+    description = description or schema.get("description")
+
+    if _is_freeform(schema):
+        converted = _uppercase_types(FREEFORM_OBJECT_SCHEMA)
+    elif schema.get("type") == "object":
+        converted = {
+            "type": "OBJECT",
+            "properties": {
+                name: _convert(prop, defs) for name, prop in schema["properties"].items()
+            },
+        }
+        if schema.get("required"):
+            converted["required"] = list(schema["required"])
+    elif schema.get("type") == "array":
+        converted = {"type": "ARRAY", "items": _convert(schema.get("items", {}), defs)}
+    else:
+        converted = {"type": _TYPE_MAP[schema["type"]]}
+        if "enum" in schema:
+            converted["enum"] = [str(value) for value in schema["enum"]]
+
+    if description:
+        converted["description"] = description
+    if nullable:
+        converted["nullable"] = True
+    return converted
+
+
+def _uppercase_types(schema: dict[str, Any]) -> dict[str, Any]:
+    """Copy a lowercase-typed schema literal with Gemini type names."""
+    converted = {**schema, "type": _TYPE_MAP[schema["type"]]}
+    if "items" in schema:
+        converted["items"] = _uppercase_types(schema["items"])
+    if "properties" in schema:
+        converted["properties"] = {
+            name: _uppercase_types(prop) for name, prop in schema["properties"].items()
+        }
+    return converted
+
+
+def gemini_schema_dict(model: type[BaseModel]) -> dict[str, Any]:
+    """Derive a Gemini response schema (as a dict) from a Pydantic model.
+
+    Args:
+        model: Output model (e.g. ``Stage2A``)
+
+    Returns:
+        Schema using Gemini's OpenAPI subset
+    """
+    json_schema = model.model_json_schema()
+    return _convert(json_schema, json_schema.get("$defs", {}))
+
+
+@lru_cache
+def gemini_response_schema(model: type[BaseModel]) -> protos.Schema:
+    """Get the (cached) Gemini response schema proto for a Pydantic model."""
+    return protos.Schema(_to_proto_fields(gemini_schema_dict(model)))
+
+
+def _to_proto_fields(schema: dict[str, Any]) -> dict[str, Any]:
+    """Rename schema keys to the proto field names (``type`` -> ``type_``)."""
+    converted = {("type_" if key == "type" else key): value for key, value in schema.items()}
+    if "items" in schema:
+        converted["items"] = _to_proto_fields(schema["items"])
+    if "properties" in schema:
+        converted["properties"] = {
+            name: _to_proto_fields(prop) for name, prop in schema["properties"].items()
+        }
+    return converted
+
+
+def _decode(value: Any, schema: dict[str, Any], defs: dict[str, Any]) -> Any:
+    """Turn key/value pair lists back into dicts wherever the model has free-form dicts."""
+    if value is None:
+        return None
+    schema, _ = _split_nullable(schema)
+    schema = _resolve(schema, defs)
+
+    if _is_freeform(schema):
+        if isinstance(value, list):
+            return {
+                item["key"]: _decode_freeform_value(item.get("value"))
+                for item in value
+                if isinstance(item, dict) and "key" in item
+            }
+        return value
+    if schema.get("type") == "object" and isinstance(value, dict):
+        properties = schema.get("properties", {})
+        return {
+            name: _decode(item, properties[name], defs) if name in properties else item
+            for name, item in value.items()
+        }
+    if schema.get("type") == "array" and isinstance(value, list):
+        items = schema.get("items", {})
+        return [_decode(item, items, defs) for item in value]
+    return value
+
+
+def _decode_freeform_value(value: Any) -> Any:
+    """Decode a JSON-encoded free-form dict value (plain text is kept as is)."""
+    if not isinstance(value, str):
+        return value
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def parse_structured(text: str, model: type[BaseModel]) -> dict[str, Any]:
+    """Parse and validate a schema-constrained JSON response in one pass.
+
+    Args:
+        text: Raw JSON response text
+        model: Output model the response schema was derived from
+
+    Returns:
+        Validated output as a dict (defaults filled in)
+
+    Raises:
+        ValueError: If the response is not valid JSON or fails validation
+    """
+    json_schema = model.model_json_schema()
+    data = _decode(json.loads(text), json_schema, json_schema.get("$defs", {}))
+    return model.model_validate(data).model_dump(mode="json")
@@ -0,0 +1,288 @@
+"""Content-addressed cache of PDFs uploaded to the Gemini Files API."""
+
+import asyncio
+import hashlib
+import io
+import threading
+import time
+from collections.abc import AsyncIterator
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Any
+
+import google.generativeai as genai
+import structlog
+
+from src.config import get_settings
+from src.patent_pipeline.services.llm_backend import get_llm_backend
+from src.patent_pipeline.services.llm_registry import run_gemini_call
+
+logger = structlog.get_logger(__name__)
+
+# Gemini keeps uploaded files for 48 hours
+DEFAULT_FILE_LIFETIME_SECONDS = 48 * 3600
+
+
+@dataclass
+class CachedUpload:
+    """An uploaded Gemini file and its lifetime bookkeeping."""
+
+    sha256: str
+    file: Any
+    expires_at: float
+    last_used: float
+    refs: int = 0  # leases currently using the file
+
+    @property
+    def name(self) -> str:
+        """Gemini resource name of the file (e.g. "files/abc123")."""
+        return getattr(self.file, "name", "")
+
+
+def _expiry_timestamp(uploaded_file: Any) -> float:
+    """Get the expiry of an uploaded file as a UNIX timestamp."""
+    expiration = getattr(uploaded_file, "expiration_time", None)
+    if isinstance(expiration, datetime):
+        return expiration.timestamp()
+    return time.time() + DEFAULT_FILE_LIFETIME_SECONDS
+
+
+def _upload_to_gemini(pdf_bytes: bytes, display_name: str) -> Any:
+    """Upload PDF bytes to Gemini (blocking).
+
+    The bytes are wrapped in a ``BytesIO``, which shares the buffer of the
+    ``bytes`` object rather than copying it; the SDK's resumable uploader
+    streams seekable file objects to the socket in small blocks, so no temp
+    file or second full copy of the document is made.
+    """
+    uploaded_file = genai.upload_file(
+        path=io.BytesIO(pdf_bytes),
+        display_name=display_name,
+        mime_type="application/pdf",
+    )
+    logger.info("Uploaded PDF to Gemini", display_name=display_name, size_bytes=len(pdf_bytes))
+    return uploaded_file
+
+
+class _UploadAbandonedError(Exception):
+    """The caller performing a shared upload was cancelled."""
+
+
+class GeminiUploadCache:
+    """Reuse Gemini file handles for identical PDF content.
+
+    Entries are keyed by the SHA-256 of the PDF bytes, so tenacity retries,
+    reruns of the same application and the Extractor agent all share one
+    upload. Handles are handed out as leases (see ``lease``) and a file is
+    only deleted from Gemini once no lease holds it. A handle is reused
+    while it has more than ``expiry_margin`` seconds left; unleased entries
+    that expired, sat idle for longer than ``idle_seconds`` or are beyond
+    ``max_entries`` (least recently used first) are evicted after uploads
+    and by ``sweep``. Concurrent requests for the same content wait on a
+    single upload.
+    """
+
+    def __init__(
+        self,
+        max_entries: int | None = None,
+        idle_seconds: float | None = None,
+        expiry_margin: float | None = None,
+    ) -> None:
+        """Initialize the cache.
+
+        Args:
+            max_entries: Maximum cached files (defaults from settings)
+            idle_seconds: Delete files unused for this long (defaults from settings)
+            expiry_margin: Minimum remaining lifetime for reuse (defaults from settings)
+        """
+        settings = get_settings()
+        self.max_entries = max_entries or settings.gemini_upload_cache_max_entries
+        self.idle_seconds = idle_seconds or settings.gemini_upload_idle_seconds
+        self.expiry_margin = expiry_margin or settings.gemini_upload_expiry_margin_seconds
+        self._lock = threading.Lock()
+        self._entries: dict[str, CachedUpload] = {}
+        self._in_flight: dict[str, Future] = {}
+        self.hits = 0
+        self.uploads = 0
+        self.deletions = 0
+
+    @asynccontextmanager
+    async def lease(self, pdf_bytes: bytes, display_name: str) -> AsyncIterator[Any]:
+        """Hold a valid Gemini file for the PDF, uploading only on a miss.
+
+        The file is not deleted while the lease is held, so keep the block
+        open until the calls that reference the file have finished.
+
+        Args:
+            pdf_bytes: PDF content as bytes
+            display_name: Display name for a new upload
+
+        Yields:
+            Uploaded file reference
+        """
+        entry = await self._acquire(pdf_bytes, display_name)
+        try:
+            yield entry.file
+        finally:
+            await self._release(entry)
+
+    async def _acquire(self, pdf_bytes: bytes, display_name: str) -> CachedUpload:
+        """Get a cache entry for the PDF with a reference taken on it."""
+        digest = await asyncio.to_thread(lambda: hashlib.sha256(pdf_bytes).hexdigest())
+
+        while True:
+            now = time.time()
+            with self._lock:
+                entry = self._entries.get(digest)
+                if entry is not None and entry.expires_at - self.expiry_margin > now:
+                    entry.refs += 1
+                    entry.last_used = now
+                    self.hits += 1
+                    logger.info(
+                        "Reusing uploaded PDF", display_name=display_name, file=entry.name
+                    )
+                    return entry
+
+                pending = self._in_flight.get(digest)
+                if pending is None:
+                    pending = Future()
+                    self._in_flight[digest] = pending
+                    break
+
+            # Another caller is uploading the same content; wait for it and
+            # take a reference on the new entry. If that caller was cancelled,
+            # loop and take over the upload.
+            try:
+                await asyncio.wrap_future(pending)
+            except _UploadAbandonedError:
+                pass
+
+        try:
+            uploaded_file = await get_llm_backend().upload_file(
+                digest,
+                display_name,
+                lambda: run_gemini_call(_upload_to_gemini, pdf_bytes, display_name),
+            )
+        except asyncio.CancelledError:
+            with self._lock:
+                self._in_flight.pop(digest, None)
+            pending.set_exception(_UploadAbandonedError())
+            raise
+        except Exception as e:
+            with self._lock:
+                self._in_flight.pop(digest, None)
+            pending.set_exception(e)
+            raise
+
+        entry = CachedUpload(
+            sha256=digest,
+            file=uploaded_file,
+            expires_at=_expiry_timestamp(uploaded_file),
+            last_used=time.time(),
+            refs=1,
+        )
+        with self._lock:
+            stale = self._entries.get(digest)
+            self._entries[digest] = entry
+            self._in_flight.pop(digest, None)
+            self.uploads += 1
+        pending.set_result(uploaded_file)
+
+        evicted = self._collect_evictions()
+        # A replaced entry still leased is deleted when its last lease ends
+        if stale is not None and stale.refs == 0:
+            evicted.append(stale)
+        await self._delete(evicted)
+        return entry
+
+    async def _release(self, entry: CachedUpload) -> None:
+        """Drop a lease's reference, deleting the file if it was replaced meanwhile."""
+        with self._lock:
+            entry.refs -= 1
+            entry.last_used = time.time()
+            replaced = entry.refs == 0 and self._entries.get(entry.sha256) is not entry
+        if replaced:
+            await self._delete([entry])
+
+    def _collect_evictions(self) -> list[CachedUpload]:
+        """Remove unleased expired, idle and over-capacity entries from the cache."""
+        now = time.time()
+        with self._lock:
+            evicted = [
+                entry
+                for entry in self._entries.values()
+                if entry.refs == 0
+                and (entry.expires_at <= now or now - entry.last_used > self.idle_seconds)
+            ]
+            for entry in evicted:
+                del self._entries[entry.sha256]
+
+            # Leased entries stay; the cache may exceed max_entries until they are released
+            overflow = len(self._entries) - self.max_entries
+            if overflow > 0:
+                unleased = [entry for entry in self._entries.values() if entry.refs == 0]
+                lru = sorted(unleased, key=lambda e: e.last_used)[:overflow]
+                for entry in lru:
+                    del self._entries[entry.sha256]
+                evicted.extend(lru)
+        return evicted
+
+    async def _delete(self, entries: list[CachedUpload]) -> None:
+        """Delete evicted files from Gemini (best effort)."""
+        for entry in entries:
+            if entry.expires_at <= time.time():
+                # Gemini already removed it
+                continue
+            try:
+                await get_llm_backend().delete_file(
+                    entry.name, lambda: run_gemini_call(genai.delete_file, entry.name)
+                )
+                self.deletions += 1
+                logger.info("Deleted cached Gemini file", file=entry.name)
+            except Exception as e:
+                logger.warning("Failed to delete Gemini file", file=entry.name, error=str(e))
+
+    async def sweep(self) -> int:
+        """Evict unleased expired and idle files now.
+
+        Returns:
+            Number of entries evicted
+        """
+        evicted = self._collect_evictions()
+        await self._delete(evicted)
+        return len(evicted)
+
+    async def run_sweeper(self, interval_seconds: float) -> None:
+        """Sweep every ``interval_seconds`` until cancelled.
+
+        Without it, idle files are only evicted after a later upload.
+
+        Args:
+            interval_seconds: Seconds between sweeps
+        """
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.warning("Gemini upload sweep failed", error=str(e))
+
+    def stats(self) -> dict[str, int]:
+        """Get cache counters."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "leased": sum(1 for entry in self._entries.values() if entry.refs > 0),
+                "hits": self.hits,
+                "uploads": self.uploads,
+                "deletions": self.deletions,
+            }
+
+
+@lru_cache
+def get_upload_cache() -> GeminiUploadCache:
+    """Get the process-wide Gemini upload cache."""
+    return GeminiUploadCache()
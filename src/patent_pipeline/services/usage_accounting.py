@@ -0,0 +1,390 @@
+"""Per-call token, latency and cost accounting for LLM calls, aggregated per job."""
+
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+import structlog
+from tenacity import RetryCallState
+
+logger = structlog.get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class ModelPrice:
+    """List price in USD per million tokens."""
+
+    input: float
+    output: float
+    cached_input: float
+    cache_write: float | None = None  # defaults to the input price
+
+
+# Prices for cost estimates, matched by longest model name prefix
+# (Gemini prices are for prompts up to 128k tokens)
+MODEL_PRICES: dict[str, ModelPrice] = {
+    "gemini-1.5-pro": ModelPrice(input=1.25, output=5.00, cached_input=0.3125),
+    "gemini-1.5-flash": ModelPrice(input=0.075, output=0.30, cached_input=0.01875),
+    "gemini-2.0-flash": ModelPrice(input=0.10, output=0.40, cached_input=0.025),
+    "gemini-2.5-pro": ModelPrice(input=1.25, output=10.00, cached_input=0.31),
+    "gemini-2.5-flash": ModelPrice(input=0.30, output=2.50, cached_input=0.075),
+    "claude-opus-4": ModelPrice(input=15.00, output=75.00, cached_input=1.50, cache_write=18.75),
+    "claude-sonnet-4": ModelPrice(input=3.00, output=15.00, cached_input=0.30, cache_write=3.75),
+    "claude-3-5-haiku": ModelPrice(input=0.80, output=4.00, cached_input=0.08, cache_write=1.00),
+}
+
+
+def model_price(model: str) -> ModelPrice | None:
+    """Get the price entry for a model name (None if unknown)."""
+    matches = [prefix for prefix in MODEL_PRICES if model.startswith(prefix)]
+    if not matches:
+        return None
+    return MODEL_PRICES[max(matches, key=len)]
+
+
+@dataclass
+class TokenUsage:
+    """Tokens billed for one call.
+
+    ``input_tokens`` includes cached and cache-write tokens.
+    """
+
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    cache_write_tokens: int = 0
+
+
+def _int_attr(obj: Any, name: str) -> int:
+    """Get an integer attribute, treating missing or non-integer values as 0."""
+    value = getattr(obj, name, 0)
+    return value if isinstance(value, int) else 0
+
+
+def gemini_usage(response: Any) -> TokenUsage:
+    """Get token usage from a Gemini response's ``usage_metadata``."""
+    usage = getattr(response, "usage_metadata", None)
+    return TokenUsage(
+        input_tokens=_int_attr(usage, "prompt_token_count"),
+        output_tokens=_int_attr(usage, "candidates_token_count"),
+        cached_tokens=_int_attr(usage, "cached_content_token_count"),
+    )
+
+
+def claude_usage(response: Any) -> TokenUsage:
+    """Get token usage from a Claude response's ``usage``.
+
+    Claude reports cache reads and writes separately from ``input_tokens``;
+    they are folded into ``input_tokens`` here.
+    """
+    usage = getattr(response, "usage", None)
+    cached = _int_attr(usage, "cache_read_input_tokens")
+    written = _int_attr(usage, "cache_creation_input_tokens")
+    return TokenUsage(
+        input_tokens=_int_attr(usage, "input_tokens") + cached + written,
+        output_tokens=_int_attr(usage, "output_tokens"),
+        cached_tokens=cached,
+        cache_write_tokens=written,
+    )
+
+
+def estimate_cost(model: str, usage: TokenUsage) -> float | None:
+    """Estimate the cost of a call in USD (None if the model has no price)."""
+    price = model_price(model)
+    if price is None:
+        return None
+    cache_write = price.cache_write if price.cache_write is not None else price.input
+    uncached = max(usage.input_tokens - usage.cached_tokens - usage.cache_write_tokens, 0)
+    cost = (
+        uncached * price.input
+        + usage.cached_tokens * price.cached_input
+        + usage.cache_write_tokens * cache_write
+        + usage.output_tokens * price.output
+    )
+    return cost / 1_000_000
+
+
+@dataclass
+class CallRecord:
+    """Accounting for one LLM call."""
+
+    provider: str
+    model: str
+    stage: str
+    kind: str  # "generate", "hedge", "batch", "continuation", "repair", "agent"
+    started_at: float = field(default_factory=time.time)
+    queue_seconds: float = 0.0
+    ttfb_seconds: float | None = None
+    latency_seconds: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    cache_write_tokens: int = 0
+    cost_usd: float | None = None
+    error: str | None = None
+
+
+class CallMeter:
+    """Handle for reporting usage from inside a ``record_llm_call`` block."""
+
+    def __init__(self, record: CallRecord) -> None:
+        """Initialize the meter.
+
+        Args:
+            record: Record being filled in
+        """
+        self.record = record
+        self._started = time.monotonic()
+
+    def elapsed(self) -> float:
+        """Seconds since the call started."""
+        return time.monotonic() - self._started
+
+    def first_byte(self) -> None:
+        """Mark the arrival of the first response chunk (streaming calls)."""
+        if self.record.ttfb_seconds is None:
+            self.record.ttfb_seconds = self.elapsed()
+
+    def set_usage(self, usage: TokenUsage, price_factor: float = 1.0) -> None:
+        """Record the tokens billed for the call.
+
+        Args:
+            usage: Tokens billed
+            price_factor: Multiplier on the list price (e.g. 0.5 for batch requests)
+        """
+        self.record.input_tokens = usage.input_tokens
+        self.record.output_tokens = usage.output_tokens
+        self.record.cached_tokens = usage.cached_tokens
+        self.record.cache_write_tokens = usage.cache_write_tokens
+        cost = estimate_cost(self.record.model, usage)
+        self.record.cost_usd = cost * price_factor if cost is not None else None
+
+
+_SUMMED_FIELDS = (
+    "input_tokens",
+    "output_tokens",
+    "cached_tokens",
+    "cache_write_tokens",
+    "queue_seconds",
+    "latency_seconds",
+)
+
+
+def _empty_totals() -> dict[str, Any]:
+    """Totals for a stage (or job) with no calls yet."""
+    return {
+        "calls": 0,
+        "failed_calls": 0,
+        "retries": 0,
+        "cache_hits": 0,
+        "coalesced": 0,
+        "escalations": 0,
+        "served_by": {},
+        **{name: 0 for name in _SUMMED_FIELDS},
+        "max_latency_seconds": 0.0,
+        "cost_usd": 0.0,
+    }
+
+
+class JobUsage:
+    """LLM call records for one job, aggregated per stage."""
+
+    def __init__(self) -> None:
+        """Initialize an empty ledger."""
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.calls: list[CallRecord] = []
+        self._retries: dict[str, int] = {}
+        self._cache_hits: dict[str, int] = {}
+        self._coalesced: dict[str, int] = {}
+        self._escalations: dict[str, int] = {}
+        self._served: list[tuple[str, str]] = []
+
+    def add(self, record: CallRecord) -> None:
+        """Add a finished call."""
+        with self._lock:
+            self.calls.append(record)
+
+    def record_retry(self, stage: str) -> None:
+        """Count a full retry of a stage call."""
+        with self._lock:
+            self._retries[stage] = self._retries.get(stage, 0) + 1
+
+    def record_cache_hit(self, stage: str) -> None:
+        """Count a stage served from the response cache (no call made)."""
+        with self._lock:
+            self._cache_hits[stage] = self._cache_hits.get(stage, 0) + 1
+
+    def record_coalesced(self, stage: str) -> None:
+        """Count a stage served by another job's identical in-flight call."""
+        with self._lock:
+            self._coalesced[stage] = self._coalesced.get(stage, 0) + 1
+
+    def record_escalation(self, stage: str) -> None:
+        """Count a stage moving to the next model tier of its cascade."""
+        with self._lock:
+            self._escalations[stage] = self._escalations.get(stage, 0) + 1
+
+    def record_served(self, stage: str, model: str) -> None:
+        """Record the model whose output was accepted for a stage."""
+        with self._lock:
+            self._served.append((stage, model))
+
+    def summary(self) -> dict[str, Any]:
+        """Get per-call records plus per-stage and job totals.
+
+        Returns:
+            JSON-serializable usage report
+        """
+        with self._lock:
+            calls = list(self.calls)
+            retries = dict(self._retries)
+            cache_hits = dict(self._cache_hits)
+            coalesced = dict(self._coalesced)
+            escalations = dict(self._escalations)
+            served = list(self._served)
+
+        by_stage: dict[str, dict[str, Any]] = {}
+        totals = _empty_totals()
+        for record in calls:
+            stage = by_stage.setdefault(record.stage, _empty_totals())
+            for entry in (stage, totals):
+                entry["calls"] += 1
+                entry["failed_calls"] += record.error is not None
+                for name in _SUMMED_FIELDS:
+                    entry[name] += getattr(record, name)
+                entry["max_latency_seconds"] = max(
+                    entry["max_latency_seconds"], record.latency_seconds
+                )
+                entry["cost_usd"] += record.cost_usd or 0.0
+
+        for counts, name in (
+            (retries, "retries"),
+            (cache_hits, "cache_hits"),
+            (coalesced, "coalesced"),
+            (escalations, "escalations"),
+        ):
+            for stage_name, count in counts.items():
+                by_stage.setdefault(stage_name, _empty_totals())[name] += count
+                totals[name] += count
+
+        for stage_name, model in served:
+            for entry in (by_stage.setdefault(stage_name, _empty_totals()), totals):
+                entry["served_by"][model] = entry["served_by"].get(model, 0) + 1
+
+        for entry in [*by_stage.values(), totals]:
+            for name in ("queue_seconds", "latency_seconds", "max_latency_seconds"):
+                entry[name] = round(entry[name], 3)
+            entry["cost_usd"] = round(entry["cost_usd"], 6)
+
+        return {
+            "started_at": self.started_at,
+            "wall_seconds": round(time.time() - self.started_at, 3),
+            "totals": totals,
+            "by_stage": by_stage,
+            "calls": [asdict(record) for record in calls],
+        }
+
+    def log_summary(self) -> None:
+        """Log job totals and the per-stage breakdown."""
+        summary = self.summary()
+        logger.info(
+            "LLM usage for job",
+            totals=summary["totals"],
+            by_stage={
+                stage: {
+                    "calls": entry["calls"],
+                    "cached_tokens": entry["cached_tokens"],
+                    "cache_write_tokens": entry["cache_write_tokens"],
+                    "latency_seconds": entry["latency_seconds"],
+                    "cost_usd": entry["cost_usd"],
+                }
+                for stage, entry in summary["by_stage"].items()
+            },
+        )
+
+
+_job_usage: ContextVar[JobUsage | None] = ContextVar("job_usage", default=None)
+
+
+def job_usage() -> JobUsage:
+    """Get the current job's usage ledger.
+
+    Outside a ``usage_scope`` a fresh, unshared ledger is returned, so calls
+    made outside a job are simply not aggregated.
+    """
+    return _job_usage.get() or JobUsage()
+
+
+@contextmanager
+def usage_scope() -> Iterator[JobUsage]:
+    """Collect usage for every LLM call made inside the block.
+
+    Yields:
+        The job's usage ledger
+    """
+    usage = JobUsage()
+    token = _job_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _job_usage.reset(token)
+
+
+@contextmanager
+def record_llm_call(
+    provider: str, model: str, stage: str, kind: str = "generate", queue_seconds: float = 0.0
+) -> Iterator[CallMeter]:
+    """Time an LLM call and add it to the current job's usage.
+
+    Failed calls are recorded with their latency and error, then re-raised.
+
+    Args:
+        provider: Provider name (e.g. "gemini")
+        model: Model name
+        stage: Stage key or agent name
+        kind: Call kind ("generate", "hedge", "batch", "continuation", "repair", "agent")
+        queue_seconds: Time spent waiting for rate limit quota
+
+    Yields:
+        Meter for reporting usage and the first byte
+    """
+    meter = CallMeter(
+        CallRecord(
+            provider=provider,
+            model=model,
+            stage=stage or "unknown",
+            kind=kind,
+            queue_seconds=queue_seconds,
+        )
+    )
+    try:
+        yield meter
+    except BaseException as e:
+        meter.record.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record = meter.record
+        record.latency_seconds = meter.elapsed()
+        if record.ttfb_seconds is None and record.error is None:
+            # Non-streaming call: the whole response arrives at once
+            record.ttfb_seconds = record.latency_seconds
+        job_usage().add(record)
+
+
+def record_retry(retry_state: RetryCallState) -> None:
+    """Tenacity ``before_sleep`` hook counting full retries of ``call_<stage>`` methods."""
+    name = getattr(retry_state.fn, "__name__", "")
+    stage = name.removeprefix("call_") or "unknown"
+    error = retry_state.outcome.exception() if retry_state.outcome else None
+    job_usage().record_retry(stage)
+    logger.warning(
+        "Retrying stage call",
+        stage=stage,
+        attempt=retry_state.attempt_number,
+        error=str(error) if error else None,
+    )
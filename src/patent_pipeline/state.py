@@ -14,6 +14,9 @@ class PatentPipelineState(TypedDict, total=False):
     patent_pdf_url: str
     history_pdf_url: str
 
+    # Skip cached LLM responses for this run (fresh responses are still stored)
+    bypass_cache: bool
+
     # Ingested binary data
     patent_pdf_bytes: bytes
     history_pdf_bytes: bytes
@@ -62,6 +65,9 @@ class PatentPipelineState(TypedDict, total=False):
     stage4_url: str | None
     search_intel_url: str | None
 
+    # LLM usage for the job (tokens, latency, retries and cost per stage)
+    llm_usage: dict[str, Any]
+
     # Pipeline metadata
     error: str | None
     status: str  # "pending", "processing", "completed", "failed"
@@ -14,7 +14,10 @@ from src.agents import (
     load_tech_pack,
 )
 from src.workflows.state import PatentWorkflowState, create_initial_state
-from src.patent_pipeline.services.azure_io import download_blob, upload_report
+from src.patent_pipeline.services.azure_io import download_blobs, upload_report
+from src.patent_pipeline.services.output_budget import budget_profile, budget_profile_scope
+from src.patent_pipeline.services.prompt_fragments import prompt_fragment_scope
+from src.patent_pipeline.services.usage_accounting import usage_scope
 
 logger = structlog.get_logger(__name__)
 
@@ -58,10 +61,12 @@ class PatentWorkflow:
         logger.info("Ingesting PDFs")
 
         try:
-            history_pdf_bytes = download_blob(state["history_pdf_url"])
-            patent_pdf_bytes = None
+            urls = [state["history_pdf_url"]]
             if state.get("patent_pdf_url"):
-                patent_pdf_bytes = download_blob(state["patent_pdf_url"])
+                urls.append(state["patent_pdf_url"])
+            history_pdf_bytes, *patent = await download_blobs(*urls)
+            patent_pdf_bytes = patent[0] if patent else None
+            budget_profile().document_bytes = len(history_pdf_bytes) + len(patent_pdf_bytes or b"")
 
             return {
                 "history_pdf_bytes": history_pdf_bytes,
@@ -93,6 +98,7 @@ class PatentWorkflow:
 
         # Detect tech center from extraction
         tech_center = self._detect_tech_center(result["extraction"])
+        budget_profile().tech_center = tech_center
 
         return {
             "extraction": result["extraction"],
@@ -384,7 +390,11 @@ class PatentWorkflow:
         app = self.compile()
         initial_state = create_initial_state(patent_pdf_url, history_pdf_url)
 
-        result = await app.ainvoke(initial_state)
+        with prompt_fragment_scope() as fragments, usage_scope() as usage, budget_profile_scope():
+            result = await app.ainvoke(initial_state)
+        fragments.log_report()
+        usage.log_summary()
+        result = {**result, "llm_usage": usage.summary()}
 
         logger.info(
             "Patent workflow completed",
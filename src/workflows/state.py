@@ -54,6 +54,9 @@ class PatentWorkflowState(TypedDict, total=False):
     stage4_url: str
     search_intel_url: str
 
+    # LLM usage for the run (tokens, latency, retries and cost per agent)
+    llm_usage: dict[str, Any]
+
 
 def create_initial_state(
     patent_pdf_url: str,
@@ -0,0 +1,309 @@
+"""Tests for the patent pipeline agents."""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from src.agents.analyst import AnalystAgent
+from src.agents.qc import QCAgent
+from src.agents.writer import WriterAgent
+
+
+class _FakeResponse:
+    """Minimal stand-in for a Gemini response."""
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+
+class _SlowGeminiModel:
+    """Fake blocking Gemini model with a fixed latency per stage."""
+
+    def __init__(self, latencies: dict[str, float]) -> None:
+        self.latencies = latencies
+
+    def generate_content(self, parts):
+        prompt = parts[-1]
+        if "## STAGE 2B DATA" in prompt:
+            stage = "2c"
+        elif "## STAGE 2A DATA" in prompt:
+            stage = "2b"
+        else:
+            stage = "2a"
+        time.sleep(self.latencies[stage])
+        return _FakeResponse(f'{{"stage": "{stage}"}}')
+
+
+class TestParallelAnalysisBenchmark:
+    """Benchmark Stage 2B/2C overlap against a fake slow backend."""
+
+    @pytest.mark.asyncio
+    async def test_stage2b_and_2c_overlap(self):
+        """2B+2C wall time should be close to max(2B, 2C), not the sum."""
+        latencies = {"2a": 0.05, "2b": 0.4, "2c": 0.3}
+        agent = AnalystAgent()
+        agent._gemini_model = _SlowGeminiModel(latencies)
+
+        start = time.perf_counter()
+        result = await agent.analyze_parallel({"events": []}, "# Tech Pack")
+        elapsed = time.perf_counter() - start
+
+        stage2_elapsed = elapsed - latencies["2a"]
+        assert result["stage2b"] == {"stage": "2b"}
+        assert result["stage2c"] == {"stage": "2c"}
+        assert stage2_elapsed < latencies["2b"] + latencies["2c"] - 0.15
+        assert stage2_elapsed >= max(latencies["2b"], latencies["2c"])
+
+    @pytest.mark.asyncio
+    async def test_event_loop_stays_responsive(self):
+        """A slow Gemini call must not freeze other coroutines on the loop."""
+        agent = AnalystAgent()
+        agent._gemini_model = _SlowGeminiModel({"2a": 0.3, "2b": 0.0, "2c": 0.0})
+
+        ticks = 0
+
+        async def ticker() -> None:
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker_task = asyncio.create_task(ticker())
+        await agent.analyze_stage2a({"events": []}, "# Tech Pack")
+        ticker_task.cancel()
+
+        assert ticks >= 10
+
+
+class _SlowClaudeMessages:
+    """Fake async Anthropic messages API with fixed latency."""
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.latency)
+        self.in_flight -= 1
+        return type("Msg", (), {"content": [_FakeResponse("report")]})()
+
+
+class TestAsyncClaude:
+    """Tests for the shared async Claude path."""
+
+    @pytest.mark.asyncio
+    async def test_agents_share_one_client(self):
+        """Writer and QC agents use the same pooled client on a loop."""
+        writer = WriterAgent()
+        qc = QCAgent()
+
+        assert writer.claude_client is qc.claude_client
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_overlap(self):
+        """Concurrent Claude calls run together instead of serializing."""
+        writer = WriterAgent()
+        qc = QCAgent()
+        messages = _SlowClaudeMessages(latency=0.2)
+        fake_client = type("Client", (), {"messages": messages})()
+        writer._claude_client = fake_client
+        qc._claude_client = fake_client
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            writer.invoke("a"), writer.invoke("b"), qc.invoke("c"), qc.invoke("d")
+        )
+        elapsed = time.perf_counter() - start
+
+        assert messages.max_in_flight == 4
+        assert elapsed < 0.4
+
+
+class _FailingClaudeMessages:
+    """Fake Anthropic messages API that is overloaded."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        import anthropic
+        import httpx
+
+        self.calls += 1
+        request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+        raise anthropic.InternalServerError(
+            "Overloaded", response=httpx.Response(529, request=request), body=None
+        )
+
+
+class TestProviderFailover:
+    """Tests for health-aware routing between Gemini and Claude."""
+
+    def _router(self, **kwargs):
+        from src.patent_pipeline.services.provider_router import ProviderRouter
+
+        return ProviderRouter(
+            models={"gemini": "gemini-model", "claude": "claude-model"},
+            allow={"Writer": ("gemini",)},
+            min_samples=2,
+            **kwargs,
+        )
+
+    def test_degraded_provider_routed_by_allow_list(self):
+        """Only allowed, portable stages move off a degraded provider."""
+        router = self._router(latency_threshold_seconds=10)
+        assert router.route("Writer", "claude") == "claude"
+
+        router.record("claude", 1.0, ok=False)
+        router.record("claude", 1.0, ok=False)
+        assert router.degraded("claude") == "error_rate"
+        assert router.route("Writer", "claude") == "gemini"
+        assert router.route("Writer", "claude", portable=False) == "claude"
+        assert router.route("QC", "claude") == "claude"
+
+        router.record("gemini", 12.0, ok=True)
+        router.record("gemini", 15.0, ok=True)
+        assert router.degraded("gemini") == "latency"
+        # No healthy target: stay on the configured provider
+        assert router.route("Writer", "claude") == "claude"
+        assert router.stats()["failovers"] == {"Writer:claude->gemini": 1}
+
+    @pytest.mark.asyncio
+    async def test_provider_error_fails_over_with_adapted_prompt(self):
+        """An overloaded Claude call is answered by Gemini with the Gemini adapter."""
+        from unittest.mock import patch
+
+        router = self._router()
+        writer = WriterAgent()
+        messages = _FailingClaudeMessages()
+        writer._claude_client = type("Client", (), {"messages": messages})()
+        prompts = []
+
+        class _GeminiModel:
+            def generate_content(self, parts):
+                prompts.append(parts[-1])
+                return _FakeResponse("# Report")
+
+        writer._gemini_model = _GeminiModel()
+        with patch("src.agents.base.get_provider_router", return_value=router):
+            assert await writer.invoke("Write the report") == "# Report"
+
+            # Claude is now degraded, so the next call goes straight to Gemini
+            router.record("claude", 1.0, ok=False)
+            assert await writer.invoke("Write it again") == "# Report"
+
+        assert messages.calls == 1
+        assert prompts[0].startswith("Write the report\n\nOutput only the complete report")
+        health = router.stats()["providers"]
+        assert health["claude"]["error_rate"] == 1.0
+        assert health["gemini"]["samples"] == 2
+
+
+class _RecordingClaudeMessages:
+    """Fake Anthropic messages API that records requests and reports cache usage."""
+
+    def __init__(self) -> None:
+        self.requests = []
+        self.text = "### QC_JSON_OUTPUT\n```json\n{\"qc_issues\": []}\n```"
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        cached = 9000 if len(self.requests) > 1 else 0
+        usage = type(
+            "Usage",
+            (),
+            {
+                "input_tokens": 500,
+                "output_tokens": 100,
+                "cache_read_input_tokens": cached,
+                "cache_creation_input_tokens": 9000 - cached,
+            },
+        )()
+        return type("Msg", (), {"content": [_FakeResponse(self.text)], "usage": usage})()
+
+
+class TestClaudePromptCaching:
+    """Tests for Anthropic prompt caching in the Writer and QC agents."""
+
+    @pytest.mark.asyncio
+    async def test_qc_prompt_sent_once_with_cache_breakpoints(self):
+        """The Stage 4 prompt is only the system prompt; system and data are cached."""
+        from src.patent_pipeline.services.usage_accounting import usage_scope
+
+        qc = QCAgent()
+        messages = _RecordingClaudeMessages()
+        qc._claude_client = type("Client", (), {"messages": messages})()
+
+        with usage_scope() as usage:
+            for report in ("# Draft 1", "# Draft 2"):
+                await qc.verify(report, {"events": [1]}, {"rows": [2]})
+
+        first, second = messages.requests
+        assert first["system"][0]["text"] == qc.system_prompt
+        assert first["system"][0]["cache_control"] == {"type": "ephemeral"}
+        prefix, body = first["messages"][0]["content"]
+        assert prefix["cache_control"] == {"type": "ephemeral"}
+        assert "## STAGE 1 EXTRACTION DATA" in prefix["text"]
+        assert "# Draft 1" in body["text"]
+        assert qc.system_prompt not in prefix["text"] + body["text"]
+        # The cached prefix is identical across revision rounds
+        assert second["messages"][0]["content"][0] == prefix
+
+        totals = usage.summary()["by_stage"]["QC"]
+        assert totals["cache_write_tokens"] == 9000
+        assert totals["cached_tokens"] == 9000
+
+
+class TestAgentOutputBudgets:
+    """Tests for learned output token limits on agent calls."""
+
+    @pytest.mark.asyncio
+    async def test_claude_max_tokens_follows_learned_budget(self):
+        """The first call uses the agent's max_tokens, later calls the learned budget."""
+        from unittest.mock import patch
+
+        from src.patent_pipeline.services.output_budget import OutputBudgets
+
+        qc = QCAgent()
+        messages = _RecordingClaudeMessages()
+        qc._claude_client = type("Client", (), {"messages": messages})()
+        budgets = OutputBudgets(min_tokens=256, min_samples=1)
+
+        with patch("src.agents.base.get_output_budgets", return_value=budgets):
+            for report in ("# Draft 1", "# Draft 2"):
+                await qc.verify(report, {"events": [1]}, {"rows": [2]})
+
+        first, second = messages.requests
+        assert first["max_tokens"] == qc.config.max_tokens
+        assert second["max_tokens"] == 256  # 100 output tokens plus headroom, at the floor
+
+
+class TestQCReportEdits:
+    """Tests for QC corrections returned as edits."""
+
+    @pytest.mark.asyncio
+    async def test_verify_applies_report_edits(self):
+        """The corrected report is the draft with the QC edits applied."""
+        qc = QCAgent()
+        messages = _RecordingClaudeMessages()
+        edits = [
+            {"section": "Timeline", "find": "2020-01-01", "replace": "2020-02-02"},
+            {"section": "Timeline", "find": "not in the report", "replace": "x"},
+        ]
+        messages.text = (
+            '### QC_JSON_OUTPUT\n```json\n{"quality_grade": "B", "qc_issues": []}\n```\n\n'
+            f"### REPORT_EDITS\n```json\n{json.dumps(edits)}\n```"
+        )
+        qc._claude_client = type("Client", (), {"messages": messages})()
+
+        result = await qc.verify("# Report\n\n## Timeline\nNOA 2020-01-01\n", {}, {})
+
+        assert result.corrected_report == "# Report\n\n## Timeline\nNOA 2020-02-02\n"
+        assert result.qc_json["edits_applied"] == 1
+        assert result.qc_json["edit_conflicts"][0]["reason"] == "not_found"
+        assert "### REPORT_EDITS" in messages.requests[0]["messages"][0]["content"][-1]["text"]
@@ -1,7 +1,7 @@
 """Tests for patent report API endpoints."""
 
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import AsyncMock, patch, MagicMock
 from fastapi.testclient import TestClient
 
 from src.api.app import create_app
@@ -63,7 +63,7 @@ class TestPatentReportsAPI:
 
         assert response.status_code == 422  # Validation error
 
-    @patch("src.api.routes.patent_reports.run_patent_pipeline")
+    @patch("src.api.routes.patent_reports.arun_patent_pipeline", new_callable=AsyncMock)
     def test_generate_reports_success(self, mock_pipeline, client):
         """Test successful report generation."""
         mock_pipeline.return_value = {
@@ -90,7 +90,7 @@ class TestPatentReportsAPI:
         assert data["stage4_url"] == "https://example.com/stage4.md"
         assert data["qc_score"] == 95.0
 
-    @patch("src.api.routes.patent_reports.run_patent_pipeline")
+    @patch("src.api.routes.patent_reports.arun_patent_pipeline", new_callable=AsyncMock)
     def test_generate_reports_pipeline_failure(self, mock_pipeline, client):
         """Test pipeline failure handling."""
         mock_pipeline.return_value = {
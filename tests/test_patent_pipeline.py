@@ -1,5 +1,6 @@
 """Tests for the patent litigation report pipeline."""
 
+import asyncio
 import json
 import pytest
 from unittest.mock import Mock, patch, MagicMock
@@ -65,6 +66,38 @@ class TestAzureIO:
 
         assert base_name == "APPNO_wrapper"
 
+    @pytest.mark.asyncio
+    async def test_ingest_downloads_pdfs_concurrently(self):
+        """Test ingest fetches the history and patent PDFs at the same time."""
+        import threading
+
+        from src.patent_pipeline.nodes.ingest import ingest_pdfs_node
+
+        # Each download waits for the other one to start
+        both_started = threading.Barrier(2, timeout=5)
+
+        def from_blob_url(url):
+            def download_blob(**kwargs):
+                both_started.wait()
+                return Mock(readall=Mock(return_value=url.rsplit("/", 1)[-1].encode()))
+
+            return Mock(download_blob=download_blob)
+
+        state = {
+            "history_pdf_url": "https://account.blob.core.windows.net/container/APP_wrapper.pdf",
+            "patent_pdf_url": "https://account.blob.core.windows.net/container/US123.pdf",
+        }
+        with patch(
+            "src.patent_pipeline.services.azure_io.BlobClient.from_blob_url",
+            side_effect=from_blob_url,
+        ):
+            result = await ingest_pdfs_node(state)
+
+        assert result["status"] == "processing"
+        assert result["history_pdf_bytes"] == b"APP_wrapper.pdf"
+        assert result["patent_pdf_bytes"] == b"US123.pdf"
+        assert result["base_name"] == "APP_wrapper"
+
 
 class TestPydanticModels:
     """Tests for Pydantic model validation."""
@@ -339,3 +372,1521 @@ That's the output.'''
         result = client._parse_json_response(test_response)
 
         assert result == {"key": "value", "number": 42}
+
+
+class TestLLMRegistry:
+    """Tests for the shared prompt/model registry."""
+
+    @patch("src.patent_pipeline.services.llm_registry.genai")
+    def test_prompts_and_models_created_once(self, mock_genai):
+        """Clients share prompts and model handles across instances."""
+        from src.patent_pipeline.services.gemini_client import GeminiClient
+        from src.patent_pipeline.services.llm_registry import LLMRegistry
+
+        registry = LLMRegistry()
+        with patch(
+            "src.patent_pipeline.services.gemini_client.get_llm_registry",
+            return_value=registry,
+        ):
+            clients = [GeminiClient() for _ in range(3)]
+            models = [client.model for client in clients]
+
+        stats = registry.stats()
+        assert stats["prompt_loads"] == 7
+        assert stats["prompt_hits"] == 14
+        assert stats["model_creations"] == 1
+        assert stats["model_hits"] == 2
+        assert models[0] is models[1] is models[2]
+        assert "stage2a" in clients[0].prompts
+
+
+class TestGeminiUploadCache:
+    """Tests for the content-addressed Gemini upload cache."""
+
+    @pytest.mark.asyncio
+    async def test_identical_pdf_uploaded_once(self):
+        """Retries and reruns with the same bytes reuse one upload."""
+        from src.patent_pipeline.services.upload_cache import GeminiUploadCache
+
+        cache = GeminiUploadCache(max_entries=4, idle_seconds=3600, expiry_margin=60)
+        uploaded = MagicMock(expiration_time=None)
+
+        with patch(
+            "src.patent_pipeline.services.upload_cache._upload_to_gemini",
+            return_value=uploaded,
+        ) as mock_upload:
+            async with cache.lease(b"%PDF-history", "history.pdf") as first:
+                pass
+            async with cache.lease(b"%PDF-history", "history.pdf") as second:
+                pass
+
+        assert first is second is uploaded
+        assert mock_upload.call_count == 1
+        assert cache.stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_expiring_upload_is_replaced_and_deleted(self):
+        """Handles close to expiry are re-uploaded and the old file deleted."""
+        import time as time_module
+        from src.patent_pipeline.services.upload_cache import GeminiUploadCache
+
+        cache = GeminiUploadCache(max_entries=4, idle_seconds=3600, expiry_margin=600)
+        old_file = MagicMock(expiration_time=None)
+        old_file.name = "files/old"
+        new_file = MagicMock(expiration_time=None)
+        new_file.name = "files/new"
+
+        with patch(
+            "src.patent_pipeline.services.upload_cache._upload_to_gemini",
+            side_effect=[old_file, new_file],
+        ), patch("src.patent_pipeline.services.upload_cache.genai") as mock_genai:
+            async with cache.lease(b"%PDF", "history.pdf"):
+                entry = next(iter(cache._entries.values()))
+                entry.expires_at = time_module.time() + 300  # inside the reuse margin
+
+                async with cache.lease(b"%PDF", "history.pdf") as result:
+                    # The old file is still leased by the outer block
+                    mock_genai.delete_file.assert_not_called()
+
+        assert result is new_file
+        mock_genai.delete_file.assert_called_once_with("files/old")
+
+    @pytest.mark.asyncio
+    async def test_leased_uploads_are_not_evicted(self):
+        """Over capacity, only files no lease holds are deleted."""
+        from src.patent_pipeline.services.upload_cache import GeminiUploadCache
+
+        cache = GeminiUploadCache(max_entries=1, idle_seconds=3600, expiry_margin=60)
+        files = [MagicMock(expiration_time=None) for _ in range(3)]
+        for index, file in enumerate(files):
+            file.name = f"files/{index}"
+
+        with patch(
+            "src.patent_pipeline.services.upload_cache._upload_to_gemini", side_effect=files
+        ), patch("src.patent_pipeline.services.upload_cache.genai") as mock_genai:
+            async with cache.lease(b"%PDF-0", "a.pdf"), cache.lease(b"%PDF-1", "b.pdf"):
+                mock_genai.delete_file.assert_not_called()
+                assert cache.stats()["leased"] == 2
+            async with cache.lease(b"%PDF-2", "c.pdf"):
+                pass
+            assert await cache.sweep() == 0
+
+        deleted = [call.args[0] for call in mock_genai.delete_file.call_args_list]
+        assert sorted(deleted) == ["files/0", "files/1"]
+        assert cache.stats()["entries"] == 1
+
+    def test_upload_streams_from_buffer(self):
+        """PDF bytes are uploaded from an in-memory buffer, not a temp file."""
+        import io
+        from src.patent_pipeline.services.upload_cache import _upload_to_gemini
+
+        with patch("src.patent_pipeline.services.upload_cache.genai") as mock_genai, patch(
+            "tempfile.NamedTemporaryFile"
+        ) as mock_tempfile:
+            _upload_to_gemini(b"%PDF-1.7 history", "history.pdf")
+
+        source = mock_genai.upload_file.call_args.kwargs["path"]
+        assert isinstance(source, io.BytesIO)
+        assert source.getvalue() == b"%PDF-1.7 history"
+        assert mock_genai.upload_file.call_args.kwargs["mime_type"] == "application/pdf"
+        mock_tempfile.assert_not_called()
+
+
+class TestResponseCache:
+    """Tests for the persistent LLM response cache."""
+
+    def test_key_is_canonical(self):
+        """Dict ordering does not change the key; any input change does."""
+        from src.patent_pipeline.services.response_cache import response_cache_key
+
+        first = response_cache_key(model="m", inputs={"a": 1, "b": [1, 2]})
+        reordered = response_cache_key(inputs={"b": [1, 2], "a": 1}, model="m")
+        changed = response_cache_key(model="m", inputs={"a": 1, "b": [2, 1]})
+
+        assert first == reordered
+        assert first != changed
+
+    @pytest.mark.asyncio
+    async def test_disk_cache_ttl_and_size_eviction(self, tmp_path):
+        """Expired entries miss and the least recently used entry is evicted."""
+        import os
+        import time as time_module
+        from src.patent_pipeline.services.response_cache import DiskResponseCache
+
+        cache = DiskResponseCache(tmp_path, ttl_seconds=3600, max_bytes=10_000)
+        await cache.set("aa01", "x" * 4000)
+        await cache.set("bb02", "y" * 4000)
+        old = time_module.time() - 60
+        os.utime(cache._path("aa01"), (old, old))
+        os.utime(cache._path("bb02"), (old + 30, old + 30))
+
+        assert await cache.get("aa01") == "x" * 4000  # refreshes recency
+        await cache.set("cc03", "z" * 4000)
+
+        assert await cache.get("bb02") is None
+        assert await cache.get("aa01") is not None
+
+        cache.ttl_seconds = 0
+        time_module.sleep(0.01)
+        assert await cache.get("cc03") is None
+        assert cache.stats()["evictions"] == 2
+
+    @pytest.mark.asyncio
+    async def test_disk_cache_sweeps_only_over_the_size_estimate(self, tmp_path):
+        """Writes under the limit track the size without scanning the directory."""
+        from src.patent_pipeline.services.response_cache import DiskResponseCache
+
+        cache = DiskResponseCache(tmp_path, ttl_seconds=3600, max_bytes=10_000)
+        with patch.object(cache, "_evict", wraps=cache._evict) as sweep:
+            await cache.set("aa01", "x" * 3000)  # first write measures the directory
+            await cache.set("bb02", "y" * 3000)
+            await cache.set("bb02", "y" * 3000)  # replacing an entry does not grow it
+            await cache.set("cc03", "z" * 3000)
+            assert sweep.call_count == 1
+            await cache.set("dd04", "w" * 3000)
+            assert sweep.call_count == 2
+
+        assert await cache.get("aa01") is None
+        assert cache._total_bytes <= 10_000
+
+    @pytest.mark.asyncio
+    async def test_stage_rerun_served_from_cache(self, tmp_path):
+        """A rerun with identical inputs skips Gemini unless bypassed."""
+        from unittest.mock import AsyncMock
+        from src.patent_pipeline.services.gemini_client import GeminiClient
+        from src.patent_pipeline.services.response_cache import DiskResponseCache
+
+        cache = DiskResponseCache(tmp_path, ttl_seconds=3600, max_bytes=10_000_000)
+        response = MagicMock(text='{"claim_construction_rows": []}')
+
+        with patch(
+            "src.patent_pipeline.services.gemini_client.get_response_cache",
+            return_value=cache,
+        ), patch.object(GeminiClient, "_generate", new_callable=AsyncMock) as mock_generate:
+            mock_generate.return_value = response
+            stage1 = {"events": [{"date": "2020-01-01"}]}
+
+            first = await GeminiClient().call_stage2a(stage1, "# Tech Pack")
+            second = await GeminiClient().call_stage2a(stage1, "# Tech Pack")
+            assert mock_generate.call_count == 1
+
+            await GeminiClient(bypass_cache=True).call_stage2a(stage1, "# Tech Pack")
+            assert mock_generate.call_count == 2
+
+        assert first == second
+        assert first["claim_construction_rows"] == []
+
+
+class _FakeContextProvider:
+    """Local stand-in for Gemini context caching."""
+
+    def __init__(self, fail: bool = False) -> None:
+        self.fail = fail
+        self.created: list[list[str]] = []
+        self.refreshed = 0
+
+    def create(self, model_name, contents, ttl_seconds, display_name):
+        if self.fail:
+            raise RuntimeError("CachedContent is not supported for this model")
+        import time as time_module
+
+        self.created.append(contents)
+        return {"contents": contents}, time_module.time() + ttl_seconds
+
+    def refresh(self, handle, ttl_seconds):
+        import time as time_module
+
+        self.refreshed += 1
+        return time_module.time() + ttl_seconds
+
+    def bind_model(self, handle):
+        return MagicMock(name="cached-model")
+
+
+class TestContextCache:
+    """Tests for Gemini context caching of shared prompt prefixes."""
+
+    @pytest.mark.asyncio
+    async def test_hit_miss_refresh_and_expiry(self):
+        """Prefixes are created once, refreshed near expiry, recreated after it."""
+        import time as time_module
+        from src.patent_pipeline.services.gemini_client import ContextCacheManager
+
+        provider = _FakeContextProvider()
+        manager = ContextCacheManager(
+            provider=provider, refresh_margin=60, min_chars=0, failure_backoff=60, enabled=True
+        )
+        prefix = ["stage prompt", "tech pack"]
+
+        first = await manager.get_model("gemini", prefix, ttl_seconds=3600)
+        second = await manager.get_model("gemini", prefix, ttl_seconds=3600)
+        await manager.get_model("gemini", ["other prompt", "tech pack"], ttl_seconds=3600)
+        assert first is second
+        assert len(provider.created) == 2
+
+        entry = manager._entries[manager._key("gemini", prefix)]
+        entry.expires_at = time_module.time() + 30  # inside the refresh margin
+        assert await manager.get_model("gemini", prefix, ttl_seconds=3600) is first
+        assert provider.refreshed == 1
+
+        entry.expires_at = time_module.time() - 1  # expired on the server
+        await manager.get_model("gemini", prefix, ttl_seconds=3600)
+        assert len(provider.created) == 3
+        assert manager.stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_unavailable_caching_falls_back_to_full_prompt(self):
+        """A failed create sends the full prompt and backs off further attempts."""
+        from unittest.mock import PropertyMock
+        from src.patent_pipeline.services.gemini_client import ContextCacheManager, GeminiClient
+
+        manager = ContextCacheManager(
+            provider=_FakeContextProvider(fail=True),
+            refresh_margin=60,
+            min_chars=0,
+            failure_backoff=600,
+            enabled=True,
+        )
+        client = GeminiClient()
+        model = MagicMock()
+        with patch(
+            "src.patent_pipeline.services.gemini_client.get_context_cache",
+            return_value=manager,
+        ), patch.object(GeminiClient, "model", new_callable=PropertyMock, return_value=model):
+            layout = client._layout(
+                "stage3", sections=["## STAGE 2 FORENSIC DATA"], stage1_section="## STAGE 1"
+            )
+            await client._generate(layout)
+            await client._generate(layout)
+
+        assert layout.scope == "job"
+        model.generate_content.assert_called_with(layout.text())
+        assert model.generate_content.call_count == 2
+        assert manager.stats()["failures"] == 1
+        assert manager.stats()["skipped"] == 1
+
+
+class TestPromptFragments:
+    """Tests for serialize-once prompt fragments."""
+
+    @pytest.mark.asyncio
+    async def test_stage1_serialized_once_per_job(self):
+        """Stage 1 is serialized once and reused compactly by later stages."""
+        from unittest.mock import AsyncMock
+        from src.patent_pipeline.services import prompt_fragments
+        from src.patent_pipeline.services.gemini_client import GeminiClient
+        from src.patent_pipeline.services.response_cache import NullResponseCache
+
+        stage1 = {"events": [{"date": "2020-01-01", "type": "rejection"}], "claims_diff": []}
+        stage2a = {"claim_construction_rows": []}
+        prompts = []
+
+        async def fake_generate(contents, **kwargs):
+            prompts.append(contents.text())
+            return MagicMock(text="{}")
+
+        with patch(
+            "src.patent_pipeline.services.gemini_client.get_response_cache",
+            return_value=NullResponseCache(),
+        ), patch.object(GeminiClient, "_generate", new=AsyncMock(side_effect=fake_generate)), patch(
+            "src.patent_pipeline.services.prompt_fragments.serialize_compact",
+            wraps=prompt_fragments.serialize_compact,
+        ) as mock_serialize:
+            with prompt_fragments.prompt_fragment_scope() as fragments:
+                await GeminiClient().call_stage2a(stage1, "# Tech Pack")
+                await GeminiClient().call_stage2b(stage1, stage2a, "# Tech Pack")
+                await GeminiClient().call_stage2c(stage1, stage2a, {}, "# Tech Pack")
+
+        assert mock_serialize.call_count == 3  # stage1, stage2a, stage2b
+        compact = '{"claims_diff":[],"events":[{"date":"2020-01-01","type":"rejection"}]}'
+        assert all(compact in prompt for prompt in prompts)
+
+        report = {f["label"]: f for f in fragments.report()}
+        assert report["stage1_extraction"]["uses"] == 3
+        assert report["stage1_extraction"]["size_bytes"] == len(compact)
+
+
+class TestStructuredOutput:
+    """Tests for schema-constrained JSON stage outputs."""
+
+    def test_schema_derived_from_models(self):
+        """Refs are inlined, optionals nullable, free-form dicts key/value lists."""
+        from src.patent_pipeline.services.structured_output import gemini_schema_dict
+
+        schema = gemini_schema_dict(Stage1Extraction)
+        text = json.dumps(schema)
+        claims_item = schema["properties"]["claims_diff"]["items"]
+
+        assert "$ref" not in text and "anyOf" not in text and "default" not in text
+        assert schema["properties"]["metadata"]["properties"]["patent_number"]["nullable"] is True
+        assert claims_item["properties"]["amendments"]["items"]["type"] == "ARRAY"
+        assert claims_item["properties"]["amendments"]["items"]["items"]["required"] == [
+            "key",
+            "value",
+        ]
+
+    def test_parse_structured_decodes_and_validates(self):
+        """Key/value pairs become dicts and the output is validated in one pass."""
+        from src.patent_pipeline.services.structured_output import parse_structured
+
+        text = json.dumps({
+            "event_forensics": [],
+            "global_findings": {
+                "overall_prosecution_quality": "good",
+                "invalidity_attack_strength": "weak",
+                "infringement_defense_strength": "strong",
+                "critical_dates": [[{"key": "date", "value": "2020-01-01"}]],
+            },
+        })
+        result = parse_structured(text, Stage2C)
+
+        assert result["global_findings"]["critical_dates"] == [{"date": "2020-01-01"}]
+        assert result["timeline_summary"] == ""
+        with pytest.raises(ValueError):
+            parse_structured('{"global_findings": {"key_strengths": []}}', Stage2C)
+
+    def test_freeform_values_keep_their_types(self):
+        """Free-form dict values round-trip as numbers and nested objects."""
+        from src.patent_pipeline.services.structured_output import (
+            gemini_schema_dict,
+            parse_structured,
+        )
+
+        amendment = {"date": "2020-01-01", "claims_changed": 3, "changes": {"added": ["wherein"]}}
+        pairs = [{"key": key, "value": json.dumps(value)} for key, value in amendment.items()]
+        text = json.dumps({
+            "metadata": {"application_number": "16/123,456", "title": "Widget"},
+            "claims_diff": [
+                {"claim_number": 1, "claim_type": "independent", "final_text": "A widget",
+                 "amendments": [pairs]},
+            ],
+        })
+
+        result = parse_structured(text, Stage1Extraction)
+
+        assert result["claims_diff"][0]["amendments"] == [amendment]
+        value = gemini_schema_dict(Stage1Extraction)["properties"]["claims_diff"]["items"][
+            "properties"
+        ]["amendments"]["items"]["items"]["properties"]["value"]
+        assert "JSON-encoded" in value["description"]
+
+    @pytest.mark.asyncio
+    async def test_stage4_requests_schema_and_applies_edits(self):
+        """Stage 4 asks for Stage4Output JSON and applies its edits to the draft."""
+        from unittest.mock import AsyncMock
+        from src.patent_pipeline.models.stage4 import Stage4Output
+        from src.patent_pipeline.services.gemini_client import GeminiClient
+        from src.patent_pipeline.services.response_cache import NullResponseCache
+
+        payload = {
+            "qc": {"qc_summary": "ok"},
+            "edits": [{"section": "Draft", "find": "Dratf", "replace": "Draft"}],
+        }
+        with patch(
+            "src.patent_pipeline.services.gemini_client.get_response_cache",
+            return_value=NullResponseCache(),
+        ), patch.object(GeminiClient, "_generate", new_callable=AsyncMock) as mock_generate:
+            mock_generate.return_value = MagicMock(text=json.dumps(payload))
+            qc_json, report = await GeminiClient().call_stage4(
+                {"events": []}, {}, "# Draft\n\nDratf text"
+            )
+
+        assert mock_generate.call_args.kwargs["response_model"] is Stage4Output
+        assert qc_json["qc_summary"] == "ok"
+        assert qc_json["approved_for_delivery"] is False
+        assert (qc_json["edits_applied"], qc_json["edit_conflicts"]) == (1, [])
+        assert report == "# Draft\n\nDraft text"
+
+    @pytest.mark.asyncio
+    async def test_text_output_missing_fields_is_repaired(self):
+        """Without a response schema, Stage 4 JSON lacking "qc" goes through repair."""
+        from unittest.mock import AsyncMock
+        from src.patent_pipeline.services.gemini_client import GeminiClient
+        from src.patent_pipeline.services.response_cache import NullResponseCache
+
+        responses = [
+            MagicMock(text='```json\n{"edits": []}\n```'),
+            MagicMock(text='{"qc": {"qc_summary": "ok"}, "edits": []}'),
+        ]
+        with patch(
+            "src.patent_pipeline.services.gemini_client.get_response_cache",
+            return_value=NullResponseCache(),
+        ), patch.object(
+            GeminiClient, "_generate", new_callable=AsyncMock, side_effect=responses
+        ) as mock_generate:
+            client = GeminiClient()
+            with patch.object(client.settings, "gemini_structured_output", False):
+                qc_json, report = await client.call_stage4({"events": []}, {}, "# Draft")
+
+        assert mock_generate.call_args.kwargs["kind"] == "repair"
+        assert qc_json["qc_summary"] == "ok"
+        assert report == "# Draft"
+
+
+class TestOutputRepair:
+    """Tests for repairing unparseable stage output without regenerating it."""
+
+    def test_transient_errors_classified(self):
+        """Only transport failures and unrepairable output trigger a full retry."""
+        from google.api_core import exceptions as api_exceptions
+        from src.patent_pipeline.services.output_repair import (
+            OutputRepairError,
+            is_transient_error,
+        )
+
+        assert is_transient_error(api_exceptions.ResourceExhausted("quota"))
+        assert is_transient_error(api_exceptions.ServiceUnavailable("down"))
+        assert is_transient_error(TimeoutError())
+        assert is_transient_error(OutputRepairError("still broken"))
+        assert not is_transient_error(json.JSONDecodeError("bad", "{", 0))
+        assert not is_transient_error(api_exceptions.InvalidArgument("bad request"))
+
+    def test_local_repair(self):
+        """Trailing commas, smart quotes and truncation are fixed locally."""
+        from src.patent_pipeline.services.output_repair import repair_json_text
+
+        assert json.loads(repair_json_text('{"a": [1, 2,], "b": {"c": "x",},}')) == {
+            "a": [1, 2],
+            "b": {"c": "x"},
+        }
+        assert json.loads(repair_json_text('{"a": “x”}')) == {"a": "x"}
+        assert json.loads(repair_json_text('```json\n{"a": 1, "b": ["tr')) == {
+            "a": 1,
+            "b": ["tr"],
+        }
+
+    @pytest.mark.asyncio
+    async def test_parse_error_repaired_without_regeneration(self):
+        """A broken response is repaired locally, then by a follow-up call."""
+        from unittest.mock import AsyncMock
+        from src.patent_pipeline.services.gemini_client import GeminiClient
+        from src.patent_pipeline.services.output_repair import RepairMetrics
+        from src.patent_pipeline.services.response_cache import NullResponseCache
+
+        metrics = RepairMetrics()
+        broken = MagicMock(text='{"claim_construction_rows": [],}')
+        with patch(
+            "src.patent_pipeline.services.gemini_client.get_response_cache",
+            return_value=NullResponseCache(),
+        ), patch(
+            "src.patent_pipeline.services.gemini_client.get_repair_metrics",
+            return_value=metrics,
+        ), patch.object(GeminiClient, "_generate", new_callable=AsyncMock) as mock_generate:
+            mock_generate.return_value = broken
+            result = await GeminiClient().call_stage2a({"events": []}, "# Tech Pack")
+            assert mock_generate.call_count == 1
+            assert result["claim_construction_rows"] == []
+
+            # Not locally repairable: one short repair call, no full retry
+            mock_generate.reset_mock()
+            mock_generate.side_effect = [
+                MagicMock(text='{"claim_construction_rows": [] "x": 1}'),
+                MagicMock(text='{"claim_construction_rows": []}'),
+            ]
+            await GeminiClient().call_stage2a({"events": []}, "# Tech Pack")
+            assert mock_generate.call_count == 2
+            assert "OUTPUT TO FIX" in mock_generate.call_args.args[0]
+
+        stats = metrics.stats()
+        assert stats["local_repairs"] == 1
+        assert stats["model_repairs"] == 1
+        assert stats["success_rate"] == 1.0
+
+
+def _fake_response(text: str, finish_reason: str, total_tokens: int = 10) -> MagicMock:
+    """Build a Gemini-like response with a finish reason and usage."""
+    response = MagicMock(text=text)
+    response.candidates = [MagicMock(finish_reason=MagicMock(name=finish_reason))]
+    response.candidates[0].finish_reason.name = finish_reason
+    response.usage_metadata = MagicMock(
+        prompt_token_count=total_tokens // 2,
+        candidates_token_count=total_tokens // 2,
+        cached_content_token_count=0,
+        total_token_count=total_tokens,
+    )
+    return response
+
+
+class TestContinuation:
+    """Tests for continuing output cut off at the token limit."""
+
+    def test_stitch_drops_reopened_fence_and_overlap(self):
+        """Repeated text and a reopened code fence are not duplicated."""
+        from src.patent_pipeline.services.continuation import stitch
+
+        partial = '```json\n{"events": [{"date": "2020-'
+        assert stitch(partial, '```json\n01-01"}]}\n```') == (
+            '```json\n{"events": [{"date": "2020-01-01"}]}\n```'
+        )
+        repeated = '"summary": "The examiner rejected'
+        assert stitch('{' + repeated, repeated + ' claim 1"}') == (
+            '{"summary": "The examiner rejected claim 1"}'
+        )
+        assert stitch("| 1 | narrow |\n| 2 | broad |\n", "| 2 | broad |\n| 3 |") == (
+            "| 1 | narrow |\n| 2 | broad |\n| 3 |"
+        )
+
+    def test_stitch_keeps_short_overlaps(self):
+        """Short matches at the join are new content, not repeated text."""
+        from src.patent_pipeline.services.continuation import stitch
+
+        assert stitch('{"a": {"b": 1}', "}") == '{"a": {"b": 1}}'
+        assert stitch("Claim 1", "1 recites") == "Claim 11 recites"
+        assert stitch("First paragraph.\n", "\nSecond paragraph.") == (
+            "First paragraph.\n\nSecond paragraph."
+        )
+
+    @pytest.mark.asyncio
+    async def test_truncated_output_continued_and_validated(self):
+        """A MAX_TOKENS response is continued instead of failing parsing."""
+        from unittest.mock import PropertyMock
+        from src.patent_pipeline.services.continuation import CONTINUE_PROMPT
+        from src.patent_pipeline.services.gemini_client import GeminiClient
+        from src.patent_pipeline.services.response_cache import NullResponseCache
+
+        model = MagicMock()
+        model.generate_content.side_effect = [
+            _fake_response('{"events": [{"date": "2020-01-01"}, {"da', "MAX_TOKENS"),
+            _fake_response('te": "2021-02-02"}]}', "STOP"),
+        ]
+        with patch(
+            "src.patent_pipeline.services.gemini_client.get_response_cache",
+            return_value=NullResponseCache(),
+        ), patch.object(GeminiClient, "model", new_callable=PropertyMock, return_value=model):
+            client = GeminiClient()
+            with patch.object(client.settings, "gemini_structured_output", False):
+                result = await client.call_stage2a({"events": []}, "# Tech Pack")
+
+        assert model.generate_content.call_count == 2
+        history = model.generate_content.call_args.args[0]
+        assert [turn["role"] for turn in history] == ["user", "model", "user"]
+        assert history[2]["parts"] == [CONTINUE_PROMPT]
+        assert result["events"][1]["date"] == "2021-02-02"
+
+
+class TestRateLimiter:
+    """Tests for the shared RPM/TPM limiter."""
+
+    @pytest.mark.asyncio
+    async def test_calls_queue_for_quota_and_settle_usage(self):
+        """Calls over the token quota wait; settled usage returns the excess."""
+        import time as time_module
+        from src.patent_pipeline.services.llm_registry import llm_stage
+        from src.patent_pipeline.services.rate_limiter import RateLimit, RateLimiter
+
+        # 6000 TPM: a full minute of burst, then 100 tokens per second
+        limiter = RateLimiter({"gemini": RateLimit(tokens_per_minute=6000)})
+
+        with llm_stage("stage2a"):
+            async with limiter.slot("gemini", "m", 6000) as slot:
+                slot.settle(5900)
+            # Only 5900 were used, so 100 tokens are available now
+            async with limiter.slot("gemini", "m", 100) as slot:
+                assert slot.waited < 0.05
+
+        started = time_module.monotonic()
+        with llm_stage("stage3"):
+            async with limiter.slot("gemini", "m", 30) as slot:
+                pass
+        assert 0.2 < time_module.monotonic() - started < 1.0
+
+        waits = limiter.stats()["waits"]
+        assert waits["gemini/stage2a"]["calls"] == 2
+        assert waits["gemini/stage2a"]["queued"] == 0
+        assert waits["gemini/stage3"]["queued"] == 1
+        assert waits["gemini/stage3"]["max_wait_seconds"] >= 0.2
+
+    def test_estimate_tokens(self):
+        """Text is estimated from its length and files from their size."""
+        from src.patent_pipeline.services.rate_limiter import estimate_tokens
+
+        pdf = MagicMock(size_bytes=400_000)
+        assert estimate_tokens("x" * 400) == 100
+        assert estimate_tokens([pdf, "x" * 40]) == 1010
+        assert estimate_tokens([{"role": "user", "parts": ["x" * 8]}]) == 2
+
+
+class TestUsageAccounting:
+    """Tests for per-call token, latency and cost accounting."""
+
+    @pytest.mark.asyncio
+    async def test_stage_calls_aggregated_per_job(self):
+        """Calls are recorded with usage and cost and summed per stage."""
+        from unittest.mock import PropertyMock
+        from src.patent_pipeline.services.gemini_client import GeminiClient
+        from src.patent_pipeline.services.response_cache import NullResponseCache
+        from src.patent_pipeline.services.usage_accounting import usage_scope
+
+        model = MagicMock()
+        model.generate_content.return_value = _fake_response(
+            '{"claim_construction_rows": []}', "STOP", total_tokens=2_000_000
+        )
+        model.generate_content.return_value.usage_metadata.cached_content_token_count = 400_000
+        with patch(
+            "src.patent_pipeline.services.gemini_client.get_response_cache",
+            return_value=NullResponseCache(),
+        ), patch.object(
+            GeminiClient, "model", new_callable=PropertyMock, return_value=model
+        ), usage_scope() as usage:
+            client = GeminiClient()
+            with patch.object(client.settings, "gemini_model", "gemini-1.5-pro-002"):
+                await client.call_stage2a({"events": []}, "# Tech Pack")
+                await client.call_stage2a({"events": [1]}, "# Tech Pack")
+
+        summary = usage.summary()
+        stage = summary["by_stage"]["stage2a"]
+        assert stage["calls"] == 2
+        assert stage["input_tokens"] == 2_000_000
+        assert stage["cached_tokens"] == 800_000
+        # 600k uncached * $1.25 + 400k cached * $0.3125 + 1M output * $5, per call
+        assert stage["cost_usd"] == pytest.approx(2 * (0.75 + 0.125 + 5.0))
+        assert summary["totals"]["calls"] == 2
+        record = summary["calls"][0]
+        assert record["kind"] == "generate"
+        assert record["ttfb_seconds"] == record["latency_seconds"]
+
+    def test_save_reports_writes_usage_artifact(self):
+        """The job's usage is saved next to the reports and added to the state."""
+        from src.patent_pipeline.nodes.save_reports import save_reports_node
+        from src.patent_pipeline.services.usage_accounting import (
+            CallRecord,
+            usage_scope,
+        )
+
+        with usage_scope() as usage, patch(
+            "src.patent_pipeline.nodes.save_reports.upload_blob",
+            side_effect=lambda container_url, blob_name, **kwargs: f"{container_url}/{blob_name}",
+        ) as mock_upload:
+            usage.add(CallRecord(provider="gemini", model="m", stage="stage3", kind="generate"))
+            result = save_reports_node(
+                {
+                    "azure_container_url": "https://acct/container",
+                    "base_name": "APP123",
+                    "stage3_report_md": "# Report",
+                }
+            )
+
+        uploads = {c.kwargs["blob_name"]: c.kwargs for c in mock_upload.call_args_list}
+        artifact = json.loads(uploads["APP123_LLM_Usage.json"]["content"])
+        assert artifact["by_stage"]["stage3"]["calls"] == 1
+        assert result["llm_usage"]["totals"]["calls"] == 1
+        assert result["status"] == "completed"
+
+
+class _FakeStream:
+    """Gemini-like streaming response: iterates chunks, then exposes the whole text."""
+
+    def __init__(self, pieces: list[str]) -> None:
+        self.pieces = pieces
+        self.text = "".join(pieces)
+        self.candidates = [MagicMock()]
+        self.candidates[0].finish_reason.name = "STOP"
+        self.usage_metadata = MagicMock(
+            prompt_token_count=10,
+            candidates_token_count=10,
+            cached_content_token_count=0,
+            total_token_count=20,
+        )
+
+    def __iter__(self):
+        return iter(MagicMock(text=piece) for piece in self.pieces)
+
+
+class TestReportStreaming:
+    """Tests for streaming report stages to the progress channel and blob blocks."""
+
+    @pytest.mark.asyncio
+    async def test_stage4_completes_progress_without_staging(self):
+        """Stage 4 applies edits rather than streaming, so no blocks are staged."""
+        from unittest.mock import AsyncMock
+        from src.patent_pipeline.nodes.stage4 import stage4_qc_node
+        from src.patent_pipeline.services.gemini_client import GeminiClient
+        from src.patent_pipeline.services.report_streaming import report_stream_scope
+
+        state = {
+            "stage1_extraction": {},
+            "stage2_forensic": {},
+            "stage3_report_md": "# Draft",
+            "azure_container_url": "https://account.blob.core.windows.net/container",
+            "base_name": "APP",
+        }
+        with report_stream_scope("job-stage4") as streams, patch.object(
+            GeminiClient,
+            "call_stage4",
+            new_callable=AsyncMock,
+            return_value=({"qc_issues": []}, "# Final"),
+        ):
+            result = await stage4_qc_node(state)
+
+        assert result["stage4_final_report_md"] == "# Final"
+        assert streams._stagers == {}
+        report = streams.progress.snapshot()["reports"]["stage4"]
+        assert (report["text"], report["done"]) == ("# Final", True)
+
+    @pytest.mark.asyncio
+    async def test_stage3_streamed_staged_and_committed(self):
+        """Stage 3 text reaches subscribers and staged blocks while it is generated."""
+        from unittest.mock import PropertyMock
+        from src.patent_pipeline.nodes.save_reports import save_reports_node
+        from src.patent_pipeline.services.gemini_client import GeminiClient
+        from src.patent_pipeline.services.report_streaming import (
+            get_progress_registry,
+            job_report_streams,
+            report_stream_scope,
+        )
+        from src.patent_pipeline.services.response_cache import NullResponseCache
+
+        report = "# Stage 3\n\n" + "".join(f"Paragraph {i} of the report.\n" for i in range(40))
+        pieces = ["```markdown\n"] + [report[i:i + 90] for i in range(0, len(report), 90)]
+        model = MagicMock()
+        model.generate_content.return_value = _FakeStream(pieces + ["\n```"])
+        staged: dict[str, bytes] = {}
+
+        settings = MagicMock(report_stream_block_chars=200, report_progress_retention_seconds=60)
+        get_progress_registry()
+        with patch(
+            "src.patent_pipeline.services.gemini_client.get_response_cache",
+            return_value=NullResponseCache(),
+        ), patch.object(
+            GeminiClient, "model", new_callable=PropertyMock, return_value=model
+        ), patch(
+            "src.patent_pipeline.services.report_streaming.get_settings", return_value=settings
+        ), patch(
+            "src.patent_pipeline.services.report_streaming.stage_blob_block",
+            side_effect=lambda url, name, block_id, data: staged.__setitem__(block_id, data),
+        ), patch(
+            "src.patent_pipeline.services.report_streaming.commit_blob_blocks",
+            return_value="https://acct/container/APP_Stage3_Report.md",
+        ) as mock_commit, patch(
+            "src.patent_pipeline.nodes.save_reports.upload_blob",
+            side_effect=lambda container_url, blob_name, **kwargs: f"{container_url}/{blob_name}",
+        ) as mock_upload, report_stream_scope("job-stream"):
+            progress = get_progress_registry().get("job-stream")
+
+            async def subscribe():
+                return [event async for event in progress.events()]
+
+            subscriber = asyncio.ensure_future(subscribe())
+            await asyncio.sleep(0)
+            stream = job_report_streams().open("stage3", "https://acct/container", "APP")
+            client = GeminiClient()
+            with patch.object(client.settings, "gemini_streaming", True):
+                result = await client.call_stage3({"metadata": {}}, {}, stream=stream)
+            await stream.finish(result)
+            save_reports_node(
+                {
+                    "azure_container_url": "https://acct/container",
+                    "base_name": "APP",
+                    "stage3_report_md": result,
+                }
+            )
+
+        events = await subscriber
+        chunks = [event["delta"] for event in events if event["type"] == "chunk"]
+        # One event per report chunk, including the closing fence
+        assert len(chunks) == len(pieces)
+        assert "".join(chunks).startswith(report)
+        assert events[-1] == {"type": "done", "stage": "stage3", "chars": len(result)}
+
+        assert model.generate_content.call_args.kwargs["stream"] is True
+        assert result == report.strip()
+        assert progress.snapshot()["reports"]["stage3"] == {
+            "text": result, "chars": len(result), "done": True
+        }
+        assert progress.closed
+
+        block_ids = mock_commit.call_args.args[2]
+        assert len(block_ids) > 2
+        assert b"".join(staged[block_id] for block_id in block_ids).decode() == result
+        uploaded = [c.kwargs["blob_name"] for c in mock_upload.call_args_list]
+        assert "APP_Stage3_Report.md" not in uploaded
+
+
+class TestHedging:
+    """Tests for hedged stage calls."""
+
+    @pytest.mark.asyncio
+    async def test_slow_call_hedged_and_loser_cancelled(self):
+        """A call past the stage's latency percentile is duplicated; the first result wins."""
+        from src.patent_pipeline.services.hedging import Hedger
+
+        hedger = Hedger(percentile=90, min_samples=5, budget_ratio=0.5)
+        for _ in range(10):
+            hedger.record_latency("stage3", 0.05)
+        hedger._start_call("stage3")  # earn enough budget for one hedge
+
+        cancelled = []
+
+        async def attempt(hedge: bool) -> str:
+            try:
+                await asyncio.sleep(0.01 if hedge else 5)
+            except asyncio.CancelledError:
+                cancelled.append(hedge)
+                raise
+            return "hedge" if hedge else "primary"
+
+        assert await hedger.run("stage3", attempt) == "hedge"
+        await asyncio.sleep(0)
+        assert cancelled == [False]
+        stats = hedger.stats()["stages"]["stage3"]
+        assert stats["hedged"] == 1
+        assert stats["hedge_wins"] == 1
+        assert stats["hedge_delay_seconds"] == pytest.approx(0.05)
+
+    @pytest.mark.asyncio
+    async def test_hedges_limited_by_stage_budget(self):
+        """Without budget the slow call simply runs to completion."""
+        from src.patent_pipeline.services.hedging import Hedger
+
+        hedger = Hedger(percentile=50, min_samples=1, budget_ratio=0.1)
+        hedger.record_latency("stage2a", 0.01)
+        attempts = []
+
+        async def attempt(hedge: bool) -> bool:
+            attempts.append(hedge)
+            await asyncio.sleep(0.05)
+            return hedge
+
+        assert await hedger.run("stage2a", attempt) is False
+        assert attempts == [False]
+        stats = hedger.stats()["stages"]["stage2a"]
+        assert stats["budget_denied"] == 1
+        assert stats["hedged"] == 0
+
+
+class TestModelCascade:
+    """Tests for per-stage model cascades."""
+
+    def test_quality_checks(self):
+        """Invalid JSON and thin reports are escalated; good output is kept."""
+        from src.patent_pipeline.models.stage2 import Stage2C
+        from src.patent_pipeline.services.model_cascade import quality_issue
+
+        assert quality_issue({"event_forensics": "none"}, validation_model=Stage2C) == (
+            "validation_failed"
+        )
+        assert quality_issue({"event_forensics": []}, validation_model=Stage2C) is None
+        assert quality_issue("# Report\n\nShort.", min_report_chars=100) == "report_too_short"
+        assert quality_issue("No headings here. " * 10, min_report_chars=100) == "no_headings"
+        assert quality_issue("# Report\n\n" + "Body. " * 30, min_report_chars=100) is None
+        assert quality_issue({"event_forensics": []}, truncated=True) == "truncated"
+
+    @pytest.mark.asyncio
+    async def test_fast_tier_escalates_on_validation_failure(self):
+        """Stage 2C output failing validation on the fast model is regenerated on the default."""
+        from src.patent_pipeline.services.gemini_client import GeminiClient
+        from src.patent_pipeline.services.response_cache import NullResponseCache
+        from src.patent_pipeline.services.usage_accounting import usage_scope
+
+        models = {
+            "fast-model": MagicMock(),
+            "pro-model": MagicMock(),
+        }
+        models["fast-model"].generate_content.return_value = _fake_response(
+            '{"event_forensics": "none found"}', "STOP"
+        )
+        models["pro-model"].generate_content.return_value = _fake_response(
+            '{"event_forensics": [], "timeline_summary": "Clean history"}', "STOP"
+        )
+        with patch(
+            "src.patent_pipeline.services.gemini_client.get_response_cache",
+            return_value=NullResponseCache(),
+        ), patch.object(
+            GeminiClient, "_model_for", lambda self, name: models[name]
+        ), usage_scope() as usage:
+            client = GeminiClient()
+            with patch.multiple(
+                client.settings,
+                gemini_model="pro-model",
+                gemini_fast_model="fast-model",
+                gemini_cascade_stages="stage2c, search_intel",
+                gemini_structured_output=False,
+            ):
+                result = await client.call_stage2c({"events": []}, {}, {}, "# Tech Pack")
+                await client.call_stage2a({"events": []}, "# Tech Pack")
+
+        assert result["timeline_summary"] == "Clean history"
+        assert models["fast-model"].generate_content.call_count == 1
+        # Stage 2A is not cascaded
+        assert models["pro-model"].generate_content.call_count == 2
+        summary = usage.summary()["by_stage"]
+        assert summary["stage2c"]["escalations"] == 1
+        assert summary["stage2c"]["served_by"] == {"pro-model": 1}
+        assert [c["model"] for c in usage.summary()["calls"][:2]] == ["fast-model", "pro-model"]
+
+
+class TestBatchMode:
+    """Tests for batched stage calls against the local stand-in batch server."""
+
+    @pytest.mark.asyncio
+    async def test_waiting_jobs_share_a_batch_and_resume(self):
+        """Stage calls of jobs that are all waiting go out as one batch at the discount."""
+        from src.patent_pipeline.services.batch_mode import (
+            BatchScheduler,
+            LocalBatchServer,
+            batch_scope,
+        )
+        from src.patent_pipeline.services.gemini_client import GeminiClient
+        from src.patent_pipeline.services.response_cache import NullResponseCache
+        from src.patent_pipeline.services.usage_accounting import usage_scope
+
+        def respond(request):
+            summary = request.contents[0]["parts"][0]["text"].rsplit("job-", 1)[1][:1]
+            return json.dumps({"construction_summary": f"job {summary}"})
+
+        server = LocalBatchServer(respond, completion_seconds=0.05)
+        scheduler = BatchScheduler(server, flush_seconds=60, poll_seconds=0.01)
+        online_model = MagicMock()
+
+        async def run_job(n: int):
+            with scheduler.job(), usage_scope() as usage:
+                result = await GeminiClient().call_stage2a(
+                    {"events": [f"job-{n}"]}, "# Tech Pack"
+                )
+            return result, usage
+
+        with patch(
+            "src.patent_pipeline.services.gemini_client.get_response_cache",
+            return_value=NullResponseCache(),
+        ), patch.object(GeminiClient, "_model_for", return_value=online_model):
+            with batch_scope(scheduler):
+                async with scheduler.running():
+                    outcomes = await asyncio.gather(*(run_job(n) for n in range(3)))
+
+        online_model.generate_content.assert_not_called()
+        assert len(server.batches) == 1
+        _, requests = server.batches["batches/local-1"]
+        assert {request.stage for request in requests} == {"stage2a"}
+        assert "response_schema" in requests[0].generation_config
+        for n, (result, usage) in enumerate(outcomes):
+            assert result["construction_summary"] == f"job {n}"
+            call = usage.summary()["calls"][0]
+            assert call["kind"] == "batch"
+
+    @pytest.mark.asyncio
+    async def test_batch_waits_for_running_jobs_and_reports_failures(self):
+        """A request is held while another job still runs; dropped results raise."""
+        from src.patent_pipeline.services.batch_mode import (
+            BatchRequest,
+            BatchRequestError,
+            BatchResult,
+            BatchScheduler,
+            LocalBatchServer,
+        )
+
+        server = LocalBatchServer(
+            lambda request: BatchResult(request.custom_id, error="quota exceeded")
+        )
+        scheduler = BatchScheduler(server, flush_seconds=60, poll_seconds=0.01)
+        release = asyncio.Event()
+
+        async def busy_job():
+            with scheduler.job():
+                await release.wait()
+
+        async def waiting_job():
+            with scheduler.job():
+                await scheduler.submit(BatchRequest(model="m", contents=[], stage="stage3"))
+
+        async with scheduler.running():
+            busy = asyncio.create_task(busy_job())
+            waiting = asyncio.create_task(waiting_job())
+            await asyncio.sleep(0.1)
+            assert server.batches == {}  # the busy job may still add requests
+            release.set()
+            await busy
+            with pytest.raises(BatchRequestError, match="quota exceeded"):
+                await waiting
+
+        assert scheduler.stats == {"requests": 1, "batches": 1, "failed_requests": 1}
+
+
+class TestSingleFlight:
+    """Tests for coalescing identical in-flight stage calls."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_one_call_and_its_error(self):
+        """Callers with the same key wait on one call; an error reaches all of them."""
+        from src.patent_pipeline.services.single_flight import SingleFlight
+
+        flight = SingleFlight()
+        calls = []
+
+        async def call():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "text"
+
+        results = await asyncio.gather(*(flight.run("key", call) for _ in range(3)))
+        assert results == [("text", False), ("text", True), ("text", True)]
+        assert len(calls) == 1
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ConnectionError("overloaded")
+
+        outcomes = await asyncio.gather(
+            flight.run("key", failing), flight.run("key", failing), return_exceptions=True
+        )
+        assert all(isinstance(outcome, ConnectionError) for outcome in outcomes)
+        stats = flight.stats()
+        assert stats["in_flight"] == 0
+        assert stats["coalesced"] == 3
+        assert stats["shared_errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        """The call outlives a cancelled caller and is cancelled once nobody waits."""
+        from src.patent_pipeline.services.single_flight import SingleFlight
+
+        flight = SingleFlight()
+        release = asyncio.Event()
+        cancelled = []
+
+        async def call():
+            try:
+                await release.wait()
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+            return "text"
+
+        leader = asyncio.create_task(flight.run("key", call))
+        follower = asyncio.create_task(flight.run("key", call))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        assert await follower == ("text", True)
+        assert cancelled == []
+
+        release.clear()
+        abandoned = asyncio.create_task(flight.run("other", call))
+        await asyncio.sleep(0)
+        abandoned.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await abandoned
+        await asyncio.sleep(0)
+        assert cancelled == [True]
+        assert flight.stats()["abandoned"] == 1
+
+    @pytest.mark.asyncio
+    async def test_identical_stage_calls_from_two_jobs_make_one_request(self):
+        """Two jobs running Stage 2A on the same inputs share the Gemini call."""
+        from src.patent_pipeline.services.gemini_client import GeminiClient
+        from src.patent_pipeline.services.response_cache import NullResponseCache
+        from src.patent_pipeline.services.single_flight import SingleFlight
+        from src.patent_pipeline.services.usage_accounting import usage_scope
+
+        model = MagicMock()
+        model.generate_content.return_value = _fake_response(
+            '{"construction_summary": "Narrow"}', "STOP"
+        )
+
+        async def run_job():
+            with usage_scope() as usage:
+                result = await GeminiClient().call_stage2a({"events": []}, "# Tech Pack")
+            return result, usage.summary()["by_stage"]["stage2a"]
+
+        with patch(
+            "src.patent_pipeline.services.gemini_client.get_response_cache",
+            return_value=NullResponseCache(),
+        ), patch(
+            "src.patent_pipeline.services.gemini_client.get_single_flight",
+            return_value=SingleFlight(),
+        ), patch.object(GeminiClient, "_model_for", return_value=model):
+            (first, first_usage), (second, second_usage) = await asyncio.gather(
+                run_job(), run_job()
+            )
+
+        assert model.generate_content.call_count == 1
+        assert first == second
+        assert first is not second
+        assert (first_usage["calls"], first_usage["coalesced"]) == (1, 0)
+        assert (second_usage["calls"], second_usage["coalesced"]) == (0, 1)
+
+
+class TestOverloadControl:
+    """Tests for adaptive concurrency and circuit breaking of provider calls."""
+
+    @pytest.mark.asyncio
+    async def test_aimd_limit_and_queueing(self):
+        """Congestion halves the limit once per round trip; successes grow it; waiters queue."""
+        from src.patent_pipeline.services.overload_control import AdaptiveConcurrency
+
+        limiter = AdaptiveConcurrency(initial=4, min_limit=1, max_limit=8)
+        started = [await limiter.acquire() for _ in range(4)]
+        limiter.release(started[0], congested=True)
+        limiter.release(started[1], congested=True)  # same burst: counted once
+        assert limiter.limit == 2
+        limiter.release(started[2], congested=False)
+        assert limiter.limit == pytest.approx(2.5)
+        limiter.release(started[3], congested=None)
+
+        first = await limiter.acquire()
+        second = await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        assert limiter.stats()["waiting"] == 1
+        limiter.release(first, congested=False)
+        await asyncio.wait_for(waiter, 1)
+        limiter.release(second, congested=None)
+        limiter.release(waiter.result(), congested=None)
+        assert limiter.stats()["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_breaker_trips_fails_fast_and_recovers_on_probe(self):
+        """Overload errors open the breaker; a successful probe closes it."""
+        from google.api_core import exceptions as api_exceptions
+
+        from src.patent_pipeline.services.overload_control import (
+            CircuitOpenError,
+            OverloadControl,
+        )
+        from src.patent_pipeline.services.provider_router import is_provider_error
+
+        control = OverloadControl(
+            mode="fail_fast",
+            breaker_options={"min_calls": 3, "window": 5, "open_seconds": 0.05},
+        )
+        for _ in range(3):
+            with pytest.raises(api_exceptions.ServiceUnavailable):
+                async with control.call("gemini", "pro"):
+                    raise api_exceptions.ServiceUnavailable("overloaded")
+
+        with pytest.raises(CircuitOpenError) as rejected:
+            async with control.call("gemini", "pro"):
+                pass
+        assert is_provider_error(rejected.value)
+
+        await asyncio.sleep(0.06)
+        async with control.call("gemini", "pro"):
+            pass  # the probe
+        breaker = control.stats()["providers"]["gemini/pro"]["breaker"]
+        assert breaker["state"] == "closed"
+        assert breaker["rejected"] == 1
+        assert breaker["transitions"] == {
+            "closed->open": 1,
+            "open->half_open": 1,
+            "half_open->closed": 1,
+        }
+
+    @pytest.mark.asyncio
+    async def test_parked_calls_resume_after_recovery(self):
+        """In park mode calls wait out an open breaker instead of failing."""
+        from src.patent_pipeline.services.overload_control import OverloadControl
+
+        control = OverloadControl(
+            mode="park",
+            park_poll_seconds=0.01,
+            breaker_options={"min_calls": 1, "open_seconds": 0.05},
+        )
+        with pytest.raises(TimeoutError):
+            async with control.call("claude", "sonnet"):
+                raise TimeoutError("read timeout")
+
+        async def call() -> str:
+            async with control.call("claude", "sonnet"):
+                await asyncio.sleep(0.01)
+                return "ok"
+
+        assert await asyncio.gather(call(), call()) == ["ok", "ok"]
+        stats = control.stats()
+        assert stats["parked"] == 0
+        assert stats["providers"]["claude/sonnet"]["breaker"]["state"] == "closed"
+
+
+class TestPipelineGraph:
+    """Tests for the pipeline graph wiring."""
+
+    @pytest.mark.asyncio
+    async def test_parallel_branches_join_before_saving(self):
+        """Stage 3/4 and Search Intel merge their updates and reports are saved once."""
+        from src.patent_pipeline import graph as graph_module
+
+        saved = []
+
+        def step(**updates):
+            async def node(state):
+                await asyncio.sleep(0)
+                return updates
+
+            return node
+
+        async def save_reports(state):
+            saved.append(
+                (state["stage4_final_report_md"], state["search_intel_report_md"])
+            )
+            return {"status": "completed"}
+
+        nodes = {
+            "ingest_pdfs_node": step(base_name="APP"),
+            "stage1_extraction_node": step(stage1_extraction={}),
+            "tech_pack_router_node": step(tech_center="2100"),
+            "stage2a_node": step(stage2a={}),
+            "stage2b_node": step(stage2b={}),
+            "stage2c_node": step(stage2c={}),
+            "stage2_merge_node": step(stage2_forensic={}),
+            "stage3_report_node": step(stage3_report_md="# Draft"),
+            "stage4_qc_node": step(stage4_final_report_md="# Final"),
+            "search_intel_node": step(search_intel_report_md="# Search"),
+            "save_reports_node": save_reports,
+        }
+        with patch.multiple(graph_module, **nodes):
+            pipeline = graph_module.create_patent_pipeline()
+            results = await asyncio.gather(
+                *(pipeline.ainvoke({"patent_pdf_url": str(i)}) for i in range(10))
+            )
+
+        assert saved == [("# Final", "# Search")] * 10
+        assert all(result["status"] == "completed" for result in results)
+
+
+class TestLLMBackend:
+    """Tests for recording and replaying LLM calls."""
+
+    @pytest.mark.asyncio
+    async def test_recorded_stage_call_replays_offline(self, tmp_path):
+        """A recorded Stage 2A response is served from the cassette without the model."""
+        from src.patent_pipeline.services.gemini_client import GeminiClient
+        from src.patent_pipeline.services.llm_backend import (
+            CassetteMissError,
+            RecordingLLMBackend,
+            ReplayLLMBackend,
+        )
+        from src.patent_pipeline.services.response_cache import NullResponseCache
+        from src.patent_pipeline.services.single_flight import SingleFlight
+
+        model = MagicMock()
+        model.generate_content.return_value = _fake_response(
+            '{"construction_summary": "Narrow"}', "STOP"
+        )
+
+        def run_stage(events):
+            return GeminiClient().call_stage2a({"events": events}, "# Tech Pack")
+
+        backend = patch("src.patent_pipeline.services.gemini_client.get_llm_backend")
+        with patch(
+            "src.patent_pipeline.services.gemini_client.get_response_cache",
+            return_value=NullResponseCache(),
+        ), patch(
+            "src.patent_pipeline.services.gemini_client.get_single_flight",
+            return_value=SingleFlight(enabled=False),
+        ), patch.object(GeminiClient, "_model_for", return_value=model):
+            recorder = RecordingLLMBackend(str(tmp_path), "run")
+            with backend as get_backend:
+                get_backend.return_value = recorder
+                recorded = await run_stage([])
+            assert recorder.stats()["recorded"] == 1
+
+            model.generate_content.side_effect = AssertionError("network call")
+            replay = ReplayLLMBackend(str(tmp_path), latency="none")
+            with backend as get_backend:
+                get_backend.return_value = replay
+                replayed = await asyncio.gather(*(run_stage([]) for _ in range(20)))
+                with pytest.raises(CassetteMissError):
+                    await run_stage([{"date": "2020-01-01"}])
+
+        assert all(result == recorded for result in replayed)
+        assert model.generate_content.call_count == 1
+        stats = replay.stats()
+        assert (stats["served"], stats["misses"]) == (20, 1)
+
+    @pytest.mark.asyncio
+    async def test_replay_streams_with_simulated_latency(self, tmp_path):
+        """Replayed streams arrive in chunks after the recorded time to first byte."""
+        from src.patent_pipeline.services.llm_backend import LLMRequest, ReplayLLMBackend
+
+        request = LLMRequest("claude", "sonnet", "Writer", {"messages": ["hi"]})
+        (tmp_path / "run.jsonl").write_text(
+            json.dumps(
+                {
+                    "key": request.key,
+                    "text": "# Report\n" * 10,
+                    "finish_reason": "end_turn",
+                    "usage": {"input_tokens": 5, "output_tokens": 50},
+                    "latency_seconds": 0.1,
+                    "ttfb_seconds": 0.05,
+                }
+            )
+            + "\n"
+        )
+        backend = ReplayLLMBackend(str(tmp_path), latency="recorded", latency_scale=0.5)
+        chunks, first_byte = [], []
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+
+        response = await backend.call(
+            request,
+            send=None,
+            on_text=chunks.append,
+            on_first_byte=lambda: first_byte.append(loop.time() - started),
+        )
+
+        assert response.content[0].text == "# Report\n" * 10
+        assert response.usage.output_tokens == 50
+        assert chunks[-1] == response.content[0].text
+        assert len(chunks) > 1
+        assert 0.02 <= first_byte[0] < 0.05
+        assert loop.time() - started >= 0.045
+
+
+
+class TestOutputBudgets:
+    """Tests for per-stage output token budgets."""
+
+    def test_budget_learned_per_tech_center_and_document_size(self):
+        """Budgets follow the closest history with enough samples, within the caps."""
+        from src.patent_pipeline.services.output_budget import (
+            OutputBudgets,
+            budget_profile,
+            budget_profile_scope,
+        )
+
+        budgets = OutputBudgets(
+            caps={"stage1": 6000}, max_tokens=8192, min_tokens=256, min_samples=3
+        )
+        with budget_profile_scope():
+            profile = budget_profile()
+            profile.tech_center, profile.document_bytes = "2100", 5 * 1024 * 1024
+            assert profile.size_class == "4-16MB"
+            assert budgets.budget("stage2c", 8192) == 8192  # no history yet
+            for tokens in (1000, 1200, 1600):
+                budgets.record("stage2c", tokens)
+            for _ in range(3):
+                budgets.record("stage1", 7000)
+            assert budgets.budget("stage2c", 8192) == 2000  # p95 plus 25% headroom
+            assert budgets.budget("stage1", 8192) == 6000  # capped
+
+            profile.tech_center = "2800"
+            for tokens in (100, 100, 100):
+                budgets.record("stage2c", tokens)
+            assert budgets.budget("stage2c", 8192) == 256  # this tech center's own history
+
+        with budget_profile_scope():
+            assert budgets.budget("stage2c", 8192) == 2000  # pooled over tech centers
+
+        stats = budgets.stats()
+        assert stats["stage_budgets"] == {"stage2c": 2000, "stage1": 6000}
+        assert (stats["learned"], stats["default"]) == (4, 1)
+
+    @pytest.mark.asyncio
+    async def test_stage_call_sends_budget_and_grows_after_truncation(self):
+        """A learned budget is sent and reserved; truncated output raises the budget."""
+        from src.patent_pipeline.services.gemini_client import GeminiClient
+        from src.patent_pipeline.services.output_budget import OutputBudgets
+        from src.patent_pipeline.services.response_cache import NullResponseCache
+        from src.patent_pipeline.services.single_flight import SingleFlight
+
+        budgets = OutputBudgets(min_tokens=256, min_samples=1, headroom=0.0)
+        model = MagicMock()
+        model.generate_content.side_effect = [
+            _fake_response('{"construction_summary": "Narrow"}', "STOP", total_tokens=1000),
+            _fake_response('{"construction_summary": "Nar', "MAX_TOKENS", total_tokens=1000),
+        ]
+        limiter = MagicMock()
+        limiter.slot.return_value.__aenter__.return_value = MagicMock(waited=0.0)
+
+        with patch(
+            "src.patent_pipeline.services.gemini_client.get_response_cache",
+            return_value=NullResponseCache(),
+        ), patch(
+            "src.patent_pipeline.services.gemini_client.get_output_budgets",
+            return_value=budgets,
+        ), patch(
+            "src.patent_pipeline.services.gemini_client.get_single_flight",
+            return_value=SingleFlight(enabled=False),
+        ), patch(
+            "src.patent_pipeline.services.gemini_client.get_rate_limiter", return_value=limiter
+        ), patch.object(GeminiClient, "_model_for", return_value=model):
+            client = GeminiClient()
+            with patch.object(client.settings, "gemini_max_continuations", 0):
+                await client.call_stage2a({"events": []}, "# Tech Pack")
+                assert budgets.budget("stage2a", 8192) == 500
+                await client.call_stage2a({"events": [1]}, "# Tech Pack")
+
+        config = model.generate_content.call_args.kwargs["generation_config"]
+        assert config["max_output_tokens"] == 500
+        _, _, reserved = limiter.slot.call_args.args
+        assert reserved < 8192
+        assert budgets.budget("stage2a", 8192) == 1000  # truncated output counts double
+
+    @pytest.mark.asyncio
+    async def test_continuation_uses_full_output_limit(self):
+        """Only the first attempt is held to the learned budget, not its continuation."""
+        from src.patent_pipeline.services.gemini_client import GeminiClient
+        from src.patent_pipeline.services.output_budget import OutputBudgets
+        from src.patent_pipeline.services.response_cache import NullResponseCache
+        from src.patent_pipeline.services.single_flight import SingleFlight
+
+        budgets = OutputBudgets(min_tokens=256, min_samples=1, headroom=0.0)
+        budgets.record("stage2a", 500)
+        model = MagicMock()
+        model.generate_content.side_effect = [
+            _fake_response('{"construction_summary": "Nar', "MAX_TOKENS"),
+            _fake_response('row"}', "STOP"),
+        ]
+
+        with patch(
+            "src.patent_pipeline.services.gemini_client.get_response_cache",
+            return_value=NullResponseCache(),
+        ), patch(
+            "src.patent_pipeline.services.gemini_client.get_output_budgets",
+            return_value=budgets,
+        ), patch(
+            "src.patent_pipeline.services.gemini_client.get_single_flight",
+            return_value=SingleFlight(enabled=False),
+        ), patch.object(GeminiClient, "_model_for", return_value=model):
+            client = GeminiClient()
+            with patch.object(client.settings, "gemini_max_continuations", 1):
+                result = await client.call_stage2a({"events": []}, "# Tech Pack")
+
+        assert result["construction_summary"] == "Narrow"
+        first, continuation = model.generate_content.call_args_list
+        assert first.kwargs["generation_config"]["max_output_tokens"] == 500
+        assert "max_output_tokens" not in continuation.kwargs.get("generation_config", {})
+
+
+class TestReportEdits:
+    """Tests for applying Stage 4 edits to the Stage 3 report."""
+
+    def test_edits_applied_within_sections_with_conflicts_reported(self):
+        """Edits apply in their section; missing, ambiguous and overlapping ones are skipped."""
+        from src.patent_pipeline.services.report_edits import (
+            apply_report_edits,
+            mark_corrected_issues,
+        )
+
+        report = (
+            "# Report\n\n## I. Summary\nNOA mailed 2020-01-01.\n\n"
+            "## II. Timeline\nNOA mailed 2020-01-01.\n### Notes\nSee `cite`.\n"
+        )
+        edits = [
+            {"section": "timeline", "find": "2020-01-01", "replace": "2020-02-02",
+             "issue_id": "QC-1"},
+            {"find": "NOA mailed", "replace": "Allowed", "issue_id": "QC-2"},
+            {"section": "**II. Timeline**", "find": "mailed 2020", "replace": "sent",
+             "issue_id": "QC-3"},
+            {"section": "Claims", "find": "NOA", "replace": "x"},
+            {"section": "Notes", "find": "`cite`", "replace": '"cite"'},
+            {"section": "Summary"},
+        ]
+        qc_json = {"qc_issues": [{"issue_id": f"QC-{i}"} for i in (1, 2, 3, 4)]}
+
+        result = apply_report_edits(report, edits)
+        mark_corrected_issues(qc_json, result)
+
+        assert result.report_md == report.replace(
+            "Timeline\nNOA mailed 2020-01-01", "Timeline\nNOA mailed 2020-02-02"
+        ).replace("`cite`", '"cite"')
+        assert result.applied == [0, 4]
+        assert [(c.index, c.reason) for c in result.conflicts] == [
+            (1, "ambiguous"),
+            (2, "overlap"),
+            (3, "section_not_found"),
+            (5, "invalid"),
+        ]
+        assert [issue.get("corrected") for issue in qc_json["qc_issues"]] == [
+            True, False, False, None
+        ]